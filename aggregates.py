@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Agrégats précalculés du jeu de données (statut x catégorie x zone, top
+zones) écrits dans un fichier compagnon lu par le tableau de bord
+"""
+
+import json
+import os
+
+import pandas as pd
+
+from analytics import compute_report
+from checkpoint import atomic_write_json
+
+AGGREGATES_SUFFIX = ".aggregates.json"
+TOP_N_ZONES = 15
+CUBE_COLUMNS = ["Statut", "Catégorie", "Zone"]
+
+def sidecar_path(dataset_path):
+    """Chemin du fichier d'agrégats associé à un CSV"""
+    return os.path.splitext(dataset_path)[0] + AGGREGATES_SUFFIX
+
+def _label(value):
+    return None if pd.isna(value) else value
+
+def compute_aggregates(df, version, top_n=TOP_N_ZONES):
+    """Cube statut x catégorie x zone et ses marges, tirés du rapport analytique (une passe groupby)"""
+    report = compute_report(df)
+    cube = report["cube"].groupby(level=CUBE_COLUMNS, dropna=False, sort=False).sum() if len(df) else report["cube"]
+    return {
+        "version": version,
+        "total": int(len(df)),
+        "by_status": {k: int(v) for k, v in report["by_status"].items()},
+        "by_category": {k: int(v) for k, v in report["by_category"].items()},
+        "top_zones": [[k, int(v)] for k, v in report["by_zone"].head(top_n).items()],
+        "n_categories": len(report["by_category"]),
+        "n_zones": len(report["by_zone"]),
+        "cube": [[_label(s), _label(c), _label(z), int(n)] for (s, c, z), n in cube.items()],
+    }
+
+def write_aggregates(df, dataset_path, version):
+    """Calcule et écrit (atomiquement) les agrégats d'un jeu de données"""
+    aggregates = compute_aggregates(df, version)
+    atomic_write_json(sidecar_path(dataset_path), aggregates)
+    return aggregates
+
+def materialize(dataset_path, version=None):
+    """Étape de pipeline : (re)génère le fichier d'agrégats d'un CSV"""
+    from dataset import file_version
+    version = version or file_version(dataset_path)
+    aggregates = write_aggregates(pd.read_csv(dataset_path), dataset_path, version)
+    print(f"[SUCCESS] Agrégats écrits dans {sidecar_path(dataset_path)} ({len(aggregates['cube'])} cellules)")
+    return aggregates
+
+def load_aggregates(dataset_path, version, loader=None):
+    """Lit les agrégats si leur version correspond, sinon les recalcule.
+
+    loader() doit retourner le DataFrame (permet de réutiliser un cache) ;
+    par défaut le CSV est relu.
+    """
+    path = sidecar_path(dataset_path)
+    if os.path.exists(path):
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                aggregates = json.load(f)
+            if aggregates.get("version") == version:
+                return aggregates
+        except (OSError, ValueError):
+            pass
+    df = loader() if loader else pd.read_csv(dataset_path)
+    try:
+        return write_aggregates(df, dataset_path, version)
+    except OSError:
+        # Dossier en lecture seule : agrégats gardés en mémoire uniquement
+        return compute_aggregates(df, version)
+
+def cube_frame(aggregates):
+    """Cube sous forme de DataFrame (Statut, Catégorie, Zone, Nombre)"""
+    return pd.DataFrame(aggregates["cube"], columns=CUBE_COLUMNS + ["Nombre"])
+
+def filter_cube(cube, statut=None, categorie=None, zone=None):
+    """Sous-cube correspondant aux filtres.
+
+    Chaque filtre est une valeur ou une liste de valeurs (sélection
+    multiple) ; None ou liste vide = pas de filtre.
+    """
+    mask = pd.Series(True, index=cube.index)
+    for column, selected in (('Statut', statut), ('Catégorie', categorie), ('Zone', zone)):
+        if selected is None or (isinstance(selected, (list, tuple, set)) and not selected):
+            continue
+        if isinstance(selected, (list, tuple, set)):
+            mask &= cube[column].isin(list(selected))
+        else:
+            mask &= cube[column] == selected
+    return cube[mask]
+
+def cube_counts(cube, column):
+    """Comptes par valeur d'une dimension, triés par ordre décroissant"""
+    return cube.groupby(column)['Nombre'].sum().sort_values(ascending=False)
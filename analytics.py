@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Moteur d'analyse commun aux rapports : une seule lecture du jeu de données
+et un seul groupby (statut x catégorie x zone x source) dont toutes les
+répartitions affichées sont déduites
+"""
+
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+GROUP_COLUMNS = ["Statut", "Catégorie", "Zone", "Source"]
+
+# Secteur attendu de chaque catégorie (classification de référence)
+FORMAL_CATEGORIES = [
+    "Supermarché", "Supérette / Mini-market", "Café", "Restaurant",
+    "Grossiste / Distributeur régional", "Boulangerie", "Parapharmacie", "Magasin bio",
+]
+INFORMAL_CATEGORIES = ["Épicerie", "Kiosque", "Boutique de confiserie"]
+CATEGORY_SECTORS = {**{c: "Formel" for c in FORMAL_CATEGORIES}, **{c: "Informel" for c in INFORMAL_CATEGORIES}}
+UNCLASSIFIED = "Non classifié"
+
+def category_sector(categories):
+    """Secteur (Formel / Informel / Non classifié) d'une série de catégories, vectorisé"""
+    return categories.map(CATEGORY_SECTORS).fillna(UNCLASSIFIED)
+
+def _margin(cube, levels):
+    """Comptes par valeur d'un ou plusieurs niveaux du cube, triés comme value_counts (NaN exclus) :
+    à égalité, ordre de première apparition (le cube est groupé sans tri)"""
+    counts = cube.groupby(level=levels, dropna=True, sort=False).sum()
+    return counts[counts > 0].sort_values(ascending=False, kind='stable')
+
+def _empty_counts():
+    return pd.Series(dtype=np.int64)
+
+def zone_breakdown(cube):
+    """Par zone : total, formels, informels, part du formel et catégorie dominante,
+    triés par nombre de points décroissant"""
+    if not {"Zone", "Statut"} <= set(cube.index.names):
+        return pd.DataFrame(columns=["Total", "Formel", "Informel", "Pourcentage_Formel", "Catégorie_Dominante"])
+    by_status = cube.groupby(level=["Zone", "Statut"], dropna=True).sum().unstack(fill_value=0)
+    by_status = by_status.reindex(columns=sorted(set(by_status.columns) | {"Formel", "Informel"}), fill_value=0)
+    zones = pd.DataFrame({
+        "Total": cube.groupby(level="Zone", dropna=True).sum(),
+        "Formel": by_status["Formel"],
+        "Informel": by_status["Informel"],
+    })
+    zones["Pourcentage_Formel"] = (zones["Formel"] / zones["Total"].where(zones["Total"] > 0) * 100).round(1).fillna(0.0)
+    if "Catégorie" in cube.index.names:
+        # Catégorie la plus fréquente (à égalité, la première dans l'ordre alphabétique, comme mode())
+        by_category = cube.groupby(level=["Zone", "Catégorie"], dropna=True).sum()
+        by_category = by_category[by_category > 0].reset_index(name="n")
+        dominant = (by_category.sort_values(["Zone", "n", "Catégorie"], ascending=[True, False, True])
+                    .drop_duplicates("Zone").set_index("Zone")["Catégorie"])
+        zones["Catégorie_Dominante"] = dominant.reindex(zones.index).fillna("N/A")
+    zones.index.name = "Zone"
+    return zones[zones["Total"] > 0].sort_values("Total", ascending=False, kind='stable')
+
+def compute_report(df, examples=2):
+    """Toutes les métriques des rapports en une passe.
+
+    Retourne un dict : total, colonnes, cube, comptes par statut / catégorie /
+    zone / source (Series triées), secteur attendu par catégorie, tableau
+    par zone (zone_breakdown), croisement catégorie x statut et quelques
+    lignes d'exemple.
+    """
+    total = len(df)
+    columns = [c for c in GROUP_COLUMNS if c in df.columns]
+    cube = df.groupby(columns, dropna=False, sort=False).size() if columns and total else None
+
+    def margin(*levels):
+        if cube is None or not set(levels) <= set(columns):
+            return _empty_counts()
+        return _margin(cube, list(levels) if len(levels) > 1 else levels[0])
+
+    by_category = margin("Catégorie")
+    sectors = pd.Series(category_sector(by_category.index.to_series()).to_numpy(), index=by_category.index)
+    by_sector = {sector: by_category[(sectors == sector).to_numpy()]
+                 for sector in ("Formel", "Informel", UNCLASSIFIED)}
+    category_status = margin("Catégorie", "Statut")
+    return {
+        "total": total,
+        "columns": list(df.columns),
+        # Comptes par combinaison (valeurs manquantes comprises), base de toutes les marges
+        "cube": cube if cube is not None else _empty_counts(),
+        "by_status": margin("Statut"),
+        "by_category": by_category,
+        "by_zone": margin("Zone"),
+        "by_source": margin("Source"),
+        # Catégories regroupées selon leur secteur attendu
+        "by_sector": by_sector,
+        "zones": zone_breakdown(cube) if cube is not None else zone_breakdown(_empty_counts()),
+        "category_status": (category_status.unstack(fill_value=0).sort_index()
+                            if len(category_status) else pd.DataFrame()),
+        "examples": df.head(examples).to_dict(orient="records"),
+    }
+
+@lru_cache(maxsize=8)
+def _file_report(path, version):
+    return compute_report(pd.read_csv(path))
+
+def report_for_file(path):
+    """Rapport d'un CSV, calculé une seule fois par version du fichier dans le processus"""
+    from dataset import file_version
+    return _file_report(path, file_version(path))
+
+@lru_cache(maxsize=2)
+def _dataset_report(path, version):
+    from point_store import load_store
+    return compute_report(load_store(path, version, loader=lambda: pd.read_csv(path)).to_frame(copy=False))
+
+def load_report():
+    """Rapport du jeu de données courant (dernier instantané ou fichier de référence),
+    lu depuis le stockage en colonnes"""
+    from dataset import current_dataset
+    return _dataset_report(*current_dataset())
@@ -5,7 +5,8 @@ Analyse des points de vente par statut Formel/Informel
 
 import pandas as pd
 import os
-from collections import defaultdict
+
+from analytics import UNCLASSIFIED, category_sector, report_for_file
 
 def analyze_formal_informal():
     """Analyse la répartition Formel vs Informel des points de vente"""
@@ -14,28 +15,7 @@ def analyze_formal_informal():
     print("ANALYSE FORMEL vs INFORMEL - POINTS DE VENTE CASABLANCA")
     print("="*70)
     
-    # Classification des catégories
-    formel_categories = {
-        "Supermarché": "Formel",
-        "Supérette / Mini-market": "Formel", 
-        "Café": "Formel",
-        "Restaurant": "Formel",
-        "Grossiste / Distributeur régional": "Formel",
-        "Boulangerie": "Formel",
-        "Parapharmacie": "Formel",
-        "Magasin bio": "Formel"
-    }
-    
-    informel_categories = {
-        "Épicerie": "Informel",
-        "Kiosque": "Informel",
-        "Boutique de confiserie": "Informel"
-    }
-    
-    # Combiner toutes les catégories
-    all_categories = {**formel_categories, **informel_categories}
-    
-    # Analyser chaque fichier de données
+    # Analyser chaque fichier de données (une lecture et une passe groupby par fichier)
     files_to_analyze = [
         "points_vente_casablanca.csv",
         "points_vente_casablanca_osm.csv", 
@@ -48,54 +28,32 @@ def analyze_formal_informal():
             print("-" * 50)
             
             try:
-                df = pd.read_csv(filename)
+                report = report_for_file(filename)
                 
-                if 'Catégorie' not in df.columns:
+                if 'Catégorie' not in report['columns']:
                     print("   ❌ Colonne 'Catégorie' non trouvée")
                     continue
                 
                 # Statistiques générales
-                total_points = len(df)
-                categories_found = df['Catégorie'].value_counts()
-                
+                total_points = report['total']
                 print(f"   📊 Total points: {total_points}")
                 
-                # Calculer Formel vs Informel
-                formel_count = 0
-                informel_count = 0
-                autres_count = 0
-                
-                formel_details = defaultdict(int)
-                informel_details = defaultdict(int)
-                autres_details = defaultdict(int)
-                
-                for category, count in categories_found.items():
-                    if category in formel_categories:
-                        formel_count += count
-                        formel_details[category] = count
-                    elif category in informel_categories:
-                        informel_count += count
-                        informel_details[category] = count
-                    else:
-                        autres_count += count
-                        autres_details[category] = count
-                
-                # Afficher les résultats
-                print(f"\n   🏢 SECTEUR FORMEL: {formel_count} points ({formel_count/total_points*100:.1f}%)")
-                for cat, count in sorted(formel_details.items(), key=lambda x: x[1], reverse=True):
-                    percentage = count/total_points*100
-                    print(f"      • {cat}: {count} ({percentage:.1f}%)")
-                
-                print(f"\n   🏪 SECTEUR INFORMEL: {informel_count} points ({informel_count/total_points*100:.1f}%)")
-                for cat, count in sorted(informel_details.items(), key=lambda x: x[1], reverse=True):
-                    percentage = count/total_points*100
-                    print(f"      • {cat}: {count} ({percentage:.1f}%)")
-                
-                if autres_count > 0:
-                    print(f"\n   ❓ AUTRES CATÉGORIES: {autres_count} points ({autres_count/total_points*100:.1f}%)")
-                    for cat, count in sorted(autres_details.items(), key=lambda x: x[1], reverse=True):
-                        percentage = count/total_points*100
-                        print(f"      • {cat}: {count} ({percentage:.1f}%)")
+                # Catégories regroupées par secteur attendu (Formel / Informel / autres)
+                # (titre, secteur, affiché même vide)
+                sections = [
+                    ("🏢 SECTEUR FORMEL", "Formel", True),
+                    ("🏪 SECTEUR INFORMEL", "Informel", True),
+                    ("❓ AUTRES CATÉGORIES", UNCLASSIFIED, False),
+                ]
+                for title, sector, always_shown in sections:
+                    details = report['by_sector'][sector]
+                    count = int(details.sum())
+                    if count == 0 and not always_shown:
+                        continue
+                    print(f"\n   {title}: {count} points ({count/total_points*100:.1f}%)")
+                    for cat, cat_count in details.items():
+                        percentage = cat_count/total_points*100
+                        print(f"      • {cat}: {cat_count} ({percentage:.1f}%)")
                 
             except Exception as e:
                 print(f"   ❌ Erreur: {e}")
@@ -109,16 +67,8 @@ def analyze_formal_informal():
     if os.path.exists(main_file):
         df = pd.read_csv(main_file)
         
-        # Ajouter la colonne Statut_Reel basée sur la catégorie
-        def get_real_status(category):
-            if category in formel_categories:
-                return "Formel"
-            elif category in informel_categories:
-                return "Informel"
-            else:
-                return "Non classifié"
-        
-        df['Statut_Reel'] = df['Catégorie'].apply(get_real_status)
+        # Ajouter la colonne Statut_Reel basée sur la catégorie (correspondance vectorisée)
+        df['Statut_Reel'] = category_sector(df['Catégorie'])
         
         # Sauvegarder
         output_file = "points_vente_casablanca_avec_statut.csv"
@@ -134,6 +84,53 @@ def analyze_formal_informal():
             percentage = count/len(df)*100
             print(f"   {statut}: {count} points ({percentage:.1f}%)")
 
+# Couleurs pour chaque statut (marqueurs et légende)
+STATUS_MAP_COLORS = {
+    'Formel': 'blue',
+    'Informel': 'red',
+    UNCLASSIFIED: 'gray'
+}
+
+LEGEND_HTML = '''
+<div style="position: fixed; 
+            bottom: 50px; left: 50px; width: 200px; height: 120px; 
+            background-color: white; border:2px solid grey; z-index:9999; 
+            font-size:14px; padding: 10px">
+<p><b>Légende</b></p>
+<p><i class="fa fa-circle" style="color:blue"></i> Secteur Formel</p>
+<p><i class="fa fa-circle" style="color:red"></i> Secteur Informel</p>
+<p><i class="fa fa-circle" style="color:gray"></i> Non classifié</p>
+</div>
+'''
+
+def build_formal_informal_map(df):
+    """Carte Formel/Informel : une couche de points compacte par statut.
+
+    Les points de chaque statut sont intégrés une seule fois sous forme de
+    tableaux (map_layers.BulkPointLayer) ; marqueurs et popups sont
+    construits dans le navigateur avec des styles communs.
+    """
+    import folium
+    from map_layers import add_point_layer
+
+    # Créer la carte centrée sur Casablanca
+    casablanca_center = [33.5731, -7.5898]
+    m = folium.Map(location=casablanca_center, zoom_start=12)
+
+    located = df[df['Latitude'].notna() & df['Longitude'].notna()]
+    # Le statut affiché dans les popups est le statut réel (d'après la catégorie)
+    located = located.assign(Statut=located['Statut_Reel'])
+    for statut in STATUS_MAP_COLORS:
+        df_statut = located[located['Statut_Reel'] == statut]
+        if len(df_statut) > 0:
+            add_point_layer(m, df_statut, name=f"{statut} ({len(df_statut)} points)",
+                            color_column='Statut_Reel', colors=STATUS_MAP_COLORS, address=True)
+
+    # Ajouter le contrôle des couches et la légende
+    folium.LayerControl().add_to(m)
+    m.get_root().html.add_child(folium.Element(LEGEND_HTML))
+    return m
+
 def create_formal_informal_map():
     """Crée une carte avec distinction Formel/Informel"""
     
@@ -143,63 +140,7 @@ def create_formal_informal_map():
         return
     
     try:
-        import folium
-        from folium.plugins import MarkerCluster
-        
-        df = pd.read_csv(input_file)
-        
-        # Créer la carte centrée sur Casablanca
-        casablanca_center = [33.5731, -7.5898]
-        m = folium.Map(location=casablanca_center, zoom_start=12)
-        
-        # Couleurs pour chaque statut
-        colors = {
-            'Formel': 'blue',
-            'Informel': 'red', 
-            'Non classifié': 'gray'
-        }
-        
-        # Ajouter les marqueurs par statut
-        for statut in ['Formel', 'Informel', 'Non classifié']:
-            df_statut = df[df['Statut_Reel'] == statut]
-            
-            if len(df_statut) > 0:
-                cluster = MarkerCluster(name=f"{statut} ({len(df_statut)} points)")
-                
-                for idx, row in df_statut.iterrows():
-                    if pd.notna(row['Latitude']) and pd.notna(row['Longitude']):
-                        popup_text = f"""
-                        <b>{row['Nom']}</b><br>
-                        Catégorie: {row['Catégorie']}<br>
-                        Statut: {row['Statut_Reel']}<br>
-                        Adresse: {row.get('Adresse', 'N/A')}
-                        """
-                        
-                        folium.Marker(
-                            location=[row['Latitude'], row['Longitude']],
-                            popup=folium.Popup(popup_text, max_width=300),
-                            tooltip=f"{row['Nom']} ({statut})",
-                            icon=folium.Icon(color=colors[statut], icon='info-sign')
-                        ).add_to(cluster)
-                
-                cluster.add_to(m)
-        
-        # Ajouter le contrôle des couches
-        folium.LayerControl().add_to(m)
-        
-        # Ajouter une légende
-        legend_html = '''
-        <div style="position: fixed; 
-                    bottom: 50px; left: 50px; width: 200px; height: 120px; 
-                    background-color: white; border:2px solid grey; z-index:9999; 
-                    font-size:14px; padding: 10px">
-        <p><b>Légende</b></p>
-        <p><i class="fa fa-circle" style="color:blue"></i> Secteur Formel</p>
-        <p><i class="fa fa-circle" style="color:red"></i> Secteur Informel</p>
-        <p><i class="fa fa-circle" style="color:gray"></i> Non classifié</p>
-        </div>
-        '''
-        m.get_root().html.add_child(folium.Element(legend_html))
+        m = build_formal_informal_map(pd.read_csv(input_file))
         
         # Sauvegarder la carte
         map_file = "points_vente_casablanca_formel_informel.html"
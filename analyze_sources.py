@@ -3,9 +3,9 @@
 Script pour analyser et clarifier les sources de données des points de vente
 """
 
-import pandas as pd
 import os
-from pathlib import Path
+
+from analytics import report_for_file
 
 def analyze_data_sources():
     """Analyse les différents fichiers de données et leurs sources"""
@@ -28,28 +28,25 @@ def analyze_data_sources():
             print(f"   📝 {description}")
             
             try:
-                df = pd.read_csv(filename)
-                print(f"   📊 Nombre de points: {len(df)}")
-                print(f"   🏷️  Colonnes: {', '.join(df.columns.tolist())}")
+                report = report_for_file(filename)
+                print(f"   📊 Nombre de points: {report['total']}")
+                print(f"   🏷️  Colonnes: {', '.join(report['columns'])}")
                 
                 # Analyser les catégories
-                if 'Catégorie' in df.columns:
-                    categories = df['Catégorie'].value_counts()
+                if 'Catégorie' in report['columns']:
                     print(f"   🏪 Catégories principales:")
-                    for cat, count in categories.head(3).items():
+                    for cat, count in report['by_category'].head(3).items():
                         print(f"      - {cat}: {count}")
                 
                 # Analyser les sources si disponible
-                if 'Source' in df.columns:
-                    sources = df['Source'].value_counts()
+                if 'Source' in report['columns']:
                     print(f"   🔍 Sources:")
-                    for source, count in sources.items():
+                    for source, count in report['by_source'].items():
                         print(f"      - {source}: {count}")
                 
                 # Montrer quelques exemples
                 print(f"   🎯 Exemples de données:")
-                sample_df = df.head(2)
-                for idx, row in sample_df.iterrows():
+                for row in report['examples']:
                     name = row.get('Nom', 'N/A')
                     lat = row.get('Latitude', 'N/A')
                     lon = row.get('Longitude', 'N/A')
@@ -0,0 +1,268 @@
+#!/usr/bin/env python3
+"""
+API HTTP en lecture seule sur le jeu de données des points de vente :
+requêtes par bounding box, zone, catégorie et statut, pagination par clé,
+réponses JSON / GeoJSON compressées et ETag lié à la version des données
+"""
+
+import argparse
+import gzip
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import numpy as np
+
+from dataset import current_dataset, load_dataset
+from export import geojson_features, json_lines
+from filter_index import FilterIndex
+from spatial_index import GridIndex
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+DEFAULT_LIMIT = 500
+MAX_LIMIT = 5000
+GZIP_MIN_BYTES = 1024
+GZIP_LEVEL = 5
+RESPONSE_CACHE_SIZE = 512
+RELOAD_CHECK_S = 5.0  # intervalle de vérification d'un nouvel instantané
+
+# Paramètre de requête -> colonne filtrée (valeurs répétables : ?zone=A&zone=B)
+QUERY_FILTERS = {"statut": "Statut", "categorie": "Catégorie", "zone": "Zone"}
+FORMATS = {"json": "application/json", "geojson": "application/geo+json"}
+
+class ApiError(Exception):
+    """Requête invalide (réponse 400)"""
+
+class DatasetState:
+    """Données servies, chargées une fois par version : index de filtrage,
+    index spatial et lignes déjà sérialisées (JSON et GeoJSON).
+
+    Une réponse n'est qu'une concaténation des lignes sélectionnées.
+    """
+
+    def __init__(self, df, version):
+        self.version = version
+        self.size = len(df)
+        self.filters = FilterIndex(df)
+        self.grid = GridIndex.from_frame(df)
+        ids = np.arange(self.size)
+        properties = [column for column in df.columns if column not in ('Latitude', 'Longitude')]
+        self.records = [f'{{"id": {i}, {record[1:]}' for i, record in zip(ids, json_lines(df, list(df.columns)))]
+        self.features = geojson_features(df, properties, ids=ids)
+
+    @classmethod
+    def load(cls):
+        # Données servies en lecture seule : colonnes numériques sans copie
+        df, version = load_dataset(copy=False)
+        return cls(df, version)
+
+    def select(self, params):
+        """Positions (triées) des lignes correspondant aux filtres et à la bbox"""
+        filters = {column: values for key, column in QUERY_FILTERS.items() if (values := params.get(key))}
+        mask = self.filters.mask(filters) if filters else None
+        if "bbox" in params:
+            south, west, north, east = parse_bbox(params["bbox"][-1])
+            return self.grid.query_bbox(south, west, north, east, mask=mask)
+        return np.arange(self.size) if mask is None else np.flatnonzero(mask)
+
+def parse_bbox(text):
+    """bbox=sud,ouest,nord,est (degrés)"""
+    try:
+        south, west, north, east = (float(v) for v in text.split(","))
+    except ValueError:
+        raise ApiError("bbox attendu : sud,ouest,nord,est") from None
+    if south > north or west > east:
+        raise ApiError("bbox invalide : sud > nord ou ouest > est")
+    return south, west, north, east
+
+def parse_int(params, key, default, minimum, maximum):
+    try:
+        value = int(params[key][-1]) if key in params else default
+    except ValueError:
+        raise ApiError(f"{key} doit être un entier") from None
+    return max(minimum, min(value, maximum))
+
+def paginate(positions, after, limit):
+    """Page suivant la clé `after` (position de la dernière ligne reçue) ;
+    retourne (page, clé suivante ou None). Stable tant que la version ne change pas."""
+    start = np.searchsorted(positions, after, side='right') if after is not None else 0
+    page = positions[start:start + limit]
+    has_more = start + limit < len(positions)
+    return page, (int(page[-1]) if has_more else None)
+
+def etag_for(version, path, params):
+    """ETag : empreinte de la version du jeu de données et de la requête normalisée"""
+    normalized = json.dumps([version, path, sorted((k, sorted(v)) for k, v in params.items())],
+                            ensure_ascii=False)
+    return '"' + hashlib.sha1(normalized.encode('utf-8')).hexdigest()[:20] + '"'
+
+class PointsApi:
+    """Logique de l'API, indépendante du serveur HTTP : (chemin, paramètres) ->
+    (statut, type, corps). Les réponses sont mises en cache par ETag."""
+
+    def __init__(self, state=None, reload_check=RELOAD_CHECK_S):
+        self.state = state or DatasetState.load()
+        self.reload_check = reload_check
+        self.last_check = time.monotonic()
+        self.lock = threading.Lock()
+        self.cache = OrderedDict()
+
+    def refresh(self):
+        """Recharge les données si un nouvel instantané a été publié (vérifié au plus toutes les reload_check s)"""
+        if not self.reload_check or time.monotonic() - self.last_check < self.reload_check:
+            return
+        with self.lock:
+            if time.monotonic() - self.last_check < self.reload_check:
+                return
+            self.last_check = time.monotonic()
+            try:
+                _, version = current_dataset()
+            except FileNotFoundError:
+                return
+            if version == self.state.version:
+                return
+        state = DatasetState.load()
+        with self.lock:
+            # Bascule atomique : les requêtes en cours gardent l'ancien état
+            self.state = state
+            self.cache.clear()
+        print(f"[INFO] Nouvelle version chargée : {state.version} ({state.size} lignes)")
+
+    def cached(self, etag, build):
+        with self.lock:
+            if etag in self.cache:
+                self.cache.move_to_end(etag)
+                return self.cache[etag]
+        response = build()
+        with self.lock:
+            self.cache[etag] = response
+            while len(self.cache) > RESPONSE_CACHE_SIZE:
+                self.cache.popitem(last=False)
+        return response
+
+    def handle(self, path, params):
+        """Retourne (statut, etag, type de contenu, corps)"""
+        self.refresh()
+        state = self.state
+        routes = {"/points": self.points, "/facets": self.facets, "/health": self.health}
+        if path not in routes:
+            raise LookupError(path)
+        etag = etag_for(state.version, path, params)
+        status, content_type, body = self.cached(etag, lambda: routes[path](state, params))
+        return status, etag, content_type, body
+
+    def points(self, state, params):
+        fmt = params.get("format", ["json"])[-1]
+        if fmt not in FORMATS:
+            raise ApiError(f"format inconnu : {fmt} (json ou geojson)")
+        limit = parse_int(params, "limit", DEFAULT_LIMIT, 1, MAX_LIMIT)
+        after = parse_int(params, "after", None, -1, state.size) if "after" in params else None
+        positions = state.select(params)
+        page, next_key = paginate(positions, after, limit)
+        meta = (f'"version": {json.dumps(state.version)}, "total": {len(positions)}, '
+                f'"count": {len(page)}, "next": {json.dumps(next_key)}')
+        if fmt == "geojson":
+            items = ",".join([state.features[i] for i in page])
+            body = f'{{"type": "FeatureCollection", {meta}, "features": [{items}]}}'
+        else:
+            items = ",".join([state.records[i] for i in page])
+            body = f'{{{meta}, "items": [{items}]}}'
+        return 200, FORMATS[fmt], body.encode('utf-8')
+
+    def facets(self, state, params):
+        filters = {column: values for key, column in QUERY_FILTERS.items() if (values := params.get(key))}
+        body = {"version": state.version, "total": state.filters.count(state.filters.select(filters)),
+                "facets": state.filters.facet_counts(filters)}
+        return 200, FORMATS["json"], json.dumps(body, ensure_ascii=False).encode('utf-8')
+
+    def health(self, state, params):
+        body = {"status": "ok", "version": state.version, "rows": state.size}
+        return 200, FORMATS["json"], json.dumps(body).encode('utf-8')
+
+def compress(body):
+    return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+
+def make_handler(api):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # connexions persistantes (keep-alive)
+        # En-têtes et corps écrits séparément : sans TCP_NODELAY, chaque réponse
+        # attend l'accusé de réception retardé du client (~40 ms)
+        disable_nagle_algorithm = True
+        server_version = "PointsVenteAPI/1.0"
+
+        def do_GET(self):
+            url = urlsplit(self.path)
+            params = parse_qs(url.query)
+            try:
+                status, etag, content_type, body = api.handle(url.path.rstrip("/") or "/", params)
+            except ApiError as e:
+                return self.send_json(400, {"error": str(e)})
+            except LookupError:
+                return self.send_json(404, {"error": f"ressource inconnue : {url.path}",
+                                            "routes": ["/points", "/facets", "/health"]})
+            except Exception as e:
+                print(f"[ERROR] {self.path}: {e}")
+                return self.send_json(500, {"error": "erreur interne"})
+            if etag in [tag.strip() for tag in self.headers.get("If-None-Match", "").split(",")]:
+                self.send_response(304)
+                self.send_header("ETag", etag)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            gzipped = len(body) >= GZIP_MIN_BYTES and "gzip" in self.headers.get("Accept-Encoding", "")
+            if gzipped:
+                body = api.cached(etag + "-gzip", lambda: compress(body))
+            self.send_response(status)
+            self.send_header("Content-Type", f"{content_type}; charset=utf-8")
+            self.send_header("ETag", etag)
+            self.send_header("Cache-Control", "no-cache")
+            self.send_header("Vary", "Accept-Encoding")
+            if gzipped:
+                self.send_header("Content-Encoding", "gzip")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def send_json(self, status, payload):
+            body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass  # pas de journal par requête (coûteux sous charge)
+
+    return Handler
+
+def run_server(host=DEFAULT_HOST, port=DEFAULT_PORT, api=None):
+    api = api or PointsApi()
+    server = ThreadingHTTPServer((host, port), make_handler(api))
+    server.daemon_threads = True
+    print(f"[INFO] API des points de vente sur http://{host}:{server.server_address[1]} "
+          f"(version {api.state.version}, {api.state.size} lignes)")
+    return server
+
+def main():
+    """Fonction principale"""
+    parser = argparse.ArgumentParser(description="API HTTP en lecture seule sur les points de vente")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    args = parser.parse_args()
+
+    server = run_server(args.host, args.port)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n[INFO] Arrêt de l'API")
+    finally:
+        server.server_close()
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,10 @@
 import pandas as pd
 import time
 import os
+import argparse
+import geocode_utils
+import telemetry
+from checkpoint import open_checkpoint, append_jsonl, read_jsonl
 from geocode_utils import get_zone
 
 # --- Icônes ---
@@ -39,61 +43,115 @@ categories = {
     "Auchan": ("Supermarché", "Formel")
 }
 
-data_atp = []
-
 # Liste des enseignes alimentaires ATP disponibles au Maroc avec coordonnées simulées
+enseignes_data = {
+    "Carrefour": [(33.5890, -7.6320, "Maarif"), (33.5650, -7.6700, "Californie")],
+    "Marjane": [(33.5440, -7.6400, "Californie"), (33.6050, -7.5200, "Ain Sebaa")],
+    "BIM": [(33.5820, -7.6050, "Gauthier"), (33.5700, -7.6300, "Hay Hassani")],
+    "Acima": [(33.5950, -7.6180, "Centre-Ville"), (33.5780, -7.6550, "Bourgogne")],
+    "LabelVie": [(33.5920, -7.6600, "Anfa")],
+    "McDonald's": [(33.5970, -7.6650, "Ain Diab")],
+    "KFC": [(33.5880, -7.6250, "Maarif")],
+    "Amoud": [(33.5750, -7.6150, "Oasis")],
+    "La Vie Claire": [(33.5900, -7.6400, "Racine")],
+    "Auchan": [(33.6150, -7.5300, "Sidi Bernoussi")],
+}
+
+def load_geocode_journal(resume=False):
+    """Ouvre le journal de géocodage ; retourne (chemin, {(lat, lon): zone} déjà résolus)"""
+    # Serveur compris : une reprise ne mélange pas géocodages réels et simulés (osm_standin.py)
+    params = {"service": "nominatim", "url": geocode_utils.service_url(), "language": "fr"}
+    checkpoint_dir = open_checkpoint("atp_geocode", params, resume=resume)
+    journal = os.path.join(checkpoint_dir, "geocode.jsonl")
+    done = {(r["lat"], r["lon"]): r["zone"] for r in read_jsonl(journal)}
+    if done:
+        print(f"[INFO] {len(done)} points deja geocodes repris du journal")
+    return journal, done
+
+def geocode_point(lat, lon, journal, done):
+    """Géocode un point sauf s'il est déjà dans le journal ; retourne (zone, appel_reseau)"""
+    if (lat, lon) in done:
+        return done[(lat, lon)], False
+    zone = get_zone(lat, lon)
+    # Les échecs ("N/A") ne sont pas journalisés pour être retentés à la reprise
+    if zone != "N/A":
+        append_jsonl(journal, {"lat": lat, "lon": lon, "zone": zone})
+        done[(lat, lon)] = zone
+    return zone, True
 
+def build_atp_records(resume=False):
+    """Construit les enregistrements ATP simulés (géocodage inversé des zones)"""
+    data_atp = []
+    journal, done = load_geocode_journal(resume)
 
-print("[INFO] Generation des donnees ATP simulees...")
+    for brand, locations in enseignes_data.items():
+        cat, statut = categories.get(brand, ("Supermarché", "Formel"))
+        image = images.get(cat, "Aucune image")
+        
+        for i, (lat, lon, quartier) in enumerate(locations):
+            zone, fetched = geocode_point(lat, lon, journal, done)
+            data_atp.append({
+                "Zone": zone,
+                "Nom": f"{brand} {quartier}",
+                "Catégorie": cat,
+                "Statut": statut,
+                "Adresse": f"Avenue {quartier}, Casablanca",
+                "Latitude": lat,
+                "Longitude": lon,
+                "Image": image
+            })
+            if fetched:
+                time.sleep(0.5)  # Petit délai pour le géocodage
 
-for brand, locations in enseignes_data.items():
-    cat, statut = categories.get(brand, ("Supermarché", "Formel"))
-    image = images.get(cat, "Aucune image")
-    
-    for i, (lat, lon, quartier) in enumerate(locations):
-        zone = get_zone(lat, lon)
+    # Ajout d'autres enseignes avec données simulées
+    autres_enseignes = ["Paul", "Brioche Dorée", "Domino's Pizza", "Starbucks", "Subway", "Pizza Hut"]
+    for i, brand in enumerate(autres_enseignes):
+        cat, statut = categories.get(brand, ("Restaurant", "Formel"))
+        image = images.get(cat, "Aucune image")
+        
+        # Coordonnées simulées autour de Casablanca
+        lat = 33.5731 + (i * 0.01) - 0.02
+        lon = -7.5898 + (i * 0.008) - 0.02
+        zone, _ = geocode_point(lat, lon, journal, done)
+        
         data_atp.append({
             "Zone": zone,
-            "Nom": f"{brand} {quartier}",
+            "Nom": f"{brand} Casablanca Centre",
             "Catégorie": cat,
             "Statut": statut,
-            "Adresse": f"Avenue {quartier}, Casablanca",
+            "Adresse": f"Centre Commercial, Casablanca",
             "Latitude": lat,
             "Longitude": lon,
             "Image": image
         })
-        time.sleep(0.5)  # Petit délai pour le géocodage
+    return data_atp
 
-# Ajout d'autres enseignes avec données simulées
-autres_enseignes = ["Paul", "Brioche Dorée", "Domino's Pizza", "Starbucks", "Subway", "Pizza Hut"]
-for i, brand in enumerate(autres_enseignes):
-    cat, statut = categories.get(brand, ("Restaurant", "Formel"))
-    image = images.get(cat, "Aucune image")
-    
-    # Coordonnées simulées autour de Casablanca
-    lat = 33.5731 + (i * 0.01) - 0.02
-    lon = -7.5898 + (i * 0.008) - 0.02
-    zone = get_zone(lat, lon)
-    
-    data_atp.append({
-        "Zone": zone,
-        "Nom": f"{brand} Casablanca Centre",
-        "Catégorie": cat,
-        "Statut": statut,
-        "Adresse": f"Centre Commercial, Casablanca",
-        "Latitude": lat,
-        "Longitude": lon,
-        "Image": image
-    })
+def generate_atp_data(resume=False):
+    """Génère les données ATP simulées (avec géocodage des zones)"""
+    print("[INFO] Generation des donnees ATP simulees...")
+
+    with telemetry.track("geocode") as record:
+        data_atp = build_atp_records(resume=resume)
+        record["rows_out"] = len(data_atp)
+
+    df_atp = pd.DataFrame(data_atp)
 
-df_atp = pd.DataFrame(data_atp)
+    # Gestion des erreurs de permission pour l'écriture du fichier
+    output_file = "points_vente_casablanca_atp.csv"
+    with telemetry.track("write", rows_in=len(df_atp)) as record:
+        try:
+            df_atp.to_csv(output_file, index=False, encoding='utf-8-sig')
+            print(f"[SUCCESS] ATP : {len(df_atp)} points generes dans {output_file}")
+        except PermissionError:
+            output_file = f"points_vente_casablanca_atp_{int(time.time())}.csv"
+            df_atp.to_csv(output_file, index=False, encoding='utf-8-sig')
+            print(f"[SUCCESS] ATP : {len(df_atp)} points generes dans {output_file}")
+        record["rows_out"] = len(df_atp)
+    return df_atp
 
-# Gestion des erreurs de permission pour l'écriture du fichier
-output_file = "points_vente_casablanca_atp.csv"
-try:
-    df_atp.to_csv(output_file, index=False, encoding='utf-8-sig')
-    print(f"[SUCCESS] ATP : {len(df_atp)} points generes dans {output_file}")
-except PermissionError:
-    output_file = f"points_vente_casablanca_atp_{int(time.time())}.csv"
-    df_atp.to_csv(output_file, index=False, encoding='utf-8-sig')
-    print(f"[SUCCESS] ATP : {len(df_atp)} points generes dans {output_file}")
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Génération des données ATP simulées")
+    parser.add_argument("--resume", action="store_true",
+                        help="Ne regéocode pas les points déjà résolus lors d'une exécution précédente")
+    args = parser.parse_args()
+    generate_atp_data(resume=args.resume)
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Benchmark de la carte Formel/Informel : construction marqueur par marqueur
+(folium.Marker + Icon + Popup, implémentation d'origine) contre couches
+compactes par statut (analyze_formal_informal.build_formal_informal_map).
+Mesure le temps de génération du HTML et sa taille.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import tempfile
+import time
+
+import pandas as pd
+
+from analytics import category_sector
+from analyze_formal_informal import LEGEND_HTML, STATUS_MAP_COLORS, build_formal_informal_map
+
+def build_marker_map(df):
+    """Implémentation de référence : un folium.Marker par point (iterrows)"""
+    import folium
+    from folium.plugins import MarkerCluster
+
+    m = folium.Map(location=[33.5731, -7.5898], zoom_start=12)
+    for statut, color in STATUS_MAP_COLORS.items():
+        df_statut = df[df['Statut_Reel'] == statut]
+        if len(df_statut) > 0:
+            cluster = MarkerCluster(name=f"{statut} ({len(df_statut)} points)")
+            for _, row in df_statut.iterrows():
+                if pd.notna(row['Latitude']) and pd.notna(row['Longitude']):
+                    popup_text = f"""
+                    <b>{row['Nom']}</b><br>
+                    Catégorie: {row['Catégorie']}<br>
+                    Statut: {row['Statut_Reel']}<br>
+                    Adresse: {row.get('Adresse', 'N/A')}
+                    """
+                    folium.Marker(
+                        location=[row['Latitude'], row['Longitude']],
+                        popup=folium.Popup(popup_text, max_width=300),
+                        tooltip=f"{row['Nom']} ({statut})",
+                        icon=folium.Icon(color=color, icon='info-sign')
+                    ).add_to(cluster)
+            cluster.add_to(m)
+    folium.LayerControl().add_to(m)
+    m.get_root().html.add_child(folium.Element(LEGEND_HTML))
+    return m
+
+BUILDERS = {
+    "marqueurs": build_marker_map,
+    "couches compactes": build_formal_informal_map,
+}
+
+def measure(builder, df, repeat):
+    """Temps médian (construction + écriture du HTML) et taille du fichier"""
+    times = []
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "carte.html")
+        for _ in range(repeat):
+            start = time.perf_counter()
+            builder(df).save(path)
+            times.append(time.perf_counter() - start)
+        size = os.path.getsize(path)
+    return {"seconds": statistics.median(times), "bytes": size}
+
+def run_benchmark(df, repeat=3):
+    df = df.assign(Statut_Reel=category_sector(df['Catégorie']))
+    return {name: measure(builder, df, repeat) for name, builder in BUILDERS.items()}
+
+def format_results(results, points):
+    reference = results["marqueurs"]
+    lines = [f"{'Méthode':<20} {'Temps':>10} {'Taille':>12}"]
+    for name, result in results.items():
+        lines.append(f"{name:<20} {result['seconds']:>9.2f}s {result['bytes'] / 1024:>9.0f} Ko"
+                     f"  (x{reference['seconds'] / result['seconds']:.1f} plus rapide,"
+                     f" x{reference['bytes'] / result['bytes']:.1f} plus léger)")
+    return f"{points} points\n" + "\n".join(lines)
+
+def main():
+    """Fonction principale"""
+    parser = argparse.ArgumentParser(description="Benchmark de la génération de la carte Formel/Informel")
+    parser.add_argument("--dataset", help="CSV source (par défaut : jeu de données courant)")
+    parser.add_argument("--repeat", type=int, default=3, help="Générations par méthode (médiane)")
+    parser.add_argument("--json", help="Écrit les résultats dans ce fichier JSON")
+    args = parser.parse_args()
+
+    if args.dataset:
+        path = args.dataset
+    else:
+        from dataset import current_dataset
+        path, _ = current_dataset()
+    df = pd.read_csv(path)
+    print(f"🗺️ BENCHMARK CARTE FORMEL/INFORMEL - {path}")
+    results = run_benchmark(df, args.repeat)
+    print(format_results(results, len(df)))
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2, ensure_ascii=False)
+        print(f"[SUCCESS] Résultats écrits dans {args.json}")
+
+if __name__ == "__main__":
+    main()
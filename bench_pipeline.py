@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+"""
+Suite de benchmarks du pipeline sur données synthétiques (synthetic_data.py)
+de 1 000 à 10 millions de points : catégorisation OSM, zonage,
+dédoublonnage, fusion des sources, agrégation des rapports et carte
+Formel/Informel. Chaque mesure tourne dans un processus neuf (mémoire
+maximale propre) ; les résultats sont ajoutés à un fichier JSON Lines et
+comparés à l'exécution précédente pour repérer les régressions.
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+import uuid
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+BENCHMARKS = ["categorize", "zones", "dedup", "merge", "aggregation", "map"]
+DEFAULT_SIZES = [1_000, 10_000, 100_000, 1_000_000]
+DATA_DIR = ".bench_data"
+RESULTS_FILE = "bench_results.jsonl"
+MAP_MAX_ROWS = 1_000_000  # au-delà, une carte HTML n'a plus de sens (plusieurs centaines de Mo)
+REGRESSION_RATIO = 1.2    # plus lent de 20 % que l'exécution précédente : signalé
+
+def peak_mb():
+    if resource is None:
+        return 0.0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024 if sys.platform == "darwin" else 1024)
+
+def traced_peak_mb(operation):
+    """Pic d'allocations (Python et numpy) d'une exécution supplémentaire de
+    l'opération, hors données déjà chargées ; non chronométrée (tracemalloc ralentit)"""
+    tracemalloc.start()
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            operation()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak / (1024 * 1024)
+
+def prepare(name, df, workdir):
+    """Prépare les entrées d'un benchmark (hors mesure) ; retourne l'opération mesurée"""
+    if name == "categorize":
+        from osm_complet_scraper import categorize_point
+        from synthetic_data import osm_elements
+        elements = osm_elements(df)
+        return lambda: [categorize_point(element) for element in elements]
+    if name == "zones":
+        from zoning import assign_zones, current_definitions
+        definitions = current_definitions()
+        return lambda: assign_zones(df['Latitude'], df['Longitude'], definitions)
+    if name == "dedup":
+        return lambda: df.drop_duplicates(subset=["Nom", "Latitude", "Longitude"], keep='first')
+    if name == "merge":
+        import merge_data
+        # merge_all_data lit les fichiers OSM / ATP du dossier courant
+        df[df['Source'] == 'OSM'].to_csv(os.path.join(workdir, "points_vente_casablanca_osm.csv"), index=False)
+        df[df['Source'] != 'OSM'].to_csv(os.path.join(workdir, "points_vente_casablanca_atp.csv"), index=False)
+        os.chdir(workdir)
+        return merge_data.merge_all_data
+    if name == "aggregation":
+        from analytics import compute_report
+        return lambda: compute_report(df)
+    if name == "map":
+        from analytics import category_sector
+        from analyze_formal_informal import build_formal_informal_map
+        classified = df.assign(Statut_Reel=category_sector(df['Catégorie']))
+        path = os.path.join(workdir, "carte.html")
+        return lambda: build_formal_informal_map(classified).save(path)
+    raise ValueError(f"Benchmark inconnu: {name}")
+
+def run_worker(name, data_path, repeat):
+    """Exécuté dans le processus neuf : médiane des temps et mémoire maximale"""
+    import pandas as pd
+    df = pd.read_csv(data_path)
+    with tempfile.TemporaryDirectory() as workdir:
+        operation = prepare(name, df, workdir)
+        times = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            # Les fonctions du pipeline affichent leur progression : sortie ignorée
+            with contextlib.redirect_stdout(io.StringIO()):
+                operation()
+            times.append(time.perf_counter() - start)
+        delta = traced_peak_mb(operation)
+        os.chdir(os.path.dirname(os.path.abspath(__file__)))
+    return {"seconds": statistics.median(times), "peak_mb": peak_mb(), "delta_mb": delta}
+
+def measure(name, data_path, repeat):
+    result = subprocess.run([sys.executable, os.path.abspath(__file__), "--worker", name, data_path, str(repeat)],
+                            capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1] if result.stderr.strip() else "échec")
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+def dataset_for(rows, seed, data_dir=DATA_DIR, reference=None):
+    """CSV synthétique de cette taille, généré une fois puis réutilisé"""
+    from synthetic_data import load_profile, write_synthetic
+    os.makedirs(data_dir, exist_ok=True)
+    path = os.path.join(data_dir, f"synthetique_{rows}_{seed}.csv")
+    if not os.path.exists(path):
+        start = time.perf_counter()
+        write_synthetic(path, rows, load_profile(reference), seed=seed)
+        print(f"[INFO] Jeu synthétique de {rows} lignes généré en {time.perf_counter() - start:.1f}s")
+    return path
+
+def git_commit():
+    """Commit courant (None hors dépôt git)"""
+    try:
+        result = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__)))
+        return result.stdout.strip() or None
+    except OSError:
+        return None
+
+def run_suite(benchmarks, sizes, repeat=3, seed=0, reference=None):
+    """Mesure chaque benchmark à chaque taille ; retourne les enregistrements"""
+    import pandas as pd
+    run = {
+        "run_id": uuid.uuid4().hex[:12],
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+    }
+    records = []
+    for rows in sizes:
+        data_path = dataset_for(rows, seed, reference=reference)
+        for name in benchmarks:
+            record = {**run, "benchmark": name, "rows": rows}
+            if name == "map" and rows > MAP_MAX_ROWS:
+                record["skipped"] = f"plus de {MAP_MAX_ROWS} lignes"
+            else:
+                try:
+                    result = measure(name, data_path, repeat)
+                    record.update(result, rows_per_s=rows / result["seconds"] if result["seconds"] else None)
+                except RuntimeError as e:
+                    record["error"] = str(e)
+            records.append(record)
+            print(format_record(record))
+    return records
+
+def previous_results(path, run_id):
+    """Dernier résultat de chaque (benchmark, taille) avant l'exécution run_id"""
+    previous = {}
+    if not os.path.exists(path):
+        return previous
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if record.get("run_id") != run_id and "seconds" in record:
+                previous[(record["benchmark"], record["rows"])] = record
+    return previous
+
+def append_results(records, path=RESULTS_FILE):
+    with open(path, 'a', encoding='utf-8') as f:
+        for record in records:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+def format_record(record, previous=None):
+    label = f"{record['benchmark']:<12} {record['rows']:>10}"
+    if "skipped" in record:
+        return f"{label}  ignoré ({record['skipped']})"
+    if "error" in record:
+        return f"{label}  [ERROR] {record['error']}"
+    line = (f"{label} {record['seconds']:>9.3f}s {record['rows_per_s']:>12,.0f} lignes/s "
+            f"{record['peak_mb']:>8.0f}MB (+{record['delta_mb']:.1f})")
+    if previous:
+        ratio = record["seconds"] / previous["seconds"] if previous["seconds"] else 1.0
+        flag = " ⚠️ régression" if ratio > REGRESSION_RATIO else ""
+        line += f"  x{ratio:.2f} vs {previous.get('commit') or previous['run_id']}{flag}"
+    return line
+
+def main():
+    """Fonction principale"""
+    if len(sys.argv) > 1 and sys.argv[1] == "--worker":
+        name, data_path, repeat = sys.argv[2], sys.argv[3], int(sys.argv[4])
+        print(json.dumps(run_worker(name, data_path, repeat)))
+        return
+
+    parser = argparse.ArgumentParser(description="Benchmarks du pipeline sur données synthétiques")
+    parser.add_argument("--benchmark", action="append", choices=BENCHMARKS,
+                        help="Benchmark à lancer (par défaut : tous)")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES,
+                        help="Tailles des jeux synthétiques (jusqu'à 10 000 000)")
+    parser.add_argument("--repeat", type=int, default=3, help="Mesures par benchmark (médiane)")
+    parser.add_argument("--seed", type=int, default=0, help="Graine des jeux synthétiques")
+    parser.add_argument("--reference", help="CSV de référence du générateur (par défaut : jeu de données courant)")
+    parser.add_argument("--results", default=RESULTS_FILE, help="Fichier JSON Lines des résultats (complété)")
+    args = parser.parse_args()
+
+    print(f"⏱️ BENCHMARKS DU PIPELINE - tailles {', '.join(map(str, args.sizes))}")
+    records = run_suite(args.benchmark or BENCHMARKS, args.sizes, args.repeat, args.seed, args.reference)
+    previous = previous_results(args.results, records[0]["run_id"]) if records else {}
+    append_results(records, args.results)
+    if previous:
+        print("\n📈 COMPARAISON AVEC L'EXÉCUTION PRÉCÉDENTE")
+        for record in records:
+            print(format_record(record, previous.get((record["benchmark"], record["rows"]))))
+    print(f"[SUCCESS] {len(records)} résultats ajoutés à {args.results}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Mesure du démarrage à froid du tableau de bord : pour chaque page, un
+processus neuf exécute streamlit_app.py sans navigateur (AppTest) et
+relève le temps de rendu, la mémoire maximale et les modules lourds chargés
+"""
+
+import argparse
+import ast
+import json
+import statistics
+import subprocess
+import sys
+
+APP_FILE = "streamlit_app.py"
+HEAVY_MODULES = ["folium", "branca", "streamlit_folium", "plotly"]
+
+# Exécuté dans un processus neuf : argv = fichier de l'application, page
+PROBE = r"""
+import json, resource, sys, time
+
+def peak_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024 if sys.platform == "darwin" else 1024)
+
+start = time.perf_counter()
+from streamlit.testing.v1 import AppTest
+streamlit_import = time.perf_counter() - start
+streamlit_memory = peak_mb()
+
+app = AppTest.from_file(sys.argv[1], default_timeout=300)
+app.session_state["page"] = sys.argv[2]
+start = time.perf_counter()
+app.run()
+render = time.perf_counter() - start
+print(json.dumps({
+    "streamlit_import": streamlit_import,
+    "render": render,
+    "total": streamlit_import + render,
+    "streamlit_memory_mb": streamlit_memory,
+    "peak_memory_mb": peak_mb(),
+    "heavy_modules": sorted(m for m in json.loads(sys.argv[3]) if m in sys.modules),
+    "errors": [str(e.value) for e in app.exception],
+}))
+"""
+
+def page_labels(app_file=APP_FILE):
+    """Libellés des pages, lus dans le dictionnaire PAGES sans exécuter l'application"""
+    with open(app_file, 'r', encoding='utf-8') as f:
+        tree = ast.parse(f.read())
+    for node in tree.body:
+        if isinstance(node, ast.Assign) and any(getattr(t, "id", None) == "PAGES" for t in node.targets):
+            return [ast.literal_eval(key) for key in node.value.keys]
+    raise ValueError(f"Dictionnaire PAGES introuvable dans {app_file}")
+
+def measure_page(page, app_file=APP_FILE):
+    """Démarrage à froid d'une page dans un processus neuf"""
+    result = subprocess.run([sys.executable, "-c", PROBE, app_file, page, json.dumps(HEAVY_MODULES)],
+                            capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1] if result.stderr.strip() else "échec")
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+def run_benchmark(pages, repeat=3, app_file=APP_FILE):
+    """Médiane des temps et maximum de la mémoire sur repeat démarrages par page"""
+    results = {}
+    for page in pages:
+        runs = [measure_page(page, app_file) for _ in range(repeat)]
+        results[page] = {
+            "render_s": statistics.median(r["render"] for r in runs),
+            "total_s": statistics.median(r["total"] for r in runs),
+            "app_memory_mb": max(r["peak_memory_mb"] - r["streamlit_memory_mb"] for r in runs),
+            "peak_memory_mb": max(r["peak_memory_mb"] for r in runs),
+            "heavy_modules": runs[-1]["heavy_modules"],
+            "errors": runs[-1]["errors"],
+        }
+    return results
+
+def format_results(results):
+    lines = [f"{'Page':<32} {'Rendu':>8} {'Total':>8} {'Mém. app':>9} {'Mém. max':>9}  Modules lourds"]
+    for page, r in results.items():
+        lines.append(f"{page:<32} {r['render_s']:>7.2f}s {r['total_s']:>7.2f}s "
+                     f"{r['app_memory_mb']:>7.0f}MB {r['peak_memory_mb']:>7.0f}MB  "
+                     f"{', '.join(r['heavy_modules']) or '-'}")
+        for error in r["errors"]:
+            lines.append(f"    [ERROR] {error}")
+    return "\n".join(lines)
+
+def main():
+    """Fonction principale"""
+    parser = argparse.ArgumentParser(description="Benchmark du démarrage à froid par page du tableau de bord")
+    parser.add_argument("--app", default=APP_FILE, help="Fichier de l'application Streamlit")
+    parser.add_argument("--page", action="append", help="Page à mesurer (par défaut : toutes)")
+    parser.add_argument("--repeat", type=int, default=3, help="Démarrages par page (médiane)")
+    parser.add_argument("--json", help="Écrit les résultats dans ce fichier JSON")
+    args = parser.parse_args()
+
+    pages = args.page or page_labels(args.app)
+    print(f"⏱️ DÉMARRAGE À FROID - {len(pages)} pages, {args.repeat} essais chacune")
+    results = run_benchmark(pages, repeat=args.repeat, app_file=args.app)
+    print(format_results(results))
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2, ensure_ascii=False)
+        print(f"[SUCCESS] Résultats écrits dans {args.json}")
+
+if __name__ == "__main__":
+    main()
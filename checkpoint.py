@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Points de reprise durables pour les collectes longues (tuiles Overpass,
+géocodage) : chaque unité terminée est écrite de façon atomique
+"""
+
+import hashlib
+import json
+import os
+import shutil
+
+CHECKPOINT_ROOT = ".checkpoints"
+
+def atomic_write_json(path, data):
+    """Écrit un JSON via fichier temporaire + fsync + rename (jamais de fichier à moitié écrit)"""
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+def append_jsonl(path, record):
+    """Ajoute un enregistrement à un journal JSON lines, synchronisé sur disque"""
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        f.flush()
+        os.fsync(f.fileno())
+
+def read_jsonl(path):
+    """Relit un journal ; une dernière ligne tronquée (arrêt brutal) est ignorée"""
+    if not os.path.exists(path):
+        return []
+    records = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                records.append(json.loads(line))
+            except json.JSONDecodeError:
+                break
+    return records
+
+def open_checkpoint(name, params, resume=False, root=CHECKPOINT_ROOT):
+    """Prépare le dossier de reprise d'une collecte et retourne son chemin.
+
+    Sans reprise (ou si les paramètres de collecte ont changé), les points de
+    reprise précédents sont effacés. Avec reprise, ils sont conservés.
+    """
+    directory = os.path.join(root, name)
+    manifest_path = os.path.join(directory, "manifest.json")
+    fingerprint = hashlib.sha256(json.dumps(params, sort_keys=True).encode('utf-8')).hexdigest()
+
+    if resume and os.path.exists(manifest_path):
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+        if manifest.get("fingerprint") == fingerprint:
+            print(f"[INFO] Reprise de '{name}' depuis {directory}")
+            return directory
+        print(f"[WARNING] Paramètres de '{name}' modifiés : reprise impossible, redémarrage")
+    elif resume:
+        print(f"[INFO] Aucun point de reprise pour '{name}', démarrage complet")
+
+    if os.path.exists(directory):
+        shutil.rmtree(directory)
+    os.makedirs(directory, exist_ok=True)
+    atomic_write_json(manifest_path, {"fingerprint": fingerprint, "params": params})
+    return directory
+
+def unit_path(directory, key):
+    """Chemin du fichier d'une unité de travail (tuile, lot...)"""
+    safe_key = "".join(ch if ch.isalnum() or ch in "-_." else "_" for ch in str(key))
+    return os.path.join(directory, f"unit_{safe_key}.json")
+
+def is_done(directory, key):
+    """Vrai si l'unité a déjà été terminée et persistée"""
+    return os.path.exists(unit_path(directory, key))
+
+def save_unit(directory, key, data):
+    """Persiste le résultat d'une unité terminée"""
+    atomic_write_json(unit_path(directory, key), data)
+
+def load_unit(directory, key):
+    """Relit le résultat d'une unité terminée"""
+    with open(unit_path(directory, key), 'r', encoding='utf-8') as f:
+        return json.load(f)
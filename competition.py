@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+"""
+Indicateurs de concurrence et de saturation : pour chaque point, distance
+au concurrent le plus proche de la même catégorie et nombre de concurrents
+à 300 / 500 / 1000 m ; par zone, densité de points au km². Calcul par
+jointure de cellules voisines (pas de boucle sur les paires de points).
+"""
+
+import argparse
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from checkpoint import atomic_write_json
+from density_grid import projection_origin, to_meters
+from proximity import ProximityIndex, cell_join
+
+COMPETITION_SUFFIX = ".competition.json"
+METRICS_SUFFIX = ".competition.npz"
+RADII_M = (300, 500, 1000)
+MAX_PAIRS = 5_000_000  # paires candidates traitées par lot (mémoire bornée)
+MIN_ZONE_AREA_KM2 = 0.25  # surface plancher d'une zone (une cellule de 500 m)
+
+NEAREST_COLUMN = "Concurrent_Proche_m"
+
+def count_column(radius_m):
+    return f"Concurrents_{radius_m}m"
+
+def sidecar_paths(dataset_path):
+    """Chemins du résumé par zone (JSON) et des indicateurs par point (numpy) associés à un CSV"""
+    base = os.path.splitext(dataset_path)[0]
+    return base + COMPETITION_SUFFIX, base + METRICS_SUFFIX
+
+def neighbour_pairs(x, y, radius_m, max_pairs=MAX_PAIRS):
+    """Paires (i, j, distance) de points distincts à moins de radius_m, par lots
+    (jointure par cellules des points avec eux-mêmes)"""
+    for i, j, distance in cell_join(x, y, x, y, radius_m, max_pairs):
+        keep = i != j
+        yield i[keep], j[keep], distance[keep]
+
+def competition_metrics(df, radii=RADII_M):
+    """Indicateurs par point (concurrents = points de la même catégorie).
+
+    Retourne un dict de tableaux alignés sur les lignes : distance au plus
+    proche concurrent (NaN si aucun ou coordonnées invalides) et nombre de
+    concurrents dans chaque rayon.
+    """
+    n = len(df)
+    lat = pd.to_numeric(df['Latitude'], errors='coerce').to_numpy(dtype=float)
+    lon = pd.to_numeric(df['Longitude'], errors='coerce').to_numpy(dtype=float)
+    valid = np.isfinite(lat) & np.isfinite(lon)
+    nearest = np.full(n, np.nan)
+    counts = {radius: np.zeros(n, dtype=np.int32) for radius in radii}
+    if not valid.any():
+        return {NEAREST_COLUMN: nearest, **{count_column(r): c for r, c in counts.items()}}
+
+    origin = projection_origin(lat[valid], lon[valid])
+    x, y = to_meters(lat, lon, origin)
+    codes, _ = pd.factorize(df['Catégorie'])
+    max_radius = max(radii)
+    for code in range(codes.max() + 1):
+        members = np.flatnonzero((codes == code) & valid)
+        if len(members) < 2:
+            continue
+        mx, my = x[members], y[members]
+        best = np.full(len(members), np.inf)
+        for i, _, distance in neighbour_pairs(mx, my, max_radius):
+            np.minimum.at(best, i, distance)
+            for radius in radii:
+                counts[radius][members] += np.bincount(i[distance <= radius], minlength=len(members)).astype(np.int32)
+        # Concurrent le plus proche au-delà du plus grand rayon : recherche k-NN (points isolés, peu nombreux)
+        isolated = np.flatnonzero(~np.isfinite(best))
+        if len(isolated):
+            index = ProximityIndex(lat[members], lon[members], origin=origin)
+            found = index.nearest_batch(np.column_stack([lat[members[isolated]], lon[members[isolated]]]), k=2)
+            # Premier voisin : le point lui-même ; le second est le concurrent le plus proche
+            second = found[found.groupby('requete').cumcount() == 1]
+            best[isolated] = np.nan
+            best[isolated[second['requete'].to_numpy()]] = second['distance_m'].to_numpy()
+        nearest[members] = best
+    return {NEAREST_COLUMN: np.round(nearest, 1), **{count_column(r): c for r, c in counts.items()}}
+
+def hull_area_km2(x, y):
+    """Surface (km²) de l'enveloppe convexe de points en mètres (chaîne monotone)"""
+    points = np.unique(np.column_stack([x, y]), axis=0)
+    if len(points) < 3:
+        return 0.0
+
+    def half(pts):
+        chain = []
+        for px, py in pts:
+            while len(chain) >= 2 and ((chain[-1][0] - chain[-2][0]) * (py - chain[-2][1])
+                                       - (chain[-1][1] - chain[-2][1]) * (px - chain[-2][0])) <= 0:
+                chain.pop()
+            chain.append((px, py))
+        return chain[:-1]
+
+    hull = np.array(half(points) + half(points[::-1]))
+    hx, hy = hull[:, 0], hull[:, 1]
+    return abs(np.dot(hx, np.roll(hy, -1)) - np.dot(hy, np.roll(hx, -1))) / 2 / 1e6
+
+def zone_summary(df, metrics):
+    """Par zone : points, surface (enveloppe convexe, plancher MIN_ZONE_AREA_KM2),
+    points au km², distance médiane au concurrent et concurrents moyens à 500 m"""
+    lat = pd.to_numeric(df['Latitude'], errors='coerce').to_numpy(dtype=float)
+    lon = pd.to_numeric(df['Longitude'], errors='coerce').to_numpy(dtype=float)
+    valid = np.isfinite(lat) & np.isfinite(lon)
+    frame = pd.DataFrame({"Zone": df['Zone'].to_numpy(), **metrics})[valid]
+    if not len(frame):
+        return pd.DataFrame(columns=["Points", "Surface_km2", "Densite_km2"])
+    x, y = to_meters(lat[valid], lon[valid], projection_origin(lat[valid], lon[valid]))
+    frame["x"], frame["y"] = x, y
+    grouped = frame.groupby("Zone", sort=False)
+    summary = grouped.agg(
+        Points=("x", "size"),
+        Distance_Mediane_m=(NEAREST_COLUMN, "median"),
+        Concurrents_500m_Moyen=(count_column(500), "mean"),
+    )
+    areas = {zone: hull_area_km2(group["x"].to_numpy(), group["y"].to_numpy()) for zone, group in grouped}
+    summary.insert(1, "Surface_km2", np.maximum(pd.Series(areas), MIN_ZONE_AREA_KM2).reindex(summary.index))
+    summary.insert(2, "Densite_km2", (summary["Points"] / summary["Surface_km2"]).round(1))
+    return summary.round(1).sort_values("Densite_km2", ascending=False, kind='stable')
+
+def with_metrics(df, metrics):
+    """Copie du DataFrame avec les indicateurs en colonnes supplémentaires"""
+    enriched = df.copy()
+    for column, values in metrics.items():
+        enriched[column] = values
+    return enriched
+
+def write_competition(df, dataset_path, version):
+    """Calcule et écrit (atomiquement) les indicateurs et le résumé par zone"""
+    metrics = competition_metrics(df)
+    zones = zone_summary(df, metrics)
+    summary_path, metrics_path = sidecar_paths(dataset_path)
+    tmp_path = metrics_path + ".tmp.npz"
+    np.savez(tmp_path, **metrics)
+    os.replace(tmp_path, metrics_path)
+    atomic_write_json(summary_path, {"version": version, "zones": zones.reset_index().to_dict(orient="records")})
+    return metrics, zones
+
+def materialize(dataset_path, version=None):
+    """Étape de pipeline : (re)calcule les indicateurs de concurrence d'un CSV"""
+    from dataset import file_version
+    version = version or file_version(dataset_path)
+    _, zones = write_competition(pd.read_csv(dataset_path), dataset_path, version)
+    print(f"[SUCCESS] Indicateurs de concurrence écrits ({len(zones)} zones)")
+    return zones
+
+def load_competition(dataset_path, version, loader=None):
+    """Lit (indicateurs, résumé par zone) si leur version correspond, sinon les recalcule.
+
+    loader() doit retourner le DataFrame (permet de réutiliser un cache) ;
+    par défaut le CSV est relu.
+    """
+    summary_path, metrics_path = sidecar_paths(dataset_path)
+    if os.path.exists(summary_path) and os.path.exists(metrics_path):
+        try:
+            with open(summary_path, 'r', encoding='utf-8') as f:
+                summary = json.load(f)
+            if summary.get("version") == version:
+                with np.load(metrics_path) as data:
+                    metrics = {name: data[name] for name in data.files}
+                return metrics, pd.DataFrame(summary["zones"]).set_index("Zone")
+        except (OSError, ValueError, KeyError):
+            pass
+    df = loader() if loader else pd.read_csv(dataset_path)
+    try:
+        return write_competition(df, dataset_path, version)
+    except OSError:
+        # Dossier en lecture seule : indicateurs gardés en mémoire uniquement
+        metrics = competition_metrics(df)
+        return metrics, zone_summary(df, metrics)
+
+def main():
+    """Fonction principale"""
+    parser = argparse.ArgumentParser(description="Indicateurs de concurrence et de saturation commerciale")
+    parser.add_argument("--dataset", help="CSV source (par défaut : jeu de données courant)")
+    parser.add_argument("--output", help="Écrit le jeu de données enrichi des indicateurs dans ce CSV")
+    args = parser.parse_args()
+
+    if args.dataset:
+        from dataset import file_version
+        path, version = args.dataset, file_version(args.dataset)
+    else:
+        from dataset import current_dataset
+        path, version = current_dataset()
+    df = pd.read_csv(path)
+    metrics, zones = write_competition(df, path, version)
+    print(f"🥊 CONCURRENCE ET SATURATION - {path}")
+    print(zones.head(15).to_string())
+    if args.output:
+        with_metrics(df, metrics).to_csv(args.output, index=False, encoding='utf-8-sig')
+        print(f"[SUCCESS] Jeu de données enrichi écrit dans {args.output}")
+
+if __name__ == "__main__":
+    main()
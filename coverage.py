@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+"""
+Surface de couverture commerciale : pour chaque cellule d'une grille fine,
+nombre de points de chaque catégorie à distance de marche. Les points sont
+comptés par cellule puis convolués avec un disque (FFT), le coût dépend de
+la taille de la grille et non du produit points x cellules. Un classement
+des cellules « en manque » (zones à fort potentiel commercial) en est tiré.
+"""
+
+import argparse
+import json
+import math
+import os
+
+import numpy as np
+import pandas as pd
+
+from checkpoint import atomic_write_json
+from density_grid import projection_origin, to_degrees, to_meters
+
+COVERAGE_SUFFIX = ".coverage.json"
+RASTER_SUFFIX = ".coverage.npz"
+DEFAULT_CELL_M = 100
+WALK_RADIUS_M = 500  # distance de marche (~6 minutes)
+TOP_GAPS = 50
+MIN_ACTIVITY = 5  # points (toutes catégories) à distance de marche pour qu'une cellule soit classée
+
+def sidecar_paths(dataset_path):
+    """Chemins du classement (JSON) et des rasters (numpy) associés à un CSV"""
+    base = os.path.splitext(dataset_path)[0]
+    return base + COVERAGE_SUFFIX, base + RASTER_SUFFIX
+
+def disk_kernel(radius_m, cell_m):
+    """Noyau disque (1 dans le rayon, distance mesurée entre centres de cellules)"""
+    r = int(math.ceil(radius_m / cell_m))
+    offsets = np.arange(-r, r + 1) * cell_m
+    return (np.hypot(offsets[:, None], offsets[None, :]) <= radius_m).astype(float)
+
+def convolve_fft(rasters, kernel):
+    """Convolution (taille « same ») de rasters (k, h, w) par un noyau, par FFT.
+
+    Rembourrage à h + kh - 1 : pas de repliement entre bords opposés. Les
+    comptes étant entiers, le résultat est arrondi.
+    """
+    _, height, width = rasters.shape
+    kh, kw = kernel.shape
+    shape = (height + kh - 1, width + kw - 1)
+    spectrum = np.fft.rfft2(rasters, s=shape) * np.fft.rfft2(kernel, s=shape)
+    full = np.fft.irfft2(spectrum, s=shape)
+    top, left = kh // 2, kw // 2
+    return np.rint(full[:, top:top + height, left:left + width]).astype(np.int32)
+
+def compute_coverage(df, cell_m=DEFAULT_CELL_M, radius_m=WALK_RADIUS_M, origin=None):
+    """Rasters de couverture par catégorie.
+
+    Retourne un dict : catégories, origine et emprise de la grille (mètres),
+    comptes par cellule (k, h, w) et couverture à radius_m (k, h, w). La
+    ligne 0 du raster est au sud.
+    """
+    lat = pd.to_numeric(df['Latitude'], errors='coerce').to_numpy(dtype=float)
+    lon = pd.to_numeric(df['Longitude'], errors='coerce').to_numpy(dtype=float)
+    codes, categories = pd.factorize(df['Catégorie'], sort=True)
+    valid = np.isfinite(lat) & np.isfinite(lon) & (codes >= 0)
+    lat, lon, codes = lat[valid], lon[valid], codes[valid]
+    origin = origin or (projection_origin(lat, lon) if len(lat) else (0.0, 0.0))
+    x, y = to_meters(lat, lon, origin)
+    # Emprise des points élargie du rayon : la couverture déborde autour des points
+    margin = radius_m + cell_m
+    x0 = (np.floor((x.min() - margin) / cell_m) * cell_m) if len(x) else 0.0
+    y0 = (np.floor((y.min() - margin) / cell_m) * cell_m) if len(y) else 0.0
+    width = int(np.ceil(((x.max() + margin) - x0) / cell_m)) if len(x) else 1
+    height = int(np.ceil(((y.max() + margin) - y0) / cell_m)) if len(y) else 1
+    col = ((x - x0) // cell_m).astype(np.int64)
+    row = ((y - y0) // cell_m).astype(np.int64)
+    n_categories = len(categories)
+    counts = np.bincount((codes * height + row) * width + col,
+                         minlength=n_categories * height * width).reshape(n_categories, height, width)
+    kernel = disk_kernel(radius_m, cell_m)
+    covered = convolve_fft(counts.astype(float), kernel) if n_categories else counts.astype(np.int32)
+    return {
+        "categories": [str(c) for c in categories],
+        "origin": list(origin),
+        "cell_m": cell_m,
+        "radius_m": radius_m,
+        "x0": float(x0),
+        "y0": float(y0),
+        "counts": counts.astype(np.int32),
+        "coverage": covered,
+    }
+
+def cell_centers(raster, rows, cols):
+    """(lat, lon) des centres de cellules"""
+    x = raster["x0"] + (np.asarray(cols) + 0.5) * raster["cell_m"]
+    y = raster["y0"] + (np.asarray(rows) + 0.5) * raster["cell_m"]
+    return to_degrees(x, y, raster["origin"])
+
+def raster_bounds(raster):
+    """[[sud, ouest], [nord, est]] de la grille (pour une superposition d'image)"""
+    _, height, width = raster["coverage"].shape
+    south, west = to_degrees(raster["x0"], raster["y0"], raster["origin"])
+    north, east = to_degrees(raster["x0"] + width * raster["cell_m"], raster["y0"] + height * raster["cell_m"],
+                             raster["origin"])
+    return [[float(south), float(west)], [float(north), float(east)]]
+
+def gap_ranking(raster, top=TOP_GAPS, min_activity=MIN_ACTIVITY):
+    """Cellules les plus en manque, toutes catégories confondues.
+
+    Attendu d'une catégorie dans une cellule : activité commerciale à
+    distance de marche (toutes catégories) x part de la catégorie dans la
+    ville. Manque = attendu - couverture réelle ; seules les cellules assez
+    actives (min_activity) sont classées, une cellule n'apparaît qu'une fois
+    (sa catégorie la plus en manque) et deux cellules retenues sont
+    distantes de plus du rayon de marche.
+    """
+    coverage = raster["coverage"].astype(float)
+    if not coverage.size:
+        return []
+    activity = coverage.sum(axis=0)
+    totals = raster["counts"].sum(axis=(1, 2)).astype(float)
+    shares = totals / max(totals.sum(), 1.0)
+    expected = activity[None] * shares[:, None, None]
+    gap = np.where(activity[None] >= min_activity, expected - coverage, -np.inf)
+    best_category = gap.argmax(axis=0)
+    best_gap = np.take_along_axis(gap, best_category[None], axis=0)[0]
+    flat = np.flatnonzero(best_gap > 0)
+    flat = flat[np.argsort(-best_gap.ravel()[flat], kind='stable')]
+    candidate_rows, candidate_cols = np.unravel_index(flat, best_gap.shape)
+    # Une cellule retenue par rayon de marche : les voisines d'un même manque ne sont pas répétées
+    spacing = raster["radius_m"] / raster["cell_m"]
+    rows, cols = [], []
+    for r, c in zip(candidate_rows, candidate_cols):
+        if len(rows) >= top:
+            break
+        if rows and np.min(np.hypot(np.array(rows) - r, np.array(cols) - c)) <= spacing:
+            continue
+        rows.append(r)
+        cols.append(c)
+    lat, lon = cell_centers(raster, rows, cols)
+    ranking = []
+    for rank, (r, c, la, lo) in enumerate(zip(rows, cols, lat, lon), start=1):
+        k = best_category[r, c]
+        ranking.append({
+            "rang": rank,
+            "lat": round(float(la), 6),
+            "lon": round(float(lo), 6),
+            "categorie": raster["categories"][k],
+            "attendu": round(float(expected[k, r, c]), 1),
+            "present": int(coverage[k, r, c]),
+            "manque": round(float(best_gap[r, c]), 1),
+            "activite": int(activity[r, c]),
+        })
+    return ranking
+
+def write_coverage(df, dataset_path, version):
+    """Calcule et écrit (atomiquement) les rasters et le classement d'un jeu de données"""
+    raster = compute_coverage(df)
+    ranking = gap_ranking(raster)
+    summary_path, raster_path = sidecar_paths(dataset_path)
+    meta = {key: raster[key] for key in ("categories", "origin", "cell_m", "radius_m", "x0", "y0")}
+    tmp_path = raster_path + ".tmp.npz"
+    np.savez_compressed(tmp_path, counts=raster["counts"], coverage=raster["coverage"])
+    os.replace(tmp_path, raster_path)
+    atomic_write_json(summary_path, {"version": version, "grid": meta, "gaps": ranking})
+    return raster, ranking
+
+def materialize(dataset_path, version=None):
+    """Étape de pipeline : (re)calcule la surface de couverture d'un CSV"""
+    from dataset import file_version
+    version = version or file_version(dataset_path)
+    raster, ranking = write_coverage(pd.read_csv(dataset_path), dataset_path, version)
+    _, height, width = raster["coverage"].shape
+    print(f"[SUCCESS] Couverture {height}x{width} cellules de {raster['cell_m']} m, {len(ranking)} cellules en manque classées")
+    return ranking
+
+def load_coverage(dataset_path, version, loader=None):
+    """Lit (rasters, classement) si leur version correspond, sinon les recalcule.
+
+    loader() doit retourner le DataFrame (permet de réutiliser un cache) ;
+    par défaut le CSV est relu.
+    """
+    summary_path, raster_path = sidecar_paths(dataset_path)
+    if os.path.exists(summary_path) and os.path.exists(raster_path):
+        try:
+            with open(summary_path, 'r', encoding='utf-8') as f:
+                summary = json.load(f)
+            if summary.get("version") == version:
+                with np.load(raster_path) as data:
+                    raster = {**summary["grid"], "counts": data["counts"], "coverage": data["coverage"]}
+                return raster, summary["gaps"]
+        except (OSError, ValueError, KeyError):
+            pass
+    df = loader() if loader else pd.read_csv(dataset_path)
+    try:
+        return write_coverage(df, dataset_path, version)
+    except OSError:
+        # Dossier en lecture seule : rasters gardés en mémoire uniquement
+        raster = compute_coverage(df)
+        return raster, gap_ranking(raster)
+
+def coverage_png(raster, category=None):
+    """Image RGBA (PNG) de la couverture d'une catégorie (toutes si None), nord en haut"""
+    from tiles import COLOR_LUT, encode_png
+    coverage = raster["coverage"]
+    values = coverage.sum(axis=0) if category is None else coverage[raster["categories"].index(category)]
+    level = np.sqrt(values / max(values.max(), 1))  # échelle racine : contraste des faibles couvertures
+    rgba = COLOR_LUT[(level * 255).astype(np.uint8)]
+    rgba[values <= 0, 3] = 0
+    return encode_png(np.ascontiguousarray(rgba[::-1]))
+
+def main():
+    """Fonction principale"""
+    parser = argparse.ArgumentParser(description="Surface de couverture commerciale et zones en manque")
+    parser.add_argument("--dataset", help="CSV source (par défaut : jeu de données courant)")
+    parser.add_argument("--top", type=int, default=15, help="Nombre de cellules en manque affichées")
+    args = parser.parse_args()
+
+    if args.dataset:
+        from dataset import file_version
+        path, version = args.dataset, file_version(args.dataset)
+    else:
+        from dataset import current_dataset
+        path, version = current_dataset()
+    raster, ranking = write_coverage(pd.read_csv(path), path, version)
+    _, height, width = raster["coverage"].shape
+    print(f"🧭 COUVERTURE À {raster['radius_m']} M - grille {height}x{width} de {raster['cell_m']} m")
+    for gap in ranking[:args.top]:
+        print(f"#{gap['rang']:<3} ({gap['lat']:.5f}, {gap['lon']:.5f}) {gap['categorie']}: "
+              f"{gap['present']} présents pour {gap['attendu']} attendus (activité {gap['activite']})")
+
+if __name__ == "__main__":
+    main()
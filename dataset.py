@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Accès au jeu de données courant des points de vente : fichier de
+référence ou dernier instantané publié par le service de rafraîchissement
+"""
+
+import glob
+import json
+import os
+import shutil
+import time
+
+import pandas as pd
+
+import competition
+import coverage
+import density_grid
+import point_store
+import quality
+import tiles
+import zoning
+from aggregates import sidecar_path, write_aggregates
+from checkpoint import atomic_write_json
+
+# Fichier de référence lu par le tableau de bord et les rapports
+DATASET_FILE = "points_vente_casablanca_zones_corrigees.csv"
+# Sortie brute du pipeline, utilisée si le fichier de référence n'existe pas
+FALLBACK_FILE = "points_vente_casablanca_complet.csv"
+
+SNAPSHOT_DIR = "snapshots"
+SNAPSHOT_POINTER = os.path.join(SNAPSHOT_DIR, "current.json")
+SNAPSHOTS_KEPT = 3
+
+def file_version(path):
+    """Version d'un fichier : taille + date de modification (sans le relire)"""
+    stat = os.stat(path)
+    return f"{stat.st_size}-{stat.st_mtime_ns}"
+
+def current_dataset():
+    """Retourne (chemin, version) du jeu de données à lire.
+
+    Priorité au dernier instantané publié ; le pointeur est remplacé de
+    façon atomique, un lecteur voit donc toujours un instantané complet.
+    """
+    if os.path.exists(SNAPSHOT_POINTER):
+        try:
+            with open(SNAPSHOT_POINTER, 'r', encoding='utf-8') as f:
+                pointer = json.load(f)
+            if os.path.exists(pointer["path"]):
+                return pointer["path"], pointer["version"]
+        except (OSError, ValueError, KeyError) as e:
+            print(f"[WARNING] Pointeur d'instantané illisible: {e}")
+    for path in (DATASET_FILE, FALLBACK_FILE):
+        if os.path.exists(path):
+            return path, file_version(path)
+    raise FileNotFoundError(DATASET_FILE)
+
+def load_dataset(copy=True):
+    """Charge le jeu de données courant ; retourne (DataFrame, version).
+
+    Lu depuis le stockage en colonnes (memmap) plutôt qu'en analysant le CSV.
+    Avec copy=False, les colonnes numériques restent projetées en mémoire
+    (lecture seule) : pour les lecteurs qui ne modifient pas le DataFrame.
+    """
+    path, version = current_dataset()
+    store = point_store.load_store(path, version, loader=lambda: pd.read_csv(path))
+    return store.to_frame(copy=copy), version
+
+def open_store():
+    """Stockage en colonnes du jeu de données courant (colonnes projetées en mémoire)"""
+    path, version = current_dataset()
+    return point_store.load_store(path, version)
+
+def clear_snapshot_pointer():
+    """Retire le pointeur d'instantané : le fichier de référence (ou la
+    sortie du pipeline) redevient le jeu de données courant.
+
+    Les instantanés restent sur disque pour les lecteurs en cours ; ils
+    sont élagués à la prochaine publication. Retourne True si un pointeur
+    a été retiré.
+    """
+    try:
+        os.remove(SNAPSHOT_POINTER)
+        return True
+    except FileNotFoundError:
+        return False
+
+def publish_snapshot(df):
+    """Écrit un nouvel instantané immuable puis bascule le pointeur dessus.
+
+    Les anciens instantanés sont conservés quelques générations pour ne pas
+    couper un lecteur en cours de lecture.
+    """
+    os.makedirs(SNAPSHOT_DIR, exist_ok=True)
+    now_ns = time.time_ns()
+    version = f"{time.strftime('%Y%m%d-%H%M%S', time.localtime(now_ns // 10**9))}-{now_ns % 10**9:09d}"
+    path = os.path.join(SNAPSHOT_DIR, f"points_{version}.csv")
+    tmp_path = f"{path}.tmp"
+    df.to_csv(tmp_path, index=False, encoding='utf-8-sig')
+    os.replace(tmp_path, path)
+    # Agrégats, grilles, contrôle qualité et stockage en colonnes écrits avant
+    # la bascule : un lecteur les trouve toujours à jour
+    write_aggregates(df, path, version)
+    density_grid.write_density(df, path, version)
+    quality.write_quality(df, path, version)
+    point_store.write_store(df, path, version)
+    tiles.write_tiles(df, version)
+    atomic_write_json(SNAPSHOT_POINTER, {
+        "path": path,
+        "version": version,
+        "rows": len(df),
+        "published_at": time.time(),
+    })
+    for old in sorted(glob.glob(os.path.join(SNAPSHOT_DIR, "points_*.csv")))[:-SNAPSHOTS_KEPT]:
+        if old == path:
+            continue
+        # Concurrence et couverture : calculées à la demande (load_*), supprimées avec l'instantané
+        for stale in (old, sidecar_path(old), density_grid.sidecar_path(old), *quality.sidecar_paths(old),
+                      *competition.sidecar_paths(old), *coverage.sidecar_paths(old), zoning.sidecar_path(old)):
+            try:
+                os.remove(stale)
+            except OSError:
+                pass
+        shutil.rmtree(point_store.store_path(old), ignore_errors=True)
+    return path, version
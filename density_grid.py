@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+"""
+Grilles de densité commerciale (hexagones ou carrés) précalculées : comptes
+par statut et par catégorie et part de l'informel par cellule, écrits dans
+un fichier compagnon lu par le tableau de bord
+"""
+
+import argparse
+import json
+import math
+import os
+
+import numpy as np
+import pandas as pd
+
+from checkpoint import atomic_write_json
+
+DENSITY_SUFFIX = ".density.json"
+SHAPES = ("hex", "square")
+# Grilles précalculées à l'ingestion : (forme, taille de cellule en mètres)
+DENSITY_PRESETS = [("hex", 250), ("hex", 500), ("hex", 1000), ("square", 500)]
+
+METERS_PER_DEG_LAT = 110574.0
+METERS_PER_DEG_LON_EQUATOR = 111320.0
+
+def sidecar_path(dataset_path):
+    """Chemin du fichier de grilles associé à un CSV"""
+    return os.path.splitext(dataset_path)[0] + DENSITY_SUFFIX
+
+def grid_key(shape, cell_m):
+    return f"{shape}-{int(cell_m)}"
+
+def projection_origin(lat, lon):
+    """Origine du plan local (arrondie au dixième de degré pour rester stable d'une version à l'autre)"""
+    return round(float(np.nanmedian(lat)), 1), round(float(np.nanmedian(lon)), 1)
+
+def to_meters(lat, lon, origin):
+    """Projection équirectangulaire locale (x vers l'est, y vers le nord, en mètres)"""
+    meters_per_deg_lon = METERS_PER_DEG_LON_EQUATOR * math.cos(math.radians(origin[0]))
+    return (lon - origin[1]) * meters_per_deg_lon, (lat - origin[0]) * METERS_PER_DEG_LAT
+
+def to_degrees(x, y, origin):
+    meters_per_deg_lon = METERS_PER_DEG_LON_EQUATOR * math.cos(math.radians(origin[0]))
+    return origin[0] + y / METERS_PER_DEG_LAT, origin[1] + x / meters_per_deg_lon
+
+def hex_cells(x, y, cell_m):
+    """Cellules hexagonales (pointe en haut, cell_m entre centres voisins).
+
+    Coordonnées axiales (q, r) par arrondi cubique vectorisé ; retourne
+    (q, r, centre x, centre y).
+    """
+    size = cell_m / math.sqrt(3)  # rayon du cercle circonscrit
+    q = (math.sqrt(3) / 3 * x - y / 3) / size
+    r = (2 / 3 * y) / size
+    s = -q - r
+    rq, rr, rs = np.round(q), np.round(r), np.round(s)
+    dq, dr, ds = np.abs(rq - q), np.abs(rr - r), np.abs(rs - s)
+    fix_q = (dq > dr) & (dq > ds)
+    fix_r = ~fix_q & (dr > ds)
+    rq = np.where(fix_q, -rr - rs, rq)
+    rr = np.where(fix_r, -rq - rs, rr)
+    rq, rr = rq.astype(np.int64), rr.astype(np.int64)
+    return rq, rr, size * math.sqrt(3) * (rq + rr / 2), size * 1.5 * rr
+
+def square_cells(x, y, cell_m):
+    """Cellules carrées de cell_m de côté ; retourne (colonne, ligne, centre x, centre y)"""
+    col = np.floor(x / cell_m).astype(np.int64)
+    row = np.floor(y / cell_m).astype(np.int64)
+    return col, row, (col + 0.5) * cell_m, (row + 0.5) * cell_m
+
+def counts_by(cells, n_cells, codes, labels):
+    """Comptes par (cellule, valeur) à partir de codes factorisés : {valeur: [compte par cellule]}"""
+    known = codes >= 0
+    table = np.bincount(cells[known] * len(labels) + codes[known],
+                        minlength=n_cells * len(labels)).reshape(n_cells, len(labels))
+    return {label: table[:, k].tolist() for k, label in enumerate(labels)}
+
+def compute_grid(df, shape="hex", cell_m=500, origin=None):
+    """Agrège les points par cellule (seules les cellules non vides sont gardées).
+
+    Résultat en colonnes : centres (lat, lon), total, comptes par statut et
+    par catégorie, part de l'informel.
+    """
+    if shape not in SHAPES:
+        raise ValueError(f"Forme de cellule inconnue: {shape}")
+    lat = pd.to_numeric(df['Latitude'], errors='coerce').to_numpy(dtype=float)
+    lon = pd.to_numeric(df['Longitude'], errors='coerce').to_numpy(dtype=float)
+    valid = np.isfinite(lat) & np.isfinite(lon)
+    df, lat, lon = df[valid], lat[valid], lon[valid]
+    origin = origin or (projection_origin(lat, lon) if len(lat) else (0.0, 0.0))
+
+    x, y = to_meters(lat, lon, origin)
+    binning = hex_cells if shape == "hex" else square_cells
+    i, j, center_x, center_y = binning(x, y, cell_m)
+    keys = (i - i.min()) * (int(j.max() - j.min()) + 1) + (j - j.min()) if len(i) else i
+    _, first, cells = np.unique(keys, return_index=True, return_inverse=True)
+    n_cells = len(first)
+    center_lat, center_lon = to_degrees(center_x[first], center_y[first], origin)
+
+    total = np.bincount(cells, minlength=n_cells)
+    status_codes, statuses = pd.factorize(df['Statut'], sort=True)
+    category_codes, categories = pd.factorize(df['Catégorie'], sort=True)
+    cross_codes = np.where((status_codes >= 0) & (category_codes >= 0),
+                           status_codes * len(categories) + category_codes, -1)
+    cross_labels = [f"{s}|{c}" for s in statuses for c in categories]
+    by_status = counts_by(cells, n_cells, status_codes, statuses)
+    informal = np.asarray(by_status.get('Informel', [0] * n_cells))
+    return {
+        "shape": shape,
+        "cell_m": cell_m,
+        "origin": list(origin),
+        "lat": np.round(center_lat, 6).tolist(),
+        "lon": np.round(center_lon, 6).tolist(),
+        "total": total.tolist(),
+        "by_status": by_status,
+        "by_category": counts_by(cells, n_cells, category_codes, categories),
+        # Croisement exact statut x catégorie, clé "statut|catégorie"
+        "by_status_category": counts_by(cells, n_cells, cross_codes, cross_labels),
+        "informal_share": np.round(informal / np.maximum(total, 1), 4).tolist(),
+    }
+
+def compute_density(df, version, presets=DENSITY_PRESETS):
+    """Calcule toutes les grilles précalculées d'un jeu de données"""
+    return {
+        "version": version,
+        "grids": {grid_key(shape, cell_m): compute_grid(df, shape, cell_m) for shape, cell_m in presets},
+    }
+
+def write_density(df, dataset_path, version):
+    """Calcule et écrit (atomiquement) les grilles d'un jeu de données"""
+    density = compute_density(df, version)
+    atomic_write_json(sidecar_path(dataset_path), density)
+    return density
+
+def materialize(dataset_path, version=None):
+    """Étape de pipeline : (re)génère le fichier de grilles d'un CSV"""
+    from dataset import file_version
+    version = version or file_version(dataset_path)
+    density = write_density(pd.read_csv(dataset_path), dataset_path, version)
+    print(f"[SUCCESS] Grilles de densité écrites dans {sidecar_path(dataset_path)} ({len(density['grids'])} grilles)")
+    return density
+
+def load_density(dataset_path, version, loader=None):
+    """Lit les grilles si leur version correspond, sinon les recalcule.
+
+    loader() doit retourner le DataFrame (permet de réutiliser un cache) ;
+    par défaut le CSV est relu.
+    """
+    path = sidecar_path(dataset_path)
+    if os.path.exists(path):
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                density = json.load(f)
+            if density.get("version") == version:
+                return density
+        except (OSError, ValueError):
+            pass
+    df = loader() if loader else pd.read_csv(dataset_path)
+    try:
+        return write_density(df, dataset_path, version)
+    except OSError:
+        # Dossier en lecture seule : grilles gardées en mémoire uniquement
+        return compute_density(df, version)
+
+def grid_values(grid, metric, statut=None, categorie=None):
+    """Valeur à cartographier par cellule.
+
+    metric : "total" (nombre de points, éventuellement restreint à des
+    statuts ou catégories) ou "informal_share" (part de l'informel).
+    """
+    if metric == "informal_share":
+        return np.asarray(grid["informal_share"], dtype=float)
+    n_cells = len(grid["total"])
+    if not statut and not categorie:
+        return np.asarray(grid["total"], dtype=float)
+    if not categorie:
+        series = [grid["by_status"].get(s, []) for s in statut]
+    elif not statut:
+        series = [grid["by_category"].get(c, []) for c in categorie]
+    else:
+        series = [grid["by_status_category"].get(f"{s}|{c}", []) for s in statut for c in categorie]
+    values = np.zeros(n_cells)
+    for counts in series:
+        if len(counts):
+            values += np.asarray(counts, dtype=float)
+    return values
+
+def main():
+    """Fonction principale"""
+    parser = argparse.ArgumentParser(description="Précalcul des grilles de densité")
+    parser.add_argument("--dataset", help="CSV source (par défaut : jeu de données courant)")
+    args = parser.parse_args()
+
+    if args.dataset:
+        materialize(args.dataset)
+    else:
+        from dataset import current_dataset
+        materialize(*current_dataset())
+
+if __name__ == "__main__":
+    main()
@@ -3,85 +3,210 @@
 Script principal pour collecter et fusionner les données de points de vente à Casablanca
 """
 
-import subprocess
-import sys
+import argparse
+import glob
 import os
 import time
 
-def run_script(script_name, description):
-    """Exécute un script Python avec gestion d'erreurs"""
-    print(f"\n{'='*60}")
-    print(f"🚀 {description}")
-    print(f"{'='*60}")
-    
-    try:
-        result = subprocess.run([sys.executable, script_name], 
-                              capture_output=True, 
-                              text=True, 
-                              cwd=os.getcwd())
-        
-        if result.stdout:
-            print(result.stdout)
-        
-        if result.stderr:
-            print("⚠️ Messages d'erreur:")
-            print(result.stderr)
-        
-        if result.returncode == 0:
-            print(f"✅ {script_name} exécuté avec succès!")
-            return True
-        else:
-            print(f"❌ Erreur dans {script_name} (code: {result.returncode})")
-            return False
-            
-    except Exception as e:
-        print(f"❌ Erreur lors de l'exécution de {script_name}: {e}")
-        return False
+import aggregates
+import atp_scraper
+import competition
+import coverage
+import dataset
+import density_grid
+import fusion_data
+import geocode_utils
+import merge_data
+import osm_complet_scraper
+import point_store
+import quality
+import telemetry
+import tiles
+from pipeline import run_pipeline, POLICY_STOP, POLICY_CONTINUE
+
+def build_complet(osm_points):
+    """Fusion OSM + ATP puis écriture du CSV complet ; lève une erreur si rien
+    n'est à écrire (la politique du pipeline décide de la suite)"""
+    df = osm_complet_scraper.build_points_dataframe(osm_points, osm_complet_scraper.load_atp_points())
+    if df is None:
+        raise RuntimeError("Aucun point de vente à enregistrer")
+    output_file = osm_complet_scraper.save_outputs(df)
+    # Un instantané du service de rafraîchissement serait prioritaire sur ce CSV :
+    # on retire le pointeur pour que le tableau de bord lise cette collecte
+    if dataset.clear_snapshot_pointer():
+        print(f"[INFO] Pointeur d'instantané retiré : {output_file} devient le jeu de données courant")
+    return output_file
+
+def services_token():
+    """Services réseau utilisés (Overpass, Nominatim) : un résultat obtenu
+    auprès d'un serveur simulé ne sert pas de cache à une exécution réelle"""
+    return f"{osm_complet_scraper.OVERPASS_URL} {geocode_utils.service_url()}"
+
+def build_stages(resume=False):
+    """Déclare les étapes du pipeline et leurs dépendances"""
+    return [
+        {
+            "name": "atp",
+            "description": "Génération des données ATP (AllThePlaces simulé)",
+            "func": lambda deps: atp_scraper.generate_atp_data(resume=resume),
+            "inputs": ["atp_scraper.py"],
+            # Zones géocodées par Nominatim : le cache dépend du service interrogé
+            "cache_token": services_token(),
+            "outputs": ["points_vente_casablanca_atp.csv"],
+        },
+        {
+            "name": "osm",
+            "description": "Collecte des données OpenStreetMap",
+            "func": lambda deps: osm_complet_scraper.collect_osm_points(resume=resume),
+            # Donnée réseau : toujours collectée, les étapes en aval se basent sur son contenu
+            "cacheable": False,
+        },
+        {
+            "name": "complet",
+            "description": "Fusion OSM + ATP, zonage et dédoublonnage",
+            "func": lambda deps: build_complet(deps["osm"]),
+            "deps": ["osm", "atp"],
+            "inputs": ["points_vente_casablanca_atp.csv"],
+            "outputs": ["points_vente_casablanca_complet.csv", "points_vente_casablanca_complet.html"],
+        },
+        {
+            "name": "aggregates",
+            "description": "Précalcul des agrégats du tableau de bord",
+            "func": lambda deps: aggregates.materialize(deps["complet"]),
+            "deps": ["complet"],
+            "inputs": ["points_vente_casablanca_complet.csv"],
+            "outputs": ["points_vente_casablanca_complet.aggregates.json"],
+        },
+        {
+            "name": "store",
+            "description": "Stockage en colonnes (memmap) partagé entre processus",
+            "func": lambda deps: point_store.materialize(deps["complet"]),
+            "deps": ["complet"],
+            "inputs": ["points_vente_casablanca_complet.csv"],
+            "outputs": [os.path.join("points_vente_casablanca_complet.store", point_store.META_FILE)],
+        },
+        {
+            "name": "quality",
+            "description": "Contrôle qualité (drapeaux par ligne et rapport)",
+            "func": lambda deps: quality.materialize(deps["complet"]),
+            "deps": ["complet"],
+            "inputs": ["points_vente_casablanca_complet.csv"],
+            "outputs": ["points_vente_casablanca_complet.quality.json", "points_vente_casablanca_complet.quality.npy"],
+        },
+        {
+            "name": "density",
+            "description": "Grilles de densité (hexagones, carrés) par statut et catégorie",
+            "func": lambda deps: density_grid.materialize(deps["complet"]),
+            "deps": ["complet"],
+            "inputs": ["points_vente_casablanca_complet.csv"],
+            "outputs": ["points_vente_casablanca_complet.density.json"],
+        },
+        {
+            "name": "competition",
+            "description": "Indicateurs de concurrence par point et saturation par zone",
+            "func": lambda deps: competition.materialize(deps["complet"]),
+            "deps": ["complet"],
+            "inputs": ["points_vente_casablanca_complet.csv"],
+            "outputs": ["points_vente_casablanca_complet.competition.json",
+                        "points_vente_casablanca_complet.competition.npz"],
+        },
+        {
+            "name": "coverage",
+            "description": "Surface de couverture à distance de marche et cellules en manque",
+            "func": lambda deps: coverage.materialize(deps["complet"]),
+            "deps": ["complet"],
+            "inputs": ["points_vente_casablanca_complet.csv"],
+            "outputs": ["points_vente_casablanca_complet.coverage.json",
+                        "points_vente_casablanca_complet.coverage.npz"],
+        },
+        {
+            "name": "tiles",
+            "description": "Pyramide de tuiles de densité (statut, catégorie)",
+            "func": lambda deps: tiles.materialize(deps["complet"]),
+            "deps": ["complet"],
+            "inputs": ["points_vente_casablanca_complet.csv", "tiles.py"],
+            # Tuiles du zoom minimal : témoin de présence de la pyramide (une par version)
+            "outputs": [os.path.join(tiles.TILES_DIR, "*", "all", str(tiles.MIN_ZOOM), "*", "*.png")],
+        },
+        {
+            "name": "fusion",
+            "description": "Fusion des données OSM et ATP",
+            # Points OSM lus dans la sortie de l'étape complet
+            "func": lambda deps: fusion_data.merge_data_sources(deps["complet"]),
+            "deps": ["atp", "complet"],
+            "inputs": ["points_vente_casablanca_complet.csv", "points_vente_casablanca_atp*.csv"],
+            "outputs": ["points_vente_casablanca_final.csv"],
+        },
+        {
+            "name": "merge",
+            "description": "Fusion complète de toutes les données",
+            "func": lambda deps: merge_data.merge_all_data(deps["complet"]),
+            "deps": ["atp", "complet"],
+            # points_vente_casablanca.csv est relu mais réécrit par l'étape (copie de compatibilité) :
+            # déclaré en sortie, une modification externe invalide quand même le cache
+            "inputs": ["points_vente_casablanca_complet.csv", "points_vente_casablanca_atp*.csv",
+                       "points_de_vente_casablanca.csv"],
+            "outputs": ["points_vente_casablanca_merged.csv", "points_vente_casablanca.csv"],
+        },
+    ]
 
 def main():
     """Fonction principale"""
+    parser = argparse.ArgumentParser(description="Pipeline de collecte des points de vente")
+    parser.add_argument("--policy", choices=[POLICY_STOP, POLICY_CONTINUE], default=POLICY_CONTINUE,
+                        help="Comportement en cas d'échec d'une étape")
+    parser.add_argument("--workers", type=int, default=4, help="Nombre d'étapes en parallèle")
+    parser.add_argument("--no-cache", action="store_true", help="Ignore le cache des étapes")
+    parser.add_argument("--resume", action="store_true",
+                        help="Reprend les collectes réseau depuis leurs points de sauvegarde")
+    parser.add_argument("--telemetry", default=telemetry.TELEMETRY_FILE,
+                        help="Fichier JSON lines recevant la télémétrie des étapes")
+    parser.add_argument("--trace-memory", action="store_true",
+                        help="Mesure le pic mémoire par étape (tracemalloc, plus lent)")
+    parser.add_argument("--services", help="Serveur remplaçant Overpass et Nominatim "
+                                           "(ex. http://127.0.0.1:8766, lancé par osm_standin.py)")
+    args = parser.parse_args()
+
     print("🏪 SYSTÈME DE COLLECTE DES POINTS DE VENTE - CASABLANCA")
     print("=" * 65)
-    
+
+    if args.services:
+        # Exécution hors ligne et reproductible : collectes servies par le serveur local
+        osm_complet_scraper.OVERPASS_URL = args.services.rstrip("/") + "/api/interpreter"
+        geocode_utils.use_nominatim(args.services)
+        print(f"[INFO] Services OSM simulés : {args.services}")
+
     start_time = time.time()
-    
-    # Liste des scripts à exécuter
-    scripts = [
-        ("atp_scraper.py", "Génération des données ATP (AllThePlaces simulé)"),
-        ("osm_scraper.py", "Collecte des données OpenStreetMap"),
-        ("fusion_data.py", "Fusion des données OSM et ATP"),
-        ("merge_data.py", "Fusion complète de toutes les données"),
-        ("create_final_map.py", "Génération de la carte interactive")
-    ]
-    
-    success_count = 0
-    
-    for script, description in scripts:
-        if os.path.exists(script):
-            if run_script(script, description):
-                success_count += 1
-                time.sleep(2)  # Pause entre les scripts
-            else:
-                print(f"⚠️ Continuation malgré l'erreur dans {script}")
-        else:
-            print(f"❌ Script {script} non trouvé")
-    
+    run_id = telemetry.start_run(trace_memory=args.trace_memory)
+
+    report = run_pipeline(build_stages(resume=args.resume), policy=args.policy,
+                          max_workers=args.workers, use_cache=not args.no_cache)
+
     # Résumé final
     print(f"\n{'='*60}")
     print("📊 RÉSUMÉ DE L'EXÉCUTION")
     print(f"{'='*60}")
-    print(f"Scripts exécutés avec succès: {success_count}/{len(scripts)}")
+    for name, info in report.items():
+        print(f"   {name:<10} {info['statut']:<10} {info['duree']:.1f}s")
+    success_count = sum(1 for info in report.values() if info['statut'] in ("succès", "cache"))
+    print(f"Étapes exécutées avec succès: {success_count}/{len(report)}")
     print(f"Temps total d'exécution: {time.time() - start_time:.1f} secondes")
-    
+
+    # Télémétrie détaillée (étapes et sous-étapes)
+    print(f"\n⏱️ TÉLÉMÉTRIE (exécution {run_id})")
+    print(telemetry.format_summary())
+    written = telemetry.write_jsonl(args.telemetry)
+    print(f"[INFO] {written} mesures ajoutées à {args.telemetry}")
+
     # Vérifier les fichiers générés
     output_files = [
         "points_vente_casablanca_atp.csv",
-        "points_vente_casablanca_osm_new.csv", 
+        "points_vente_casablanca_complet.csv",
+        "points_vente_casablanca_complet.html",
         "points_vente_casablanca_final.csv",
         "points_vente_casablanca_merged.csv",
-        "points_vente_casablanca_map.html"
     ]
-    
+
     print(f"\n📁 Fichiers générés:")
     for file in output_files:
         if os.path.exists(file):
@@ -89,7 +214,6 @@ def main():
             print(f"   ✅ {file} ({size} bytes)")
         else:
             # Chercher des variants avec timestamp
-            import glob
             variants = glob.glob(file.replace('.csv', '_*.csv'))
             if variants:
                 latest = max(variants, key=os.path.getctime)
@@ -97,8 +221,8 @@ def main():
                 print(f"   ✅ {latest} ({size} bytes)")
             else:
                 print(f"   ❌ {file} non trouvé")
-    
+
     print(f"\n🎉 Processus terminé!")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,317 @@
+#!/usr/bin/env python3
+"""
+Export de la sélection filtrée (CSV, Parquet, GeoJSON, Excel, tableau HTML)
+écrit par lots sur disque, à la demande, et mis en cache par (filtres,
+format, version du jeu de données)
+"""
+
+import gzip
+import hashlib
+import importlib.util
+import json
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+
+EXPORT_DIR = ".exports"
+EXPORT_CHUNK_ROWS = 50000
+EXCEL_MAX_ROWS = 1048575  # limite d'une feuille Excel, en-tête compris
+
+EXPORT_FORMATS = {
+    "csv": {"label": "CSV", "extension": "csv", "mime": "text/csv", "requires": None},
+    "parquet": {"label": "Parquet", "extension": "parquet", "mime": "application/vnd.apache.parquet",
+                "requires": "pyarrow"},
+    "geojson": {"label": "GeoJSON", "extension": "geojson", "mime": "application/geo+json", "requires": None},
+    "xlsx": {"label": "Excel", "extension": "xlsx",
+             "mime": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet", "requires": "openpyxl"},
+    "html": {"label": "Tableau HTML", "extension": "html", "mime": "text/html", "requires": None},
+}
+
+def available_formats():
+    """Formats dont la dépendance optionnelle est installée"""
+    return [fmt for fmt, spec in EXPORT_FORMATS.items()
+            if spec["requires"] is None or importlib.util.find_spec(spec["requires"]) is not None]
+
+def export_key(filters, fmt, version):
+    """Clé de cache : empreinte des filtres (valeurs triées), du format et de la version"""
+    normalized = {column: sorted(map(str, values)) for column, values in (filters or {}).items() if values}
+    text = json.dumps([normalized, fmt, version], sort_keys=True, ensure_ascii=False)
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()[:16]
+
+def export_path(filters, fmt, version, export_dir=EXPORT_DIR):
+    """Chemin de l'artefact en cache (un dossier par version du jeu de données)"""
+    version_dir = "".join(ch if ch.isalnum() or ch in "-_." else "_" for ch in str(version))
+    return os.path.join(export_dir, version_dir, f"{export_key(filters, fmt, version)}.{EXPORT_FORMATS[fmt]['extension']}")
+
+def iter_chunks(df, positions, chunk_rows=EXPORT_CHUNK_ROWS):
+    """Lots de lignes de la sélection (seul le lot courant est copié)"""
+    for start in range(0, len(positions), chunk_rows):
+        yield df.iloc[positions[start:start + chunk_rows]]
+
+def write_csv(df, positions, path, chunk_rows=EXPORT_CHUNK_ROWS):
+    with open(path, 'w', encoding='utf-8-sig', newline='') as f:
+        if not len(positions):
+            df.iloc[:0].to_csv(f, index=False)
+        for i, chunk in enumerate(iter_chunks(df, positions, chunk_rows)):
+            chunk.to_csv(f, index=False, header=(i == 0))
+
+def write_parquet(df, positions, path, chunk_rows=EXPORT_CHUNK_ROWS):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    schema = pa.Schema.from_pandas(df.iloc[:0], preserve_index=False)
+    with pq.ParquetWriter(path, schema) as writer:
+        for chunk in iter_chunks(df, positions, chunk_rows):
+            writer.write_table(pa.Table.from_pandas(chunk, schema=schema, preserve_index=False))
+
+def json_value(value):
+    """Valeur sérialisable (NaN -> null, types numpy -> Python)"""
+    if value is None or (isinstance(value, float) and np.isnan(value)):
+        return None
+    return value.item() if isinstance(value, np.generic) else value
+
+def json_lines(chunk, columns):
+    """Une ligne JSON (objet) par ligne du lot, sérialisée par pandas"""
+    if not len(chunk):
+        return []
+    return chunk[columns].to_json(orient='records', lines=True, force_ascii=False).rstrip("\n").split("\n")
+
+def geojson_features(chunk, properties, ids=None):
+    """Features GeoJSON (une chaîne par ligne) ; géométrie nulle si coordonnées invalides"""
+    lat = pd.to_numeric(chunk['Latitude'], errors='coerce').to_numpy(dtype=float)
+    lon = pd.to_numeric(chunk['Longitude'], errors='coerce').to_numpy(dtype=float)
+    id_parts = [""] * len(chunk) if ids is None else [f'"id": {int(i)}, ' for i in ids]
+    return [
+        f'{{"type": "Feature", {id_part}"geometry": '
+        + (f'{{"type": "Point", "coordinates": [{x:.7f}, {y:.7f}]}}' if np.isfinite(x) and np.isfinite(y) else 'null')
+        + f', "properties": {record}}}'
+        for id_part, record, y, x in zip(id_parts, json_lines(chunk, properties), lat, lon)
+    ]
+
+def write_geojson(df, positions, path, chunk_rows=EXPORT_CHUNK_ROWS):
+    """FeatureCollection de points ; les lignes sans coordonnées valides sont ignorées"""
+    properties = [column for column in df.columns if column not in ('Latitude', 'Longitude')]
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('{"type": "FeatureCollection", "features": [\n')
+        first = True
+        for chunk in iter_chunks(df, positions, chunk_rows):
+            lat = pd.to_numeric(chunk['Latitude'], errors='coerce').to_numpy(dtype=float)
+            lon = pd.to_numeric(chunk['Longitude'], errors='coerce').to_numpy(dtype=float)
+            valid = np.isfinite(lat) & np.isfinite(lon)
+            if not valid.any():
+                continue
+            f.write(("" if first else ",\n") + ",\n".join(geojson_features(chunk[valid], properties)))
+            first = False
+        f.write('\n]}\n')
+
+def frame_rows(df, positions=None, chunk_rows=EXPORT_CHUNK_ROWS):
+    """Lignes (listes de valeurs sérialisables) d'un DataFrame, lot par lot"""
+    positions = np.arange(len(df)) if positions is None else positions
+    for chunk in iter_chunks(df, positions, chunk_rows):
+        for row in chunk.itertuples(index=False, name=None):
+            yield [json_value(value) for value in row]
+
+def append_sheet(workbook, title, columns, rows):
+    """Écrit les lignes dans une feuille d'un classeur en écriture seule ;
+    nouvelle feuille ("titre 2", ...) au-delà de la limite Excel"""
+    sheet, rows_in_sheet, sheet_number = None, EXCEL_MAX_ROWS, 0
+    for row in rows:
+        if rows_in_sheet >= EXCEL_MAX_ROWS:
+            sheet_number += 1
+            sheet = workbook.create_sheet(title if sheet_number == 1 else f"{title} {sheet_number}")
+            sheet.append(list(columns))
+            rows_in_sheet = 0
+        sheet.append(row)
+        rows_in_sheet += 1
+    if sheet is None:
+        workbook.create_sheet(title).append(list(columns))
+
+def write_workbook(path, sheets):
+    """Classeur Excel en mode écriture seule (openpyxl) : les lignes sont
+    écrites au fil de l'eau, mémoire constante quelle que soit la taille.
+
+    sheets : liste de (titre, colonnes, itérable de lignes).
+    """
+    from openpyxl import Workbook
+    workbook = Workbook(write_only=True)
+    for title, columns, rows in sheets:
+        append_sheet(workbook, title, columns, rows)
+    workbook.save(path)
+
+def write_xlsx(df, positions, path, chunk_rows=EXPORT_CHUNK_ROWS):
+    write_workbook(path, [("Points de vente", df.columns, frame_rows(df, positions, chunk_rows))])
+
+# Page autonome : données en colonnes (JSON) rendues par page, triables et filtrables dans le navigateur.
+# __TITLE__ et __DATA__ sont remplacés à l'écriture (pas de format() : accolades JavaScript).
+HTML_TABLE_TEMPLATE = """<!DOCTYPE html>
+<html lang="fr">
+<head>
+<meta charset="utf-8">
+<title>__TITLE__</title>
+<style>
+body { font-family: Arial, sans-serif; margin: 16px; color: #222; }
+.bar { display: flex; gap: 12px; align-items: center; margin-bottom: 8px; flex-wrap: wrap; }
+table { border-collapse: collapse; width: 100%; font-size: 13px; }
+th, td { border: 1px solid #ddd; padding: 4px 6px; text-align: left; }
+th { background: #f3f3f3; cursor: pointer; position: sticky; top: 0; user-select: none; }
+tr:nth-child(even) td { background: #fafafa; }
+td.num { text-align: right; font-variant-numeric: tabular-nums; }
+</style>
+</head>
+<body>
+<h2>__TITLE__</h2>
+<div class="bar">
+  <input id="search" type="search" placeholder="Rechercher..." size="30">
+  <label>Lignes par page <select id="size"><option>25</option><option selected>50</option><option>100</option><option>500</option></select></label>
+  <button id="prev">&larr;</button><span id="info"></span><button id="next">&rarr;</button>
+</div>
+<table><thead><tr id="head"></tr></thead><tbody id="body"></tbody></table>
+<script id="table-data" type="application/json">__DATA__</script>
+<script>
+(function () {
+  var d = JSON.parse(document.getElementById('table-data').textContent);
+  var n = d.rows, cols = d.columns, page = 0, sortCol = -1, sortDir = 1, text = null;
+  var view = new Int32Array(n);
+  for (var i = 0; i < n; i++) { view[i] = i; }
+  var esc = function (s) {
+    return String(s).replace(/[&<>"']/g, function (c) {
+      return {'&': '&amp;', '<': '&lt;', '>': '&gt;', '"': '&quot;', "'": '&#39;'}[c];
+    });
+  };
+  // Valeur affichée : libellé d'une colonne codée (code -1 = vide) ou valeur brute
+  var cell = function (c, i) {
+    if (c.labels) { var k = c.codes[i]; return k < 0 ? '' : c.labels[k]; }
+    var v = c.values[i]; return v === null ? '' : v;
+  };
+  // Clé de tri : les codes suivent l'ordre alphabétique des libellés ; vides en dernier
+  var key = function (c, i) {
+    if (c.labels) { return c.codes[i] < 0 ? Infinity : c.codes[i]; }
+    var v = c.values[i]; return v === null ? Infinity : v;
+  };
+  var head = document.getElementById('head'), body = document.getElementById('body');
+  cols.forEach(function (c, j) {
+    var th = document.createElement('th');
+    th.textContent = c.name;
+    th.onclick = function () { sortDir = sortCol === j ? -sortDir : 1; sortCol = j; apply(); };
+    head.appendChild(th);
+  });
+  var size = function () { return parseInt(document.getElementById('size').value, 10); };
+  var render = function () {
+    var pages = Math.max(1, Math.ceil(view.length / size()));
+    page = Math.min(page, pages - 1);
+    var start = page * size(), end = Math.min(view.length, start + size()), html = [];
+    for (var r = start; r < end; r++) {
+      var i = view[r], row = '<tr>';
+      for (var j = 0; j < cols.length; j++) {
+        row += (cols[j].labels ? '<td>' : '<td class="num">') + esc(cell(cols[j], i)) + '</td>';
+      }
+      html.push(row + '</tr>');
+    }
+    body.innerHTML = html.join('');
+    head.querySelectorAll('th').forEach(function (th, j) {
+      th.textContent = cols[j].name + (j === sortCol ? (sortDir > 0 ? ' ▲' : ' ▼') : '');
+    });
+    document.getElementById('info').textContent = ' ' + (view.length ? start + 1 : 0) + '-' + end + ' sur '
+      + view.length + (view.length < n ? ' (' + n + ' au total)' : '') + ' ';
+  };
+  var apply = function () {
+    var q = document.getElementById('search').value.trim().toLowerCase(), rows = [];
+    if (q && text === null) {
+      // Texte de recherche par ligne, construit à la première recherche seulement
+      text = new Array(n);
+      for (var i = 0; i < n; i++) {
+        var parts = [];
+        for (var j = 0; j < cols.length; j++) { parts.push(cell(cols[j], i)); }
+        text[i] = parts.join(' ').toLowerCase();
+      }
+    }
+    for (var i = 0; i < n; i++) { if (!q || text[i].indexOf(q) >= 0) { rows.push(i); } }
+    if (sortCol >= 0) {
+      var c = cols[sortCol];
+      rows.sort(function (a, b) { var x = key(c, a), y = key(c, b); return x < y ? -sortDir : x > y ? sortDir : a - b; });
+    }
+    view = Int32Array.from(rows);
+    page = 0;
+    render();
+  };
+  var timer = null;
+  document.getElementById('search').oninput = function () { clearTimeout(timer); timer = setTimeout(apply, 200); };
+  document.getElementById('size').onchange = function () { page = 0; render(); };
+  document.getElementById('prev').onclick = function () { if (page > 0) { page--; render(); } };
+  document.getElementById('next').onclick = function () { if ((page + 1) * size() < view.length) { page++; render(); } };
+  render();
+})();
+</script>
+</body>
+</html>
+"""
+
+def html_column(series):
+    """Colonne du tableau HTML : valeurs brutes (numérique) ou codes + libellés
+    triés, chaque libellé n'étant transmis qu'une fois"""
+    if pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series):
+        values = series.astype(object).where(series.notna(), None).tolist()
+        return {"name": str(series.name), "values": [json_value(v) for v in values]}
+    codes, labels = pd.factorize(series.astype(object), sort=True)
+    return {"name": str(series.name), "labels": [str(label) for label in labels], "codes": codes.tolist()}
+
+def write_html(df, positions, path, chunk_rows=EXPORT_CHUNK_ROWS, title="Points de vente"):
+    """Tableau HTML autonome : les données sont intégrées une fois en colonnes
+    compactes et seule la page courante est rendue dans le navigateur (tri,
+    recherche et pagination côté client, ouverture rapide quelle que soit la
+    taille). Les colonnes sont sérialisées une à une."""
+    prefix, suffix = HTML_TABLE_TEMPLATE.replace("__TITLE__", title).split("__DATA__")
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(prefix)
+        f.write(f'{{"rows": {len(positions)}, "columns": [')
+        for j, column in enumerate(df.columns):
+            series = df[column].iloc[positions]
+            text = json.dumps(html_column(series), ensure_ascii=False, separators=(',', ':'))
+            # Aucune fin de balise possible dans le <script> de données
+            f.write(("," if j else "") + text.replace('</', '<\\/'))
+        f.write(']}')
+        f.write(suffix)
+
+def write_html_table(df, path, title="Points de vente", compress=False):
+    """Tableau HTML de tout le DataFrame ; avec compress, copie précompressée
+    path.gz à côté (servie telle quelle par un serveur web)"""
+    write_html(df, np.arange(len(df)), path, title=title)
+    if compress:
+        with open(path, 'rb') as source, gzip.GzipFile(path + ".gz", 'wb', compresslevel=9, mtime=0) as target:
+            shutil.copyfileobj(source, target)
+    return path
+
+WRITERS = {"csv": write_csv, "parquet": write_parquet, "geojson": write_geojson, "xlsx": write_xlsx,
+           "html": write_html}
+
+def build_export(df, positions, fmt, version, filters=None, export_dir=EXPORT_DIR):
+    """Retourne le chemin de l'export, généré seulement s'il n'est pas en cache.
+
+    Le fichier est écrit à côté puis renommé : un export interrompu n'est
+    jamais servi depuis le cache.
+    """
+    if fmt not in WRITERS:
+        raise ValueError(f"Format d'export inconnu: {fmt}")
+    path = export_path(filters, fmt, version, export_dir)
+    if os.path.exists(path):
+        return path
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    try:
+        WRITERS[fmt](df, np.asarray(positions), tmp_path)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return path
+
+def prune_exports(version, export_dir=EXPORT_DIR):
+    """Supprime les exports des versions précédentes du jeu de données"""
+    if not os.path.isdir(export_dir):
+        return
+    current = os.path.dirname(export_path(None, "csv", version, export_dir))
+    for entry in os.listdir(export_dir):
+        path = os.path.join(export_dir, entry)
+        if os.path.isdir(path) and os.path.abspath(path) != os.path.abspath(current):
+            shutil.rmtree(path, ignore_errors=True)
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Index de filtrage par bitmaps : un bitmap (bits compactés numpy) par valeur
+distincte de Statut, Catégorie et Zone. Une combinaison de filtres se
+résout en OU / ET bit à bit, sans copie du DataFrame.
+"""
+
+import numpy as np
+import pandas as pd
+
+FILTER_COLUMNS = ["Statut", "Catégorie", "Zone"]
+
+# Nombre de bits à 1 de chaque octet
+POPCOUNT = np.array([bin(byte).count("1") for byte in range(256)], dtype=np.uint8)
+
+class FilterIndex:
+    """Bitmaps par valeur, construits une fois par version du jeu de données.
+
+    Les filtres sont un dict {colonne: [valeurs]} : OU entre les valeurs
+    d'une colonne, ET entre colonnes ; une liste vide ou absente ne filtre
+    pas. Les valeurs manquantes (NaN) ne sont dans aucun bitmap.
+    """
+
+    def __init__(self, df, columns=FILTER_COLUMNS):
+        self.size = len(df)
+        self.all = np.packbits(np.ones(self.size, dtype=bool))
+        self.bitmaps = {}
+        for column in columns:
+            if column in df.columns:
+                self.add_column(column, *pd.factorize(df[column], sort=True))
+
+    @classmethod
+    def from_store(cls, store, columns=FILTER_COLUMNS):
+        """Index construit depuis les codes du stockage en colonnes (point_store),
+        sans décoder les colonnes en DataFrame"""
+        index = cls(pd.DataFrame(index=range(len(store))), columns=[])
+        for column in columns:
+            if column not in store.columns:
+                continue
+            if store.is_coded(column):
+                index.add_column(column, np.asarray(store.column(column)), store.labels(column))
+            else:
+                index.add_column(column, *pd.factorize(store.decode(column), sort=True))
+        return index
+
+    def add_column(self, column, codes, labels):
+        """Bitmaps d'une colonne codée (codes triés par valeur, -1 = manquant)"""
+        order = np.argsort(codes, kind='stable')
+        bounds = np.searchsorted(codes[order], np.arange(len(labels) + 1))
+        bitmaps = {}
+        for code, label in enumerate(labels):
+            bits = np.zeros(self.size, dtype=bool)
+            bits[order[bounds[code]:bounds[code + 1]]] = True
+            bitmaps[label] = np.packbits(bits)
+        self.bitmaps[column] = bitmaps
+
+    def values(self, column):
+        """Valeurs distinctes (triées) d'une colonne indexée"""
+        return list(self.bitmaps.get(column, {}))
+
+    def column_bitmap(self, column, values):
+        """OU des bitmaps des valeurs sélectionnées d'une colonne"""
+        empty = np.zeros_like(self.all)
+        bitmap = empty
+        for value in values:
+            bitmap = bitmap | self.bitmaps[column].get(value, empty)
+        return bitmap
+
+    def select(self, filters, exclude=None):
+        """Bitmap des lignes retenues ; exclude ignore le filtre d'une colonne"""
+        bitmap = self.all
+        for column, values in (filters or {}).items():
+            if values and column != exclude:
+                bitmap = bitmap & self.column_bitmap(column, values)
+        return bitmap
+
+    def count(self, bitmap):
+        """Nombre de lignes d'un bitmap"""
+        return int(POPCOUNT[bitmap].sum(dtype=np.int64))
+
+    def mask(self, filters):
+        """Masque booléen des lignes retenues (une ligne par ligne du DataFrame)"""
+        return np.unpackbits(self.select(filters), count=self.size).astype(bool)
+
+    def positions(self, filters):
+        """Positions des lignes retenues"""
+        return np.flatnonzero(np.unpackbits(self.select(filters), count=self.size))
+
+    def facet_counts(self, filters):
+        """Comptes par valeur de chaque colonne, avec les filtres des autres colonnes.
+
+        Donne, pour chaque valeur proposée dans un filtre, le nombre de
+        lignes qu'on obtiendrait en l'ajoutant à la sélection.
+        """
+        counts = {}
+        for column, bitmaps in self.bitmaps.items():
+            base = self.select(filters, exclude=column)
+            counts[column] = {value: self.count(base & bitmap) for value, bitmap in bitmaps.items()}
+        return counts
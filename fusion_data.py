@@ -3,6 +3,8 @@ import os
 import time
 from pathlib import Path
 
+import telemetry
+
 def find_latest_file(pattern):
     """Trouve le fichier le plus récent correspondant au pattern"""
     files = list(Path('.').glob(pattern))
@@ -10,13 +12,18 @@ def find_latest_file(pattern):
         return None
     return max(files, key=os.path.getctime)
 
-def merge_data_sources():
-    """Fusionne les données OSM et ATP"""
+def merge_data_sources(osm_file=None):
+    """Fusionne les données OSM et ATP.
+
+    osm_file : CSV des points OSM (par défaut le plus récent
+    points_vente_casablanca_osm*.csv) ; s'il a une colonne Source (sortie
+    complète du pipeline), seules ses lignes OSM sont gardées.
+    """
     
     print("[INFO] Fusion des donnees OSM et ATP...")
     
     # Chercher les fichiers de données
-    osm_file = find_latest_file("points_vente_casablanca_osm*.csv")
+    osm_file = Path(osm_file) if osm_file else find_latest_file("points_vente_casablanca_osm*.csv")
     atp_file = find_latest_file("points_vente_casablanca_atp*.csv")
     
     data_frames = []
@@ -25,6 +32,8 @@ def merge_data_sources():
     if osm_file and osm_file.exists():
         print(f"[INFO] Chargement des donnees OSM depuis {osm_file}")
         df_osm = pd.read_csv(osm_file)
+        if 'Source' in df_osm.columns:
+            df_osm = df_osm[df_osm['Source'] == 'OSM'].copy()
         df_osm['Source'] = 'OSM'
         data_frames.append(df_osm)
         print(f"   [SUCCESS] {len(df_osm)} points OSM charges")
@@ -52,11 +61,13 @@ def merge_data_sources():
     print("[INFO] Nettoyage des doublons...")
     initial_count = len(df_final)
     
-    # Supprimer les doublons basés sur la proximité géographique (50m) et le nom similaire
-    df_final = df_final.drop_duplicates(subset=["Nom", "Latitude", "Longitude"], keep='first')
-    
-    # Supprimer les lignes avec des coordonnées manquantes
-    df_final = df_final.dropna(subset=['Latitude', 'Longitude'])
+    with telemetry.track("dedup", rows_in=initial_count) as record:
+        # Supprimer les doublons basés sur la proximité géographique (50m) et le nom similaire
+        df_final = df_final.drop_duplicates(subset=["Nom", "Latitude", "Longitude"], keep='first')
+        
+        # Supprimer les lignes avec des coordonnées manquantes
+        df_final = df_final.dropna(subset=['Latitude', 'Longitude'])
+        record["rows_out"] = len(df_final)
     
     final_count = len(df_final)
     removed_count = initial_count - final_count
@@ -1,11 +1,35 @@
 from geopy.geocoders import Nominatim
+import json
+import os
 import time
+from urllib.parse import urlsplit
+import telemetry
 
-geolocator = Nominatim(user_agent="points_vente_casablanca")
+def make_geolocator(url=None):
+    """Client Nominatim : service public, ou serveur donné par url / NOMINATIM_URL (osm_standin.py)"""
+    url = url or os.environ.get("NOMINATIM_URL")
+    if not url:
+        return Nominatim(user_agent="points_vente_casablanca")
+    parts = urlsplit(url)
+    return Nominatim(user_agent="points_vente_casablanca", domain=parts.netloc + parts.path.rstrip("/"),
+                     scheme=parts.scheme or "http")
+
+geolocator = make_geolocator()
+
+def use_nominatim(url):
+    """Redirige le géocodage vers un autre serveur Nominatim"""
+    global geolocator
+    geolocator = make_geolocator(url)
+
+def service_url():
+    """Adresse du serveur Nominatim utilisé (empreinte des points de reprise)"""
+    return f"{geolocator.scheme}://{geolocator.domain}"
 
 def get_zone(lat, lon):
     try:
         location = geolocator.reverse((lat, lon), language="fr", exactly_one=True)
+        if location:
+            telemetry.add_network_bytes(len(json.dumps(location.raw)))
         if location and 'suburb' in location.raw['address']:
             return location.raw['address']['suburb']
         elif location and 'city' in location.raw['address']:
@@ -15,3 +39,16 @@ def get_zone(lat, lon):
     except Exception as e:
         print(f"⚠️ Erreur géocodage pour {lat}, {lon}: {e}")
         return "N/A"
+
+def geocode_address(address, city="Casablanca, Maroc"):
+    """Coordonnées (lat, lon) d'une adresse, ou None si introuvable"""
+    try:
+        query = address if city.split(",")[0].lower() in address.lower() else f"{address}, {city}"
+        location = geolocator.geocode(query, language="fr", exactly_one=True)
+        if location:
+            telemetry.add_network_bytes(len(json.dumps(location.raw)))
+            return location.latitude, location.longitude
+        return None
+    except Exception as e:
+        print(f"⚠️ Erreur géocodage pour {address}: {e}")
+        return None
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Test de charge de l'API des points de vente : plusieurs clients en
+parallèle (connexions persistantes) envoient des requêtes variées
+(bbox, filtres, pages, formats) et mesurent débit et latences
+"""
+
+import argparse
+import http.client
+import json
+import random
+import statistics
+import threading
+import time
+from urllib.parse import urlencode, urlsplit
+
+from api_server import DEFAULT_PORT
+
+# Emprise de Casablanca pour tirer des bounding box
+LAT_RANGE = (33.45, 33.65)
+LON_RANGE = (-7.75, -7.45)
+
+def fetch_json(conn, path):
+    conn.request("GET", path)
+    response = conn.getresponse()
+    return json.loads(response.read())
+
+def query_mix(facets, rng):
+    """Requête aléatoire : bbox de 1 à 5 km, filtres et format tirés au sort"""
+    params = []
+    if rng.random() < 0.7:
+        lat, lon = rng.uniform(*LAT_RANGE), rng.uniform(*LON_RANGE)
+        half = rng.uniform(0.005, 0.025)
+        params.append(("bbox", f"{lat - half:.5f},{lon - half:.5f},{lat + half:.5f},{lon + half:.5f}"))
+    for key, column in (("statut", "Statut"), ("categorie", "Catégorie"), ("zone", "Zone")):
+        if facets.get(column) and rng.random() < 0.3:
+            params.append((key, rng.choice(list(facets[column]))))
+    params.append(("limit", rng.choice([50, 100, 500])))
+    if rng.random() < 0.3:
+        params.append(("format", "geojson"))
+    return "/points?" + urlencode(params)
+
+def client(host, port, paths, deadline, results, conditional):
+    """Un client : une connexion persistante, requêtes jusqu'à l'échéance"""
+    conn = http.client.HTTPConnection(host, port, timeout=30)
+    etags = {}
+    headers = {"Accept-Encoding": "gzip"}
+    i = 0
+    while time.perf_counter() < deadline:
+        path = paths[i % len(paths)]
+        i += 1
+        request_headers = dict(headers)
+        if conditional and path in etags:
+            request_headers["If-None-Match"] = etags[path]
+        start = time.perf_counter()
+        try:
+            conn.request("GET", path, headers=request_headers)
+            response = conn.getresponse()
+            body = response.read()
+        except (OSError, http.client.HTTPException):
+            results.append((None, time.perf_counter() - start, 0))
+            conn.close()
+            conn = http.client.HTTPConnection(host, port, timeout=30)
+            continue
+        results.append((response.status, time.perf_counter() - start, len(body)))
+        if response.getheader("ETag"):
+            etags[path] = response.getheader("ETag")
+    conn.close()
+
+def run_load_test(url, concurrency=16, duration=10.0, distinct=500, conditional=False, seed=0):
+    """Lance concurrency clients pendant duration secondes sur distinct requêtes différentes"""
+    parts = urlsplit(url)
+    host, port = parts.hostname, parts.port or DEFAULT_PORT
+    conn = http.client.HTTPConnection(host, port, timeout=30)
+    facets = fetch_json(conn, "/facets")["facets"]
+    conn.close()
+    rng = random.Random(seed)
+    paths = [query_mix(facets, rng) for _ in range(distinct)]
+
+    results = []
+    deadline = time.perf_counter() + duration
+    threads = []
+    for k in range(concurrency):
+        # Chaque client parcourt les requêtes dans un ordre différent
+        shuffled = paths[:]
+        random.Random(seed + k + 1).shuffle(shuffled)
+        threads.append(threading.Thread(target=client, args=(host, port, shuffled, deadline, results, conditional)))
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    latencies = sorted(latency for _, latency, _ in results)
+    statuses = {}
+    for status, _, _ in results:
+        statuses[str(status)] = statuses.get(str(status), 0) + 1
+
+    def percentile(p):
+        return latencies[min(len(latencies) - 1, int(p / 100 * len(latencies)))] * 1000 if latencies else 0.0
+
+    return {
+        "requests": len(results),
+        "elapsed_s": elapsed,
+        "rps": len(results) / elapsed if elapsed else 0.0,
+        "statuses": statuses,
+        "mean_ms": statistics.mean(latencies) * 1000 if latencies else 0.0,
+        "p50_ms": percentile(50),
+        "p95_ms": percentile(95),
+        "p99_ms": percentile(99),
+        "mean_kb": statistics.mean(size for _, _, size in results) / 1024 if results else 0.0,
+    }
+
+def format_results(result):
+    return "\n".join([
+        f"Requêtes : {result['requests']} en {result['elapsed_s']:.1f}s -> {result['rps']:.0f} req/s",
+        f"Statuts : {', '.join(f'{k}: {v}' for k, v in sorted(result['statuses'].items()))}",
+        f"Latence : moyenne {result['mean_ms']:.1f} ms, p50 {result['p50_ms']:.1f} ms, "
+        f"p95 {result['p95_ms']:.1f} ms, p99 {result['p99_ms']:.1f} ms",
+        f"Taille moyenne des réponses (gzip) : {result['mean_kb']:.1f} Ko",
+    ])
+
+def main():
+    """Fonction principale"""
+    parser = argparse.ArgumentParser(description="Test de charge de l'API des points de vente")
+    parser.add_argument("--url", default=f"http://127.0.0.1:{DEFAULT_PORT}", help="Adresse de l'API")
+    parser.add_argument("--concurrency", type=int, default=16, help="Clients simultanés")
+    parser.add_argument("--duration", type=float, default=10.0, help="Durée du test (secondes)")
+    parser.add_argument("--distinct", type=int, default=500, help="Nombre de requêtes différentes")
+    parser.add_argument("--conditional", action="store_true",
+                        help="Renvoie les ETag reçus (If-None-Match), comme un client avec cache")
+    parser.add_argument("--json", help="Écrit les résultats dans ce fichier JSON")
+    args = parser.parse_args()
+
+    print(f"🚀 TEST DE CHARGE - {args.url}, {args.concurrency} clients, {args.duration:.0f}s")
+    result = run_load_test(args.url, args.concurrency, args.duration, args.distinct, args.conditional)
+    print(format_results(result))
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(result, f, indent=2, ensure_ascii=False)
+        print(f"[SUCCESS] Résultats écrits dans {args.json}")
+
+if __name__ == "__main__":
+    main()
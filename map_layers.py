@@ -0,0 +1,331 @@
+#!/usr/bin/env python3
+"""
+Couches cartographiques rendues côté navigateur : les points sont envoyés
+une seule fois sous forme de tableaux compacts, les marqueurs, clusters et
+popups sont construits en JavaScript
+"""
+
+import json
+import math
+
+import numpy as np
+import pandas as pd
+from branca.colormap import StepColormap
+from branca.element import Element, Figure
+from folium.map import Layer
+from folium.plugins import MarkerCluster
+from folium.template import Template
+
+from density_grid import METERS_PER_DEG_LAT, METERS_PER_DEG_LON_EQUATOR
+
+# Couleurs par catégorie (gris pour les catégories inconnues)
+CATEGORY_COLORS = {
+    'Supermarché': '#2ECC71',
+    'Supérette / Mini-market': '#3498DB',
+    'Épicerie': '#E67E22',
+    'Café': '#8B4513',
+    'Restaurant': '#E74C3C',
+    'Parapharmacie': '#9B59B6',
+    'Boulangerie': '#F39C12',
+    'Kiosque': '#34495E',
+    'Boutique de confiserie': '#E91E63',
+    'Magasin bio': '#27AE60'
+}
+DEFAULT_COLOR = '#7F8C8D'
+
+STATUS_COLORS = {'Formel': '#27AE60', 'Informel': '#E74C3C'}
+
+# Coordonnées transmises en entiers (degrés x 1e5, ~1 m de précision)
+COORD_SCALE = 100000
+
+# Classes des grilles de densité : nombre de points (jaune -> rouge) et part de l'informel (vert -> rouge)
+COUNT_COLORS = ['#FFFFB2', '#FED976', '#FEB24C', '#FD8D3C', '#F03B20', '#BD0026']
+SHARE_COLORS = ['#1A9850', '#91CF60', '#D9EF8B', '#FEE08B', '#FC8D59', '#D73027']
+SHARE_BREAKS = [0, 0.02, 0.05, 0.1, 0.2, 0.35, 1]
+
+def encode_points(df, color_column='Catégorie', colors=None, address=False):
+    """Encode les points en colonnes compactes : coordonnées entières (~1 m)
+    et attributs textuels remplacés par des codes + dictionnaires (adresses
+    incluses si address)"""
+    colors = CATEGORY_COLORS if colors is None else colors
+    lat = pd.to_numeric(df['Latitude'], errors='coerce').to_numpy(dtype=float)
+    lon = pd.to_numeric(df['Longitude'], errors='coerce').to_numpy(dtype=float)
+    # Points sans coordonnées exploitables écartés : NaN converti en int64 donne une position aberrante
+    valid = np.isfinite(lat) & np.isfinite(lon)
+    if not valid.all():
+        df, lat, lon = df[valid], lat[valid], lon[valid]
+    payload = {
+        "scale": COORD_SCALE,
+        "lat": (lat * COORD_SCALE).round().astype('int64').tolist(),
+        "lon": (lon * COORD_SCALE).round().astype('int64').tolist(),
+        "name": df['Nom'].fillna('').astype(str).tolist(),
+    }
+    for key, column in (("cat", 'Catégorie'), ("stat", 'Statut'), ("zone", 'Zone')):
+        if column in df.columns:
+            codes, labels = pd.factorize(df[column].fillna('N/A').astype(str))
+            payload[key] = codes.tolist()
+            payload[key + "s"] = labels.tolist()
+    if address and 'Adresse' in df.columns:
+        payload["addr"] = df['Adresse'].fillna('').astype(str).tolist()
+    codes, labels = pd.factorize(df[color_column].fillna('N/A').astype(str))
+    payload["color"] = codes.tolist()
+    payload["palette"] = [colors.get(label, DEFAULT_COLOR) for label in labels]
+    payload["status_palette"] = STATUS_COLORS
+    return payload
+
+def to_script_json(payload):
+    """JSON sûr à insérer dans une balise <script>"""
+    return json.dumps(payload, ensure_ascii=False, separators=(',', ':')).replace('</', '<\\/')
+
+class RawScript(Element):
+    """Script inséré tel quel, sans passer par Jinja (volumineux et non fiable)"""
+
+    def __init__(self, text):
+        super().__init__("")
+        self.text = text
+
+    def render(self, **kwargs):
+        return self.text
+
+def add_payload(element, payload):
+    """Déclare les données d'un élément (var <nom>_data) avant son script"""
+    figure = element.get_root()
+    assert isinstance(figure, Figure), "You cannot render this Element if it is not in a Figure."
+    figure.script.add_child(RawScript(f"var {element.get_name()}_data = {payload};"),
+                            name=element.get_name() + "_data")
+
+class BulkPointLayer(MarkerCluster):
+    """Cluster de points alimenté par un tableau compact.
+
+    Les marqueurs (cercles) sont ajoutés en bloc avec chargement par lots ;
+    le contenu des popups et infobulles n'est généré qu'à l'ouverture.
+    Avec min_zoom, la couche n'est affichée qu'à partir de ce niveau de zoom.
+    """
+
+    _template = Template(
+        """
+        {% macro script(this, kwargs) %}
+            var {{ this.get_name() }} = (function(){
+                var d = {{ this.get_name() }}_data;
+                var esc = function (s) {
+                    return String(s).replace(/[&<>"']/g, function (c) {
+                        return {'&': '&amp;', '<': '&lt;', '>': '&gt;', '"': '&quot;', "'": '&#39;'}[c];
+                    });
+                };
+                var label = function (key, i) { return d[key] ? d[key + 's'][d[key][i]] : ''; };
+                var popup = function (layer) {
+                    var i = layer.options.idx, color = d.palette[d.color[i]];
+                    var stat = label('stat', i), badge = d.status_palette[stat] || '#7F8C8D';
+                    return "<div style='width: 220px; font-family: Arial;'>"
+                        + "<h4 style='color: " + color + "; margin: 0 0 8px 0;'>" + esc(d.name[i]) + "</h4>"
+                        + "<p style='margin: 0 0 4px 0;'><strong>Type:</strong> " + esc(label('cat', i)) + "</p>"
+                        + "<p style='margin: 0 0 4px 0;'><strong>Statut:</strong> <span style='background: " + badge
+                        + "; color: white; padding: 2px 8px; border-radius: 10px; font-size: 12px;'>" + esc(stat) + "</span></p>"
+                        + "<p style='margin: 0 0 4px 0;'><strong>Zone:</strong> " + esc(label('zone', i)) + "</p>"
+                        + (d.addr && d.addr[i] ? "<p style='margin: 0 0 4px 0;'><strong>Adresse:</strong> " + esc(d.addr[i]) + "</p>" : "")
+                        + "<p style='margin: 0 0 4px 0; color: #888; font-size: 12px;'>📍 "
+                        + (d.lat[i] / d.scale).toFixed(4) + ", " + (d.lon[i] / d.scale).toFixed(4) + "</p></div>";
+                };
+                var tooltip = function (layer) {
+                    var i = layer.options.idx;
+                    return esc(d.name[i]) + " - " + esc(label('cat', i));
+                };
+                var cluster = L.markerClusterGroup({{ this.options|tojavascript }});
+                var markers = new Array(d.lat.length);
+                for (var i = 0; i < d.lat.length; i++) {
+                    var color = d.palette[d.color[i]];
+                    markers[i] = L.circleMarker([d.lat[i] / d.scale, d.lon[i] / d.scale], {
+                        idx: i, radius: 6, color: color, fillColor: color, fillOpacity: 0.8, weight: 1
+                    }).bindPopup(popup, {maxWidth: 250}).bindTooltip(tooltip);
+                }
+                cluster.addLayers(markers);
+                {%- if this.min_zoom %}
+                // Marqueurs masqués sous le zoom minimal (la carte de densité prend le relais)
+                var map = {{ this._parent.get_name() }};
+                var toggle = function () {
+                    if (map.getZoom() >= {{ this.min_zoom }}) { map.addLayer(cluster); } else { map.removeLayer(cluster); }
+                };
+                map.on('zoomend', toggle);
+                toggle();
+                {%- else %}
+                cluster.addTo({{ this._parent.get_name() }});
+                {%- endif %}
+                return cluster;
+            })();
+        {% endmacro %}"""
+    )
+
+    def __init__(self, df, color_column='Catégorie', colors=None, name=None, min_zoom=None, address=False, **kwargs):
+        kwargs.setdefault("chunkedLoading", True)
+        super().__init__(name=name, **kwargs)
+        self._name = "BulkPointLayer"
+        self.min_zoom = min_zoom
+        self.payload = to_script_json(encode_points(df, color_column=color_column, colors=colors, address=address))
+
+    def render(self, **kwargs):
+        # Les données précèdent le script de la couche dans la page
+        add_payload(self, self.payload)
+        super().render(**kwargs)
+
+class ClusterLayer(Layer):
+    """Regroupements calculés côté serveur (position, effectif, part formelle).
+
+    Un clic sur un regroupement zoome dessus ; la carte recharge alors les
+    points de la nouvelle zone visible.
+    """
+
+    _template = Template(
+        """
+        {% macro script(this, kwargs) %}
+            var {{ this.get_name() }} = (function(){
+                var d = {{ this.get_name() }}_data;
+                var map = {{ this._parent.get_name() }};
+                var group = L.featureGroup();
+                for (var i = 0; i < d.lat.length; i++) {
+                    var n = d.count[i], size = 26 + Math.min(24, Math.round(Math.log(n) * 3));
+                    var share = d.formal ? d.formal[i] / n : null;
+                    var color = share === null ? '#3498DB' : (share >= 0.5 ? d.status_palette['Formel'] : d.status_palette['Informel']);
+                    L.marker([d.lat[i] / d.scale, d.lon[i] / d.scale], {
+                        icon: L.divIcon({
+                            className: '',
+                            iconSize: [size, size],
+                            html: "<div style='width: " + size + "px; height: " + size + "px; line-height: " + size
+                                + "px; border-radius: 50%; background: " + color + "; opacity: 0.85; color: white;"
+                                + " text-align: center; font: bold 12px Arial;'>" + n + "</div>"
+                        })
+                    }).bindTooltip(n + " points" + (share === null ? "" : " - " + Math.round(share * 100) + "% formels"))
+                      .on('click', function (e) { map.setView(e.latlng, map.getZoom() + 2); })
+                      .addTo(group);
+                }
+                group.addTo(map);
+                return group;
+            })();
+        {% endmacro %}"""
+    )
+
+    def __init__(self, clusters, name=None, **kwargs):
+        super().__init__(name=name, **kwargs)
+        self._name = "ClusterLayer"
+        payload = {
+            "scale": COORD_SCALE,
+            "lat": (clusters['Latitude'].to_numpy(dtype=float) * COORD_SCALE).round().astype('int64').tolist(),
+            "lon": (clusters['Longitude'].to_numpy(dtype=float) * COORD_SCALE).round().astype('int64').tolist(),
+            "count": clusters['Nombre'].astype('int64').tolist(),
+            "status_palette": STATUS_COLORS,
+        }
+        if 'Formels' in clusters.columns:
+            payload["formal"] = clusters['Formels'].astype('int64').tolist()
+        self.payload = to_script_json(payload)
+
+    def render(self, **kwargs):
+        add_payload(self, self.payload)
+        super().render(**kwargs)
+
+def add_point_layer(m, df, name="Points de vente", color_column='Catégorie', colors=None, min_zoom=None,
+                    address=False, **cluster_options):
+    """Ajoute à la carte une couche de points rendue côté navigateur"""
+    return BulkPointLayer(df, color_column=color_column, colors=colors, name=name, min_zoom=min_zoom,
+                          address=address, **cluster_options).add_to(m)
+
+def add_cluster_layer(m, clusters, name="Regroupements"):
+    """Ajoute à la carte des regroupements de points calculés côté serveur"""
+    return ClusterLayer(clusters, name=name).add_to(m)
+
+class GridLayer(Layer):
+    """Cellules (hexagones ou carrés) d'une grille de densité, dessinées sur canvas.
+
+    Les polygones sont reconstruits dans le navigateur à partir des centres
+    et de la taille de cellule ; seule la classe de couleur est transmise.
+    """
+
+    _template = Template(
+        """
+        {% macro script(this, kwargs) %}
+            var {{ this.get_name() }} = (function(){
+                var d = {{ this.get_name() }}_data;
+                var renderer = L.canvas({padding: 0.5});
+                var group = L.featureGroup();
+                var corners = [];
+                if (d.shape === 'hex') {
+                    for (var k = 0; k < 6; k++) {
+                        var angle = Math.PI / 180 * (60 * k - 30);
+                        corners.push([d.radius * Math.sin(angle), d.radius * Math.cos(angle)]);
+                    }
+                } else {
+                    var h = d.radius;
+                    corners = [[-h, -h], [-h, h], [h, h], [h, -h]];
+                }
+                var tooltip = function (layer) {
+                    var i = layer.options.idx;
+                    return "<b>" + d.total[i] + " points</b><br>" + d.label + " : " + d.value[i]
+                        + "<br>Part de l'informel : " + Math.round(d.share[i] * 100) + "%";
+                };
+                for (var i = 0; i < d.lat.length; i++) {
+                    var lat = d.lat[i], lon = d.lon[i], ring = new Array(corners.length);
+                    for (var k = 0; k < corners.length; k++) {
+                        ring[k] = [lat + corners[k][0] * d.deg_lat, lon + corners[k][1] * d.deg_lon];
+                    }
+                    L.polygon(ring, {
+                        idx: i, renderer: renderer, color: '#555', weight: 0.5,
+                        fillColor: d.palette[d.cls[i]], fillOpacity: 0.65
+                    }).bindTooltip(tooltip).addTo(group);
+                }
+                group.addTo({{ this._parent.get_name() }});
+                return group;
+            })();
+        {% endmacro %}"""
+    )
+
+    def __init__(self, payload, name=None, **kwargs):
+        super().__init__(name=name, **kwargs)
+        self._name = "GridLayer"
+        self.payload = to_script_json(payload)
+
+    def render(self, **kwargs):
+        add_payload(self, self.payload)
+        super().render(**kwargs)
+
+def count_breaks(values, n_classes=len(COUNT_COLORS)):
+    """Seuils de classes par quantiles des valeurs non nulles (au moins 1 par classe)"""
+    positive = values[values > 0]
+    if not len(positive):
+        return [0, 1]
+    breaks = np.unique(np.quantile(positive, np.linspace(0, 1, n_classes + 1)).round())
+    breaks[0] = min(breaks[0], positive.min())
+    return breaks.tolist() if len(breaks) > 1 else [breaks[0], breaks[0] + 1]
+
+def add_grid_layer(m, grid, values, metric="total", label="Nombre de points", name="Densité par cellule"):
+    """Ajoute une grille de densité en choroplèthe, avec sa légende.
+
+    values : valeur par cellule (même ordre que la grille) ; seules les
+    cellules non vides pour l'indicateur sont dessinées.
+    """
+    values = np.asarray(values, dtype=float)
+    total = np.asarray(grid["total"])
+    if metric == "informal_share":
+        colors, breaks = SHARE_COLORS, SHARE_BREAKS
+        keep = total > 0
+    else:
+        breaks = count_breaks(values)
+        colors = COUNT_COLORS[:len(breaks) - 1]
+        keep = values > 0
+    classes = np.clip(np.searchsorted(breaks, values[keep], side='right') - 1, 0, len(colors) - 1)
+    origin_lat = grid["origin"][0]
+    payload = {
+        "shape": grid["shape"],
+        # Demi-largeur (carré) ou rayon circonscrit (hexagone), en mètres
+        "radius": grid["cell_m"] / 2 if grid["shape"] == "square" else grid["cell_m"] / math.sqrt(3),
+        "deg_lat": 1 / METERS_PER_DEG_LAT,
+        "deg_lon": 1 / (METERS_PER_DEG_LON_EQUATOR * math.cos(math.radians(origin_lat))),
+        "lat": np.asarray(grid["lat"])[keep].tolist(),
+        "lon": np.asarray(grid["lon"])[keep].tolist(),
+        "total": total[keep].tolist(),
+        "share": np.asarray(grid["informal_share"])[keep].tolist(),
+        "value": np.round(values[keep], 3).tolist(),
+        "cls": classes.tolist(),
+        "palette": colors,
+        "label": label,
+    }
+    layer = GridLayer(payload, name=name).add_to(m)
+    StepColormap(colors, index=breaks, vmin=breaks[0], vmax=breaks[-1], caption=label).add_to(m)
+    return layer
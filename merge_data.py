@@ -3,6 +3,9 @@ import os
 import time
 from pathlib import Path
 
+import quality
+import telemetry
+
 def find_latest_file(pattern):
     """Trouve le fichier le plus récent correspondant au pattern"""
     files = list(Path('.').glob(pattern))
@@ -10,8 +13,13 @@ def find_latest_file(pattern):
         return None
     return max(files, key=os.path.getctime)
 
-def merge_all_data():
-    """Fusionne toutes les sources de données disponibles"""
+def merge_all_data(osm_file=None):
+    """Fusionne toutes les sources de données disponibles.
+
+    osm_file : CSV des points OSM (par défaut le plus récent
+    points_vente_casablanca_osm*.csv) ; s'il a une colonne Source (sortie
+    complète du pipeline), seules ses lignes OSM sont gardées.
+    """
     print("[INFO] Demarrage de la fusion des donnees...")
     
     # --- Icônes ---
@@ -32,10 +40,12 @@ def merge_all_data():
     data_frames = []
     
     # Chercher et charger les fichiers OSM
-    osm_file = find_latest_file("points_vente_casablanca_osm*.csv")
+    osm_file = Path(osm_file) if osm_file else find_latest_file("points_vente_casablanca_osm*.csv")
     if osm_file and osm_file.exists():
         print(f"[INFO] Chargement OSM: {osm_file}")
         df_osm = pd.read_csv(osm_file)
+        if 'Source' in df_osm.columns:
+            df_osm = df_osm[df_osm['Source'] == 'OSM'].copy()
         df_osm['Source'] = 'OSM'
         data_frames.append(df_osm)
         print(f"   [SUCCESS] {len(df_osm)} points OSM charges")
@@ -87,12 +97,15 @@ def merge_all_data():
     # Nettoyer les données
     initial_count = len(df_combined)
     
-    # Supprimer les lignes avec des coordonnées invalides
-    df_combined = df_combined.dropna(subset=['Latitude', 'Longitude'])
-    df_combined = df_combined[(df_combined['Latitude'] != 0) & (df_combined['Longitude'] != 0)]
-    
-    # Supprimer les doublons
-    df_combined = df_combined.drop_duplicates(subset=["Nom", "Latitude", "Longitude"], keep='first')
+    with telemetry.track("dedup", rows_in=initial_count) as record:
+        # Supprimer les lignes avec des coordonnées invalides (absentes, non numériques, nulles)
+        flags = quality.compute_flags(df_combined)
+        invalid_coords = quality.COORD_MISSING | quality.COORD_INVALID | quality.COORD_ZERO
+        df_combined = df_combined[(flags & invalid_coords) == 0]
+        
+        # Supprimer les doublons
+        df_combined = df_combined.drop_duplicates(subset=["Nom", "Latitude", "Longitude"], keep='first')
+        record["rows_out"] = len(df_combined)
     
     final_count = len(df_combined)
     removed_count = initial_count - final_count
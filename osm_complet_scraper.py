@@ -1,8 +1,13 @@
 import pandas as pd
 import time
 import os
+import argparse
 import requests
+import telemetry
+from checkpoint import open_checkpoint, is_done, save_unit, load_unit
+from export import write_html_table
 from geocode_utils import get_zone
+from zoning import assign_zones, write_csv, write_zone_record, zone_definitions
 
 # --- Icônes ---
 os.makedirs("icons", exist_ok=True)
@@ -20,23 +25,48 @@ images = {
     "Magasin bio": "icons/organic.png",
 }
 
+# Point d'accès Overpass ; OVERPASS_URL permet de viser un serveur local (osm_standin.py)
+OVERPASS_URL = os.environ.get("OVERPASS_URL", "https://overpass.kumi.systems/api/interpreter")
+
 def query_overpass_api(query):
     """Effectue une requête vers l'API Overpass d'OpenStreetMap"""
-    overpass_url = "https://overpass.kumi.systems/api/interpreter"
     try:
-        response = requests.get(overpass_url, params={'data': query}, timeout=60)
-        response.raise_for_status()
-        return response.json()
+        with telemetry.track("fetch") as record:
+            response = requests.get(OVERPASS_URL, params={'data': query}, timeout=60)
+            response.raise_for_status()
+            telemetry.add_network_bytes(len(response.content))
+            data = response.json()
+            record["rows_out"] = len(data.get('elements', []))
+        return data
     except Exception as e:
         print(f"[WARNING] Erreur API Overpass: {e}")
         return None
 
-def get_all_food_retail_casablanca():
-    """Recherche TOUS les commerces alimentaires dans la région de Casablanca"""
+# Bounding box élargie pour couvrir toute l'agglomération de Casablanca
+# Sud-Ouest: 33.4, -7.9 | Nord-Est: 33.7, -7.3
+CASABLANCA_BBOX = (33.4, -7.9, 33.7, -7.3)
+
+# Découpage de la bounding box en tuiles (lignes, colonnes) pour la reprise
+TILE_GRID = (2, 3)
+
+def split_bbox(bbox, rows, cols):
+    """Découpe une bounding box (sud, ouest, nord, est) en rows x cols tuiles"""
+    south, west, north, east = bbox
+    lat_step = (north - south) / rows
+    lon_step = (east - west) / cols
+    tiles = []
+    for i in range(rows):
+        for j in range(cols):
+            tiles.append((
+                round(south + i * lat_step, 6), round(west + j * lon_step, 6),
+                round(south + (i + 1) * lat_step, 6), round(west + (j + 1) * lon_step, 6),
+            ))
+    return tiles
+
+def get_all_food_retail_casablanca(bbox=CASABLANCA_BBOX):
+    """Recherche TOUS les commerces alimentaires dans la bounding box donnée"""
     
-    # Bounding box élargie pour couvrir toute l'agglomération de Casablanca
-    # Sud-Ouest: 33.4, -7.9 | Nord-Est: 33.7, -7.3
-    bbox = "33.4,-7.9,33.7,-7.3"
+    bbox = ",".join(str(coord) for coord in bbox)
     
     print(f"[INFO] Recherche dans la zone: {bbox}")
     
@@ -163,24 +193,37 @@ def categorize_point(element):
         # Catégorie par défaut
         return ("Épicerie", "Informel")
 
-def main():
-    """Fonction principale"""
-    
-    print("="*70)
-    print("COLLECTE COMPLETE DES POINTS DE VENTE - CASABLANCA")
-    print("="*70)
-    
-    print("[INFO] Debut de la collecte OSM pour toute la region de Casablanca...")
-    
-    # --- Collecte OSM ---
-    osm_data = get_all_food_retail_casablanca()
-    if not osm_data or 'elements' not in osm_data:
-        print("[ERROR] Aucune donnee OSM collectee")
-        osm_points = []
-    else:
-        print(f"[INFO] {len(osm_data['elements'])} elements bruts collectes")
-        osm_points = []
-        for element in osm_data['elements']:
+# --- Découpage en zones (boîtes lat/lon) ---
+zone_mapping = {
+    (33.593, 33.600, -7.630, -7.610): "Centre-Ville",
+    (33.575, 33.590, -7.650, -7.630): "Maarif",
+    (33.570, 33.580, -7.680, -7.650): "Ain Diab",
+    (33.590, 33.610, -7.670, -7.640): "Anfa",
+    (33.560, 33.580, -7.650, -7.620): "Hay Hassani",
+    (33.610, 33.630, -7.550, -7.520): "Sidi Bernoussi",
+    (33.600, 33.620, -7.540, -7.500): "Ain Sebaa",
+    (33.680, 33.700, -7.390, -7.350): "Mohammedia",
+    (33.450, 33.480, -7.650, -7.600): "Bouskoura",
+    (33.360, 33.400, -7.600, -7.550): "Nouaceur",
+    (33.450, 33.480, -7.550, -7.500): "Mediouna",
+    (33.540, 33.570, -7.490, -7.460): "Tit Mellil",
+    (33.630, 33.650, -7.460, -7.430): "Ain Harrouda",
+}
+
+def get_zone_from_coords(lat, lon):
+    """Retourne la zone correspondant aux coordonnées (Casablanca par défaut)"""
+    if pd.isna(lat) or pd.isna(lon):
+        return "Casablanca"
+    for (lat_min, lat_max, lon_min, lon_max), zone_name in zone_mapping.items():
+        if lat_min <= lat <= lat_max and lon_min <= lon <= lon_max:
+            return zone_name
+    return "Casablanca"
+
+def extract_located_elements(elements):
+    """Garde les éléments tagués ayant des coordonnées (centre pour way/relation)"""
+    located = []
+    with telemetry.track("parse", rows_in=len(elements)) as record:
+        for element in elements:
             if 'tags' not in element:
                 continue
             if element['type'] == 'node':
@@ -193,6 +236,16 @@ def main():
                 continue
             if not lat or not lon:
                 continue
+            located.append((element, lat, lon))
+        record["rows_out"] = len(located)
+    return located
+
+def parse_osm_elements(elements):
+    """Convertit les éléments bruts Overpass en points de vente"""
+    located = extract_located_elements(elements)
+    osm_points = []
+    with telemetry.track("categorize", rows_in=len(located)) as record:
+        for element, lat, lon in located:
             category_info = categorize_point(element)
             if not category_info[0]:
                 continue
@@ -215,9 +268,58 @@ def main():
                 "Image": image,
                 "Source": "OSM"
             })
-    # --- Collecte ATP/AllThePlaces ---
+        record["rows_out"] = len(osm_points)
+    return osm_points
+
+def fetch_osm_elements(bbox=CASABLANCA_BBOX, grid=TILE_GRID, resume=False):
+    """Interroge Overpass tuile par tuile ; chaque tuile terminée est persistée.
+
+    Avec resume=True, les tuiles déjà collectées ne sont pas redemandées.
+    Les éléments présents dans plusieurs tuiles (ways, points en bordure)
+    ne sont gardés qu'une fois. Lève RuntimeError si une tuile échoue : un
+    résultat partiel (régions entières manquantes) n'est jamais retourné,
+    les tuiles terminées restent dans le point de reprise.
+    """
+    tiles = split_bbox(bbox, *grid)
+    # Serveur compris : une reprise ne mélange pas tuiles réelles et simulées (osm_standin.py)
+    params = {"bbox": list(bbox), "grid": list(grid), "overpass": OVERPASS_URL}
+    checkpoint_dir = open_checkpoint("osm", params, resume=resume)
+    elements = {}
+    missing = []
+    for tile in tiles:
+        key = "_".join(str(coord) for coord in tile)
+        if is_done(checkpoint_dir, key):
+            tile_elements = load_unit(checkpoint_dir, key)
+            print(f"[INFO] Tuile {key} reprise du point de sauvegarde ({len(tile_elements)} elements)")
+        else:
+            osm_data = get_all_food_retail_casablanca(tile)
+            if not osm_data or 'elements' not in osm_data:
+                missing.append(key)
+                continue
+            tile_elements = osm_data['elements']
+            save_unit(checkpoint_dir, key, tile_elements)
+        for element in tile_elements:
+            elements[(element.get('type'), element.get('id'))] = element
+    if missing:
+        raise RuntimeError(f"{len(missing)}/{len(tiles)} tuiles en échec, relancez avec --resume pour les compléter")
+    return list(elements.values())
+
+def collect_osm_points(resume=False):
+    """Collecte OSM complète : requêtes Overpass par tuile puis conversion en points.
+
+    Lève RuntimeError si rien n'est collecté : le jeu de données précédent
+    ne doit pas être remplacé par les seuls points ATP.
+    """
+    print("[INFO] Debut de la collecte OSM pour toute la region de Casablanca...")
+    elements = fetch_osm_elements(resume=resume)
+    if not elements:
+        raise RuntimeError("Aucune donnee OSM collectee")
+    print(f"[INFO] {len(elements)} elements bruts collectes")
+    return parse_osm_elements(elements)
+
+def load_atp_points(atp_file="points_vente_casablanca_atp.csv"):
+    """Charge (ou génère si absent) le fichier ATP et le convertit en points"""
     atp_points = []
-    atp_file = "points_vente_casablanca_atp.csv"
     if not os.path.exists(atp_file):
         print(f"   [INFO] Génération automatique du fichier ATP: {atp_file}")
         atp_data = [
@@ -268,39 +370,24 @@ def main():
             "Source": "ATP"
         })
     print(f"   [SUCCESS] {len(df_atp)} points ATP charges")
-    # --- Fusion des points ---
+    return atp_points
+
+def build_points_dataframe(osm_points, atp_points):
+    """Fusionne les points, corrige les zones et supprime les doublons"""
     all_points = osm_points + atp_points
     if not all_points:
         print("[ERROR] Aucun point de vente valide trouve")
-        return
+        return None
     df = pd.DataFrame(all_points)
     # --- Correction des zones ---
-    zone_mapping = {
-        (33.593, 33.600, -7.630, -7.610): "Centre-Ville",
-        (33.575, 33.590, -7.650, -7.630): "Maarif",
-        (33.570, 33.580, -7.680, -7.650): "Ain Diab",
-        (33.590, 33.610, -7.670, -7.640): "Anfa",
-        (33.560, 33.580, -7.650, -7.620): "Hay Hassani",
-        (33.610, 33.630, -7.550, -7.520): "Sidi Bernoussi",
-        (33.600, 33.620, -7.540, -7.500): "Ain Sebaa",
-        (33.680, 33.700, -7.390, -7.350): "Mohammedia",
-        (33.450, 33.480, -7.650, -7.600): "Bouskoura",
-        (33.360, 33.400, -7.600, -7.550): "Nouaceur",
-        (33.450, 33.480, -7.550, -7.500): "Mediouna",
-        (33.540, 33.570, -7.490, -7.460): "Tit Mellil",
-        (33.630, 33.650, -7.460, -7.430): "Ain Harrouda",
-    }
-    def get_zone_from_coords(lat, lon):
-        if pd.isna(lat) or pd.isna(lon):
-            return "Casablanca"
-        for (lat_min, lat_max, lon_min, lon_max), zone_name in zone_mapping.items():
-            if lat_min <= lat <= lat_max and lon_min <= lon <= lon_max:
-                return zone_name
-        return "Casablanca"
-    df["Zone"] = df.apply(lambda row: get_zone_from_coords(row["Latitude"], row["Longitude"]), axis=1)
+    with telemetry.track("zone", rows_in=len(df)) as record:
+        df["Zone"] = assign_zones(df["Latitude"], df["Longitude"], zone_definitions(zone_mapping))
+        record["rows_out"] = len(df)
     # --- Nettoyage et stats ---
     initial_count = len(df)
-    df = df.drop_duplicates(subset=["Nom", "Latitude", "Longitude"], keep='first')
+    with telemetry.track("dedup", rows_in=initial_count) as record:
+        df = df.drop_duplicates(subset=["Nom", "Latitude", "Longitude"], keep='first')
+        record["rows_out"] = len(df)
     final_count = len(df)
     print(f"[INFO] {initial_count - final_count} doublons supprimes")
     print(f"\n[INFO] Repartition par categorie:")
@@ -311,30 +398,45 @@ def main():
     status_stats = df['Statut'].value_counts()
     for status, count in status_stats.items():
         print(f"   {status}: {count}")
-    # --- Sauvegarde ---
+    return df
+
+def save_outputs(df, compress_html=False):
+    """Sauvegarde le CSV et le tableau HTML, retourne le chemin du CSV"""
+    with telemetry.track("write", rows_in=len(df)) as record:
+        output_file = write_outputs(df, compress_html)
+        record["rows_out"] = len(df)
+    return output_file
+
+def write_outputs(df, compress_html=False):
+    """Écrit le CSV (avec repli horodaté) puis le tableau HTML (et sa copie .gz si compress_html)"""
+    final_count = len(df)
     output_file = "points_vente_casablanca_complet.csv"
     csv_ok = False
     try:
-        df.to_csv(output_file, index=False, encoding='utf-8-sig')
+        # Écrit à côté puis renommé : une exécution interrompue ne tronque jamais le dernier CSV valide
+        write_csv(df, output_file)
         print(f"\n[SUCCESS] {final_count} points de vente sauvegardes dans {output_file}")
         csv_ok = True
     except PermissionError:
         output_file = f"points_vente_casablanca_complet_{int(time.time())}.csv"
         try:
-            df.to_csv(output_file, index=False, encoding='utf-8-sig')
+            write_csv(df, output_file)
             print(f"\n[SUCCESS] {final_count} points de vente sauvegardes dans {output_file}")
             csv_ok = True
         except Exception as e:
             print(f"[ERROR] Impossible de sauvegarder le CSV: {e}")
 
-    # --- Génération du tableau HTML ---
+    # Zones calculées avec zone_mapping : enregistré pour le zonage incrémental (zoning.py)
+    if csv_ok:
+        from dataset import file_version
+        write_zone_record(output_file, file_version(output_file), zone_definitions(zone_mapping))
+
+    # --- Génération du tableau HTML (données compactes, pagination côté navigateur) ---
     html_file = output_file.replace('.csv', '.html')
     html_ok = False
     try:
-        df_html = df.to_html(index=False, escape=False)
-        with open(html_file, 'w', encoding='utf-8-sig') as f:
-            f.write(df_html)
-        print(f"[SUCCESS] Tableau HTML généré dans {html_file}")
+        write_html_table(df, html_file, title="Points de vente - Casablanca", compress=compress_html)
+        print(f"[SUCCESS] Tableau HTML généré dans {html_file}" + (" (+ .gz)" if compress_html else ""))
         html_ok = True
     except Exception as e:
         print(f"[ERROR] Impossible de générer le HTML: {e}")
@@ -344,6 +446,35 @@ def main():
         print(f"[ERROR] Le fichier CSV n'a pas été généré: {output_file}")
     if not html_ok or not os.path.exists(html_file):
         print(f"[ERROR] Le fichier HTML n'a pas été généré: {html_file}")
+    return output_file
+
+def main():
+    """Fonction principale"""
+    parser = argparse.ArgumentParser(description="Collecte OSM + ATP des points de vente")
+    parser.add_argument("--resume", action="store_true",
+                        help="Reprend la collecte là où la précédente s'est arrêtée")
+    parser.add_argument("--html-gz", action="store_true",
+                        help="Écrit aussi le tableau HTML précompressé (.html.gz)")
+    args = parser.parse_args()
+    
+    print("="*70)
+    print("COLLECTE COMPLETE DES POINTS DE VENTE - CASABLANCA")
+    print("="*70)
+    
+    # --- Collecte OSM ---
+    try:
+        osm_points = collect_osm_points(resume=args.resume)
+    except RuntimeError as e:
+        print(f"[ERROR] {e} : fichiers existants conserves")
+        return
+    # --- Collecte ATP/AllThePlaces ---
+    atp_points = load_atp_points()
+    # --- Fusion des points ---
+    df = build_points_dataframe(osm_points, atp_points)
+    if df is None:
+        return
+    # --- Sauvegarde ---
+    save_outputs(df, compress_html=args.html_gz)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+"""
+Serveur local remplaçant Overpass et Nominatim pour des exécutions de bout
+en bout hors ligne : réponses tirées d'un enregistrement (réponse Overpass
+JSON ou CSV de points) ou de données synthétiques, avec latence, taux
+d'erreur et taille des réponses configurables. Le pipeline s'y branche par
+execute_all.py --services http://127.0.0.1:8766 (ou les variables
+d'environnement OVERPASS_URL / NOMINATIM_URL).
+"""
+
+import argparse
+import json
+import random
+import re
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import numpy as np
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8766
+DEFAULT_SYNTHETIC_ROWS = 5000
+ERROR_STATUSES = (429, 504)  # refus de charge et dépassement de délai, comme Overpass
+
+BBOX_PATTERN = re.compile(r"\(\s*(-?\d+(?:\.\d+)?)\s*,\s*(-?\d+(?:\.\d+)?)\s*,"
+                          r"\s*(-?\d+(?:\.\d+)?)\s*,\s*(-?\d+(?:\.\d+)?)\s*\)")
+FILTER_PATTERN = re.compile(r'\[\s*"([^"]+)"\s*=\s*"([^"]+)"\s*\]')
+
+def load_elements(fixture=None, rows=DEFAULT_SYNTHETIC_ROWS, seed=0):
+    """Éléments Overpass servis : réponse enregistrée (.json), CSV de points
+    (converti en nœuds) ou jeu synthétique de rows points"""
+    if fixture and fixture.endswith(".json"):
+        with open(fixture, 'r', encoding='utf-8') as f:
+            return json.load(f)["elements"]
+    import pandas as pd
+    from synthetic_data import generate_points, load_profile, osm_elements
+    if fixture:
+        df = pd.read_csv(fixture)
+    else:
+        df = generate_points(rows, load_profile(), seed=seed, duplicate_rate=0.0)
+    return osm_elements(df)
+
+class Fixtures:
+    """Éléments pré-sérialisés et indexés (coordonnées, tags filtrables)"""
+
+    def __init__(self, elements, padding=0):
+        self.size = len(elements)
+        self.lat = np.empty(self.size)
+        self.lon = np.empty(self.size)
+        self.tags = []
+        records = []
+        for i, element in enumerate(elements):
+            point = element if element.get("type") == "node" else element.get("center", {})
+            self.lat[i], self.lon[i] = point.get("lat", np.nan), point.get("lon", np.nan)
+            tags = dict(element.get("tags", {}))
+            if padding:
+                # Taille des réponses : tag de remplissage (comme les nombreux tags d'un vrai objet OSM)
+                tags["description"] = "x" * padding
+            self.tags.append(tags)
+            records.append(json.dumps({**element, "tags": tags}, ensure_ascii=False, separators=(',', ':')))
+        self.records = np.array(records, dtype=object)
+        # Chaque couple clé=valeur -> masque des éléments portant ce tag
+        self.by_tag = {}
+        for i, tags in enumerate(self.tags):
+            for key, value in tags.items():
+                if key != "description":
+                    self.by_tag.setdefault((key, value), []).append(i)
+        self.by_tag = {tag: np.array(rows) for tag, rows in self.by_tag.items()}
+
+    def query(self, text):
+        """Éléments d'une requête Overpass QL : première bbox et filtres ["clé"="valeur"]"""
+        match = BBOX_PATTERN.search(text)
+        mask = np.ones(self.size, dtype=bool)
+        if match:
+            south, west, north, east = map(float, match.groups())
+            mask = (self.lat >= south) & (self.lat <= north) & (self.lon >= west) & (self.lon <= east)
+        filters = set(FILTER_PATTERN.findall(text))
+        if filters:
+            wanted = np.zeros(self.size, dtype=bool)
+            for tag in filters:
+                if tag in self.by_tag:
+                    wanted[self.by_tag[tag]] = True
+            mask &= wanted
+        return self.records[mask]
+
+class StandIn:
+    """Routes Overpass (/api/interpreter) et Nominatim (/reverse, /search),
+    avec latence et erreurs simulées"""
+
+    def __init__(self, fixtures, latency_ms=0.0, jitter_ms=0.0, error_rate=0.0, seed=0):
+        self.fixtures = fixtures
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.stats = {"requests": 0, "errors": 0, "bytes": 0}
+        from zoning import current_definitions
+        self.definitions = current_definitions()
+
+    def simulate(self):
+        """Latence tirée au hasard ; retourne un statut d'erreur ou None"""
+        with self.lock:
+            delay = self.latency_ms + self.rng.uniform(0, self.jitter_ms)
+            failed = self.rng.random() < self.error_rate
+            status = self.rng.choice(ERROR_STATUSES) if failed else None
+            self.stats["requests"] += 1
+            self.stats["errors"] += failed
+        if delay:
+            time.sleep(delay / 1000)
+        return status
+
+    def count_bytes(self, body):
+        with self.lock:
+            self.stats["bytes"] += len(body)
+
+    def handle(self, path, params):
+        """Retourne (statut, corps JSON en octets)"""
+        if path == "/health":
+            return 200, json.dumps({"status": "ok", "elements": self.fixtures.size, **self.stats}).encode('utf-8')
+        if path not in ("/api/interpreter", "/reverse", "/search"):
+            raise LookupError(path)
+        status = self.simulate()
+        if status:
+            return status, json.dumps({"error": "erreur simulée"}).encode('utf-8')
+        if path == "/api/interpreter":
+            records = self.fixtures.query(params.get("data", [""])[0])
+            body = ('{"version":0.6,"generator":"osm_standin","elements":['
+                    + ",".join(records) + ']}').encode('utf-8')
+        elif path == "/reverse":
+            body = json.dumps(self.reverse(float(params["lat"][0]), float(params["lon"][0])),
+                              ensure_ascii=False).encode('utf-8')
+        else:
+            body = json.dumps(self.search(params.get("q", [""])[0]), ensure_ascii=False).encode('utf-8')
+        self.count_bytes(body)
+        return 200, body
+
+    def reverse(self, lat, lon):
+        """Adresse d'un point : quartier d'après les zones du projet, sinon la ville"""
+        from zoning import DEFAULT_ZONE, assign_zones
+        zone = assign_zones([lat], [lon], self.definitions)[0]
+        address = {"city": "Casablanca", "country": "Maroc", "country_code": "ma"}
+        if zone != DEFAULT_ZONE:
+            address["suburb"] = zone
+        return {
+            "place_id": zlib.crc32(f"{lat:.5f},{lon:.5f}".encode('ascii')),
+            "lat": f"{lat:.7f}",
+            "lon": f"{lon:.7f}",
+            "display_name": ", ".join(filter(None, [address.get("suburb"), "Casablanca", "Maroc"])),
+            "address": address,
+        }
+
+    def search(self, query):
+        """Premier élément dont le nom contient le début de la requête (avant la virgule)"""
+        needle = query.split(",")[0].strip().lower()
+        for i, tags in enumerate(self.fixtures.tags):
+            if needle and needle in tags.get("name", "").lower():
+                lat, lon = self.fixtures.lat[i], self.fixtures.lon[i]
+                return [{"place_id": i, "lat": f"{lat:.7f}", "lon": f"{lon:.7f}",
+                         "display_name": f"{tags['name']}, Casablanca, Maroc"}]
+        return []
+
+def make_handler(standin):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        disable_nagle_algorithm = True
+        server_version = "OsmStandIn/1.0"
+
+        def do_GET(self):
+            url = urlsplit(self.path)
+            self.respond(url.path.rstrip("/") or "/", parse_qs(url.query))
+
+        def do_POST(self):
+            # Overpass accepte aussi la requête dans le corps (data=...)
+            length = int(self.headers.get("Content-Length", 0))
+            url = urlsplit(self.path)
+            params = parse_qs(url.query)
+            params.update(parse_qs(self.rfile.read(length).decode('utf-8')))
+            self.respond(url.path.rstrip("/") or "/", params)
+
+        def respond(self, path, params):
+            try:
+                status, body = standin.handle(path, params)
+            except LookupError:
+                status, body = 404, json.dumps({"error": f"ressource inconnue : {path}"}).encode('utf-8')
+            except (KeyError, ValueError) as e:
+                status, body = 400, json.dumps({"error": f"paramètre invalide : {e}"}).encode('utf-8')
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+def run_server(standin, host=DEFAULT_HOST, port=DEFAULT_PORT):
+    server = ThreadingHTTPServer((host, port), make_handler(standin))
+    server.daemon_threads = True
+    print(f"[INFO] Overpass / Nominatim simulés sur http://{host}:{server.server_address[1]} "
+          f"({standin.fixtures.size} éléments)")
+    return server
+
+def main():
+    """Fonction principale"""
+    parser = argparse.ArgumentParser(description="Serveur local remplaçant Overpass et Nominatim")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--fixture", help="Réponse Overpass enregistrée (.json) ou CSV de points "
+                                          "(par défaut : jeu synthétique)")
+    parser.add_argument("--rows", type=int, default=DEFAULT_SYNTHETIC_ROWS, help="Taille du jeu synthétique")
+    parser.add_argument("--padding", type=int, default=0, help="Octets ajoutés à chaque élément (taille des réponses)")
+    parser.add_argument("--latency", type=float, default=0.0, help="Latence de chaque requête (ms)")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Latence supplémentaire aléatoire (0 à N ms)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Part des requêtes en erreur (429 / 504)")
+    parser.add_argument("--seed", type=int, default=0, help="Graine (jeu synthétique, latences, erreurs)")
+    args = parser.parse_args()
+
+    fixtures = Fixtures(load_elements(args.fixture, args.rows, args.seed), padding=args.padding)
+    standin = StandIn(fixtures, args.latency, args.jitter, args.error_rate, args.seed)
+    server = run_server(standin, args.host, args.port)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print(f"\n[INFO] Arrêt du serveur ({standin.stats['requests']} requêtes, {standin.stats['errors']} erreurs)")
+    finally:
+        server.server_close()
+
+if __name__ == "__main__":
+    main()
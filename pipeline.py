@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+"""
+Orchestrateur de pipeline : étapes déclarées avec dépendances, exécutées
+en parallèle dans un seul processus, avec cache par empreinte des entrées
+"""
+
+import hashlib
+import json
+import os
+import pickle
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from pathlib import Path
+
+import telemetry
+
+CACHE_DIR = ".pipeline_cache"
+
+# Politiques en cas d'échec d'une étape
+POLICY_STOP = "stop"          # plus aucune nouvelle étape n'est lancée
+POLICY_CONTINUE = "continue"  # seules les étapes dépendantes sont ignorées
+
+def normalize_stage(stage):
+    """Complète une déclaration d'étape avec les valeurs par défaut"""
+    return {
+        "name": stage["name"],
+        "func": stage["func"],
+        "description": stage.get("description", stage["name"]),
+        "deps": list(stage.get("deps", [])),
+        "inputs": list(stage.get("inputs", [])),
+        "outputs": list(stage.get("outputs", [])),
+        "cacheable": stage.get("cacheable", True),
+        "cache_token": stage.get("cache_token", ""),
+    }
+
+def topological_order(stages):
+    """Vérifie le graphe (noms, dépendances, cycles) et retourne un ordre valide"""
+    by_name = {}
+    for stage in stages:
+        if stage["name"] in by_name:
+            raise ValueError(f"Étape déclarée deux fois: {stage['name']}")
+        by_name[stage["name"]] = stage
+    for stage in stages:
+        for dep in stage["deps"]:
+            if dep not in by_name:
+                raise ValueError(f"Dépendance inconnue '{dep}' pour l'étape {stage['name']}")
+
+    remaining = {name: set(stage["deps"]) for name, stage in by_name.items()}
+    order = []
+    while remaining:
+        ready = [name for name, deps in remaining.items() if not deps]
+        if not ready:
+            raise ValueError(f"Cycle de dépendances entre: {', '.join(sorted(remaining))}")
+        for name in ready:
+            order.append(name)
+            del remaining[name]
+        for deps in remaining.values():
+            deps.difference_update(ready)
+    return order
+
+def file_digest(path):
+    """Empreinte SHA-256 d'un fichier (lecture par blocs)"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def expand_paths(patterns):
+    """Développe les motifs glob des entrées/sorties en chemins existants"""
+    paths = []
+    for pattern in patterns:
+        if any(ch in pattern for ch in "*?["):
+            paths.extend(sorted(str(p) for p in Path('.').glob(pattern)))
+        else:
+            paths.append(pattern)
+    return paths
+
+def result_digest(result):
+    """Empreinte du résultat d'une étape, transmise aux étapes dépendantes"""
+    try:
+        return hashlib.sha256(pickle.dumps(result)).hexdigest()
+    except Exception:
+        # Résultat non sérialisable : empreinte unique, invalide le cache en aval
+        return f"run-{time.time()}"
+
+def stage_cache_key(stage, dep_keys):
+    """Clé de cache : nom, jeton, fichiers d'entrée et empreintes des dépendances"""
+    digest = hashlib.sha256()
+    digest.update(stage["name"].encode('utf-8'))
+    digest.update(str(stage["cache_token"]).encode('utf-8'))
+    for path in expand_paths(stage["inputs"]):
+        file_hash = file_digest(path) if os.path.exists(path) else "absent"
+        digest.update(f"{path}:{file_hash}".encode('utf-8'))
+    for dep in stage["deps"]:
+        digest.update(f"{dep}:{dep_keys.get(dep, '')}".encode('utf-8'))
+    return digest.hexdigest()
+
+def load_cached_result(stage, key, cache_dir=CACHE_DIR):
+    """Retourne (True, résultat) si le cache de l'étape est valide pour cette clé"""
+    meta_file = os.path.join(cache_dir, f"{stage['name']}.json")
+    result_file = os.path.join(cache_dir, f"{stage['name']}.pkl")
+    if not os.path.exists(meta_file) or not os.path.exists(result_file):
+        return False, None
+    try:
+        with open(meta_file, 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        if meta.get("key") != key:
+            return False, None
+        if "digest" not in meta:
+            return False, None
+        for path, expected in meta.get("outputs", {}).items():
+            if not os.path.exists(path) or file_digest(path) != expected:
+                return False, None
+        with open(result_file, 'rb') as f:
+            return True, (pickle.load(f), meta["digest"])
+    except Exception as e:
+        print(f"[WARNING] Cache illisible pour {stage['name']}: {e}")
+        return False, None
+
+def store_cached_result(stage, key, result, digest, cache_dir=CACHE_DIR):
+    """Enregistre le résultat et l'empreinte des sorties (écriture atomique)"""
+    os.makedirs(cache_dir, exist_ok=True)
+    outputs = {path: file_digest(path) for path in expand_paths(stage["outputs"]) if os.path.exists(path)}
+    result_file = os.path.join(cache_dir, f"{stage['name']}.pkl")
+    meta_file = os.path.join(cache_dir, f"{stage['name']}.json")
+    try:
+        with open(result_file + ".tmp", 'wb') as f:
+            pickle.dump(result, f)
+        os.replace(result_file + ".tmp", result_file)
+        with open(meta_file + ".tmp", 'w', encoding='utf-8') as f:
+            json.dump({"key": key, "digest": digest, "outputs": outputs, "created": time.time()}, f, indent=2)
+        os.replace(meta_file + ".tmp", meta_file)
+    except Exception as e:
+        print(f"[WARNING] Impossible de mettre en cache {stage['name']}: {e}")
+
+def run_stage(stage, context):
+    """Exécute une étape ; la fonction reçoit les résultats de ses dépendances"""
+    deps = {dep: context[dep] for dep in stage["deps"]}
+    counts = [telemetry.count_rows(value) for value in deps.values()]
+    # Lignes en entrée inconnues dès qu'une dépendance n'est pas mesurable (chemin de fichier...)
+    rows_in = sum(counts) if counts and None not in counts else None
+    start = time.time()
+    with telemetry.track(stage["name"], rows_in=rows_in) as record:
+        result = stage["func"](deps)
+        record["rows_out"] = telemetry.count_rows(result)
+    return result, time.time() - start
+
+def run_pipeline(stages, policy=POLICY_STOP, max_workers=4, use_cache=True, cache_dir=CACHE_DIR):
+    """Exécute les étapes en respectant les dépendances.
+
+    Les étapes indépendantes tournent en parallèle (threads) et partagent
+    leurs résultats en mémoire. Une étape en cache est sautée si ses fichiers
+    d'entrée et les résultats de ses dépendances n'ont pas changé.
+    Retourne un rapport {nom: {statut, durée, cache}}.
+    """
+    if policy not in (POLICY_STOP, POLICY_CONTINUE):
+        raise ValueError(f"Politique inconnue: {policy}")
+    stages = [normalize_stage(stage) for stage in stages]
+    order = topological_order(stages)
+    by_name = {stage["name"]: stage for stage in stages}
+
+    context = {}
+    keys = {}
+    digests = {}
+    report = {name: {"statut": "en attente", "duree": 0.0, "cache": False} for name in order}
+    pending = list(order)
+    running = {}
+    stopped = False
+
+    def skip_dependents(failed):
+        for name in list(pending):
+            if name in pending and failed in by_name[name]["deps"]:
+                pending.remove(name)
+                report[name]["statut"] = "ignoré"
+                print(f"[WARNING] Étape {name} ignorée (dépendance {failed} en échec)")
+                skip_dependents(name)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        while pending or running:
+            if not stopped:
+                for name in list(pending):
+                    stage = by_name[name]
+                    if not all(report[dep]["statut"] in ("succès", "cache") for dep in stage["deps"]):
+                        continue
+                    pending.remove(name)
+                    keys[name] = stage_cache_key(stage, digests)
+                    if use_cache and stage["cacheable"]:
+                        hit, cached = load_cached_result(stage, keys[name], cache_dir)
+                        if hit:
+                            context[name], digests[name] = cached
+                            report[name]["statut"] = "cache"
+                            report[name]["cache"] = True
+                            print(f"[INFO] {stage['description']} : résultat en cache")
+                            continue
+                    print(f"\n[INFO] 🚀 {stage['description']}")
+                    running[executor.submit(run_stage, stage, context)] = name
+                    report[name]["statut"] = "en cours"
+
+            # L'ordre topologique garantit qu'une étape en cache débloque
+            # ses dépendantes dans la même passe : rien ne tourne => fini
+            if not running:
+                break
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = running.pop(future)
+                stage = by_name[name]
+                try:
+                    result, duration = future.result()
+                    context[name] = result
+                    digests[name] = result_digest(result)
+                    report[name].update({"statut": "succès", "duree": duration})
+                    print(f"[SUCCESS] {name} terminé en {duration:.1f}s")
+                    if use_cache and stage["cacheable"]:
+                        store_cached_result(stage, keys[name], result, digests[name], cache_dir)
+                except Exception as e:
+                    report[name]["statut"] = "échec"
+                    print(f"[ERROR] Échec de l'étape {name}: {e}")
+                    if policy == POLICY_STOP:
+                        stopped = True
+                    else:
+                        skip_dependents(name)
+
+    for name in pending:
+        report[name]["statut"] = "annulé"
+    return report
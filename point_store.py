@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+"""
+Stockage binaire en colonnes des points de vente, ouvert par projection
+mémoire (numpy memmap) : coordonnées en tableaux float64 contigus,
+attributs texte en codes entiers et dictionnaires de valeurs. Plusieurs
+processus ouvrant le même stockage partagent une seule copie en cache
+disque, sans analyse du CSV.
+"""
+
+import argparse
+import json
+import os
+import shutil
+import time
+
+import numpy as np
+import pandas as pd
+
+from checkpoint import atomic_write_json
+
+STORE_SUFFIX = ".store"
+META_FILE = "meta.json"
+
+def store_path(dataset_path):
+    """Dossier du stockage associé à un CSV"""
+    return os.path.splitext(dataset_path)[0] + STORE_SUFFIX
+
+def code_dtype(n_labels):
+    """Plus petit type entier signé pour n_labels valeurs (-1 = manquant)"""
+    for dtype in (np.int8, np.int16, np.int32):
+        if n_labels < np.iinfo(dtype).max:
+            return dtype
+    return np.int64
+
+def label_value(label):
+    """Valeur d'une étiquette : booléen conservé (colonne booléenne avec manquants), texte sinon"""
+    return bool(label) if isinstance(label, (bool, np.bool_)) else str(label)
+
+def column_filename(index, suffix):
+    # Noms de fichiers indépendants des noms de colonnes (accents, espaces)
+    return f"col{index:03d}{suffix}"
+
+def write_store(df, dataset_path, version):
+    """Écrit le stockage d'un jeu de données (dossier remplacé d'un bloc).
+
+    Les colonnes numériques et booléennes sont écrites telles quelles, les
+    autres sont codées (pd.factorize) avec leur dictionnaire de valeurs en JSON.
+    """
+    path = store_path(dataset_path)
+    tmp_path = f"{path}.tmp-{os.getpid()}"
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    os.makedirs(tmp_path)
+    columns = []
+    for index, column in enumerate(df.columns):
+        series = df[column]
+        if pd.api.types.is_numeric_dtype(series):
+            values = series.to_numpy()
+            filename = column_filename(index, ".npy")
+            np.save(os.path.join(tmp_path, filename), np.ascontiguousarray(values))
+            columns.append({"name": column, "kind": "numeric", "file": filename, "dtype": str(values.dtype)})
+        else:
+            codes, labels = pd.factorize(series.astype(object), sort=True)
+            filename = column_filename(index, ".npy")
+            labels_file = column_filename(index, ".labels.json")
+            np.save(os.path.join(tmp_path, filename), codes.astype(code_dtype(len(labels))))
+            with open(os.path.join(tmp_path, labels_file), 'w', encoding='utf-8') as f:
+                json.dump([label_value(label) for label in labels], f, ensure_ascii=False)
+            columns.append({"name": column, "kind": "codes", "file": filename, "labels": labels_file,
+                            "n_labels": len(labels)})
+    # Métadonnées écrites en dernier : un dossier sans meta.json est incomplet
+    atomic_write_json(os.path.join(tmp_path, META_FILE),
+                      {"version": version, "rows": len(df), "columns": columns})
+    # Les lecteurs ayant encore l'ancien stockage projeté en mémoire le gardent
+    # (fichiers supprimés mais toujours ouverts)
+    if os.path.exists(path):
+        old_path = f"{path}.old-{time.time_ns()}"
+        os.replace(path, old_path)
+        os.replace(tmp_path, path)
+        shutil.rmtree(old_path, ignore_errors=True)
+    else:
+        os.replace(tmp_path, path)
+    return path
+
+class PointStore:
+    """Accès en colonnes à un stockage : tableaux projetés en mémoire (lecture seule).
+
+    column() retourne le tableau brut (valeurs ou codes) sans copie ;
+    labels() le dictionnaire d'une colonne codée ; to_frame() reconstruit
+    un DataFrame identique au CSV, éventuellement limité à des colonnes ou
+    des positions. Les index (grille, filtres) se construisent directement
+    depuis coordinates() et les codes, sans passer par un DataFrame.
+    """
+
+    def __init__(self, meta, arrays, labels=None, path=None):
+        self.path = path
+        self.version = meta["version"]
+        self.size = meta["rows"]
+        self.meta = {spec["name"]: spec for spec in meta["columns"]}
+        self.columns = [spec["name"] for spec in meta["columns"]]
+        self.arrays = arrays
+        self._labels = labels or {}
+
+    @classmethod
+    def open(cls, path):
+        """Ouvre un stockage existant ; les colonnes sont projetées, pas lues"""
+        with open(os.path.join(path, META_FILE), 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        arrays = {spec["name"]: np.load(os.path.join(path, spec["file"]), mmap_mode='r')
+                  for spec in meta["columns"]}
+        return cls(meta, arrays, path=path)
+
+    @classmethod
+    def from_frame(cls, df, version):
+        """Stockage en mémoire (mêmes codes que sur disque), sans fichier"""
+        columns, arrays, labels = [], {}, {}
+        for column in df.columns:
+            series = df[column]
+            if pd.api.types.is_numeric_dtype(series):
+                arrays[column] = series.to_numpy()
+                columns.append({"name": column, "kind": "numeric"})
+            else:
+                codes, values = pd.factorize(series.astype(object), sort=True)
+                arrays[column] = codes.astype(code_dtype(len(values)))
+                labels[column] = np.array([label_value(v) for v in values], dtype=object)
+                columns.append({"name": column, "kind": "codes"})
+        return cls({"version": version, "rows": len(df), "columns": columns}, arrays, labels)
+
+    def __len__(self):
+        return self.size
+
+    def column(self, name):
+        """Valeurs (colonne numérique) ou codes (colonne texte), sans copie"""
+        return self.arrays[name]
+
+    def labels(self, name):
+        """Dictionnaire d'une colonne codée (tableau objet, chargé au premier accès)"""
+        if name not in self._labels:
+            with open(os.path.join(self.path, self.meta[name]["labels"]), 'r', encoding='utf-8') as f:
+                self._labels[name] = np.array(json.load(f), dtype=object)
+        return self._labels[name]
+
+    def is_coded(self, name):
+        return self.meta[name]["kind"] == "codes"
+
+    def decode(self, name, positions=None):
+        """Valeurs d'une colonne (texte décodé, NaN si manquant)"""
+        values = self.arrays[name] if positions is None else self.arrays[name][positions]
+        if not self.is_coded(name):
+            return np.asarray(values)
+        labels = self.labels(name)
+        if not len(labels):
+            return np.full(len(values), np.nan, dtype=object)
+        decoded = labels[np.maximum(values, 0)]
+        decoded[values < 0] = np.nan
+        return decoded
+
+    def coordinates(self):
+        """(latitude, longitude) en float64, sans copie si le stockage est déjà en float ;
+        une colonne contenant du texte est convertie (valeurs non numériques -> NaN)"""
+        return tuple(pd.to_numeric(self.decode(name), errors='coerce').astype(float) if self.is_coded(name)
+                     else np.asarray(self.arrays[name], dtype=float)
+                     for name in ('Latitude', 'Longitude'))
+
+    def to_frame(self, columns=None, positions=None, copy=True):
+        """DataFrame des colonnes et positions demandées.
+
+        Avec copy=False, les colonnes numériques restent les tableaux projetés
+        (partagés entre processus, lecture seule : le DataFrame ne doit pas
+        être modifié en place) ; seules les colonnes texte sont décodées.
+        """
+        columns = columns or self.columns
+        return pd.DataFrame({name: self.decode(name, positions) for name in columns}, columns=columns,
+                            copy=copy)
+
+def materialize(dataset_path, version=None):
+    """Étape de pipeline : (re)génère le stockage en colonnes d'un CSV"""
+    from dataset import file_version
+    version = version or file_version(dataset_path)
+    df = pd.read_csv(dataset_path)
+    path = write_store(df, dataset_path, version)
+    print(f"[SUCCESS] Stockage en colonnes écrit dans {path} ({len(df)} lignes)")
+    return path
+
+def load_store(dataset_path, version, loader=None):
+    """Ouvre le stockage si sa version correspond, sinon le régénère.
+
+    loader() doit retourner le DataFrame (permet de réutiliser un cache) ;
+    par défaut le CSV est relu.
+    """
+    path = store_path(dataset_path)
+    if os.path.exists(os.path.join(path, META_FILE)):
+        try:
+            store = PointStore.open(path)
+            if store.version == version:
+                return store
+        except (OSError, ValueError, KeyError):
+            pass
+    df = loader() if loader else pd.read_csv(dataset_path)
+    try:
+        write_store(df, dataset_path, version)
+        return PointStore.open(path)
+    except OSError:
+        # Dossier en lecture seule : stockage gardé en mémoire uniquement
+        return PointStore.from_frame(df, version)
+
+def main():
+    """Fonction principale"""
+    parser = argparse.ArgumentParser(description="Stockage en colonnes (memmap) du jeu de données")
+    parser.add_argument("--dataset", help="CSV source (par défaut : jeu de données courant)")
+    parser.add_argument("--bench", action="store_true", help="Compare le chargement CSV et le stockage")
+    args = parser.parse_args()
+
+    if args.dataset:
+        from dataset import file_version
+        path, version = args.dataset, file_version(args.dataset)
+    else:
+        from dataset import current_dataset
+        path, version = current_dataset()
+    materialize(path, version)
+    if args.bench:
+        start = time.perf_counter()
+        pd.read_csv(path)
+        csv_s = time.perf_counter() - start
+        start = time.perf_counter()
+        store = PointStore.open(store_path(path))
+        lat, lon = store.coordinates()
+        open_s = time.perf_counter() - start
+        start = time.perf_counter()
+        store.to_frame()
+        frame_s = time.perf_counter() - start
+        print(f"⏱️ CSV : {csv_s * 1000:.1f} ms | ouverture + coordonnées : {open_s * 1000:.2f} ms | "
+              f"DataFrame complet : {frame_s * 1000:.1f} ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+"""
+Recherche de proximité sur les points de vente : points dans un rayon et
+k plus proches voisins, avec filtres et requêtes groupées
+"""
+
+import numpy as np
+import pandas as pd
+
+from density_grid import projection_origin, to_meters
+from spatial_index import GridIndex
+
+DEFAULT_CELL_M = 250  # taille des cellules de l'index en mètres
+MAX_PAIRS = 5_000_000  # paires candidates traitées par lot (mémoire bornée)
+
+def cell_join(qx, qy, x, y, radius_m, max_pairs=MAX_PAIRS):
+    """Paires (requête, point, distance) à moins de radius_m, par lots.
+
+    Requêtes et points sont rangés dans des cellules de radius_m de côté :
+    les points proches d'une requête sont dans les 9 cellules qui
+    l'entourent, chacune étant une tranche contiguë du tri des points
+    (searchsorted). Toutes les paires d'une requête sont dans le même lot.
+    """
+    if not len(qx) or not len(x):
+        return
+    cell = max(radius_m, 1.0)
+    col, qcol = np.floor(x / cell).astype(np.int64), np.floor(qx / cell).astype(np.int64)
+    row, qrow = np.floor(y / cell).astype(np.int64), np.floor(qy / cell).astype(np.int64)
+    col_origin = min(col.min(), qcol.min()) - 1
+    row_origin = min(row.min(), qrow.min()) - 1
+    col, qcol, row, qrow = col - col_origin, qcol - col_origin, row - row_origin, qrow - row_origin
+    width = int(max(col.max(), qcol.max())) + 2
+    order = np.argsort(row * width + col, kind='stable')
+    sorted_keys = (row * width + col)[order]
+    query_keys = qrow * width + qcol
+    offsets = [dr * width + dc for dr in (-1, 0, 1) for dc in (-1, 0, 1)]
+    starts = np.stack([np.searchsorted(sorted_keys, query_keys + o, side='left') for o in offsets])
+    ends = np.stack([np.searchsorted(sorted_keys, query_keys + o, side='right') for o in offsets])
+    lengths = (ends - starts).sum(axis=0)
+    # Lots de requêtes dont le nombre total de candidats reste sous max_pairs
+    bounds = np.searchsorted(np.cumsum(lengths), np.arange(max_pairs, lengths.sum() + max_pairs, max_pairs))
+    bounds = np.minimum(bounds, len(qx) - 1)
+    first = 0
+    for last in np.unique(np.append(bounds, len(qx) - 1)):
+        queries = np.arange(first, last + 1)
+        first = last + 1
+        if not len(queries):
+            continue
+        i_parts, j_parts = [], []
+        for k in range(len(offsets)):
+            n = ends[k, queries] - starts[k, queries]
+            i = np.repeat(queries, n)
+            # Position de chaque candidat dans sa tranche : arange global moins début de tranche
+            within = np.arange(len(i)) - np.repeat(np.cumsum(n) - n, n)
+            i_parts.append(i)
+            j_parts.append(order[np.repeat(starts[k, queries], n) + within])
+        i, j = np.concatenate(i_parts), np.concatenate(j_parts)
+        distance = np.hypot(qx[i] - x[j], qy[i] - y[j])
+        keep = distance <= radius_m
+        yield i[keep], j[keep], distance[keep]
+
+def sort_pairs(i, j, distance):
+    """Paires triées par requête puis distance"""
+    order = np.lexsort((distance, i))
+    return i[order], j[order], distance[order]
+
+class ProximityIndex:
+    """Index de proximité sur coordonnées projetées (mètres, plan local).
+
+    Les points sont rangés dans une grille régulière (GridIndex) ; une
+    recherche par rayon ne lit que les cellules couvrant le cercle, un
+    k-NN élargit le rayon jusqu'à trouver k points. Les positions
+    retournées sont celles des lignes du DataFrame d'origine.
+    """
+
+    def __init__(self, lat, lon, cell_m=DEFAULT_CELL_M, origin=None):
+        lat = np.asarray(lat, dtype=float)
+        lon = np.asarray(lon, dtype=float)
+        valid = np.isfinite(lat) & np.isfinite(lon)
+        self.origin = origin or (projection_origin(lat[valid], lon[valid]) if valid.any() else (0.0, 0.0))
+        self.x, self.y = to_meters(lat, lon, self.origin)
+        self.grid = GridIndex(self.y, self.x, cell_deg=cell_m)
+        self.cell_m = cell_m
+        if len(self.grid):
+            self.extent = (self.x[valid].min(), self.y[valid].min(), self.x[valid].max(), self.y[valid].max())
+            area = max(self.extent[2] - self.extent[0], cell_m) * max(self.extent[3] - self.extent[1], cell_m)
+            self.density = len(self.grid) / area  # points par m², pour le rayon initial du k-NN
+        else:
+            self.extent, self.density = (0.0, 0.0, 0.0, 0.0), 0.0
+
+    @classmethod
+    def from_frame(cls, df, cell_m=DEFAULT_CELL_M):
+        """Index des colonnes Latitude/Longitude d'un DataFrame (valeurs non numériques ignorées)"""
+        return cls(pd.to_numeric(df['Latitude'], errors='coerce').to_numpy(dtype=float),
+                   pd.to_numeric(df['Longitude'], errors='coerce').to_numpy(dtype=float),
+                   cell_m=cell_m)
+
+    def __len__(self):
+        return len(self.grid)
+
+    def _project(self, lat, lon):
+        x, y = to_meters(np.asarray(lat, dtype=float), np.asarray(lon, dtype=float), self.origin)
+        return float(x), float(y)
+
+    def _within(self, x, y, radius_m, mask=None):
+        positions = self.grid.query_bbox(y - radius_m, x - radius_m, y + radius_m, x + radius_m, mask=mask)
+        distances = np.hypot(self.x[positions] - x, self.y[positions] - y)
+        inside = distances <= radius_m
+        return positions[inside], distances[inside]
+
+    def radius(self, lat, lon, radius_m, mask=None):
+        """Points à moins de radius_m mètres ; retourne (positions, distances) triés par distance"""
+        positions, distances = self._within(*self._project(lat, lon), radius_m, mask)
+        order = np.argsort(distances, kind='stable')
+        return positions[order], distances[order]
+
+    def nearest(self, lat, lon, k=10, mask=None):
+        """k plus proches points ; retourne (positions, distances) triés par distance"""
+        x, y = self._project(lat, lon)
+        if not len(self) or k <= 0:
+            return np.empty(0, dtype=np.int64), np.empty(0)
+        selected = len(self) if mask is None else int(np.count_nonzero(np.asarray(mask)[self.grid.positions]))
+        k = min(k, selected)
+        # Rayon initial d'après la densité moyenne, doublé jusqu'à contenir k points
+        radius_m = max(self.cell_m, np.sqrt(k / (np.pi * self.density)))
+        # Au-delà du coin le plus éloigné de l'emprise, tous les points sont couverts
+        x_min, y_min, x_max, y_max = self.extent
+        reach = np.hypot(max(abs(x - x_min), abs(x - x_max)), max(abs(y - y_min), abs(y - y_max)))
+        while True:
+            positions, distances = self._within(x, y, radius_m, mask)
+            if len(positions) >= k or radius_m >= reach:
+                break
+            radius_m = min(2 * radius_m, reach)
+        order = np.argsort(distances, kind='stable')[:k]
+        return positions[order], distances[order]
+
+    def _selected(self, mask=None):
+        """Positions indexées (coordonnées valides), restreintes à mask"""
+        positions = self.grid.positions
+        return positions if mask is None else positions[np.asarray(mask)[positions]]
+
+    def _project_many(self, centres):
+        centres = np.asarray(centres, dtype=float).reshape(-1, 2)
+        return to_meters(centres[:, 0], centres[:, 1], self.origin)
+
+    def radius_batch(self, centres, radius_m, mask=None):
+        """Rayon autour de plusieurs centres [(lat, lon), ...], en une jointure
+        par cellules (cell_join) plutôt qu'une requête par centre.
+
+        Retourne un DataFrame long (requete, position, distance_m), trié
+        par requête puis distance.
+        """
+        qx, qy = self._project_many(centres)
+        queries = np.flatnonzero(np.isfinite(qx) & np.isfinite(qy))
+        selected = self._selected(mask)
+        parts = [(queries[i], selected[j], d) for i, j, d in
+                 cell_join(qx[queries], qy[queries], self.x[selected], self.y[selected], radius_m)]
+        return batch_frame(parts)
+
+    def nearest_batch(self, centres, k=10, mask=None):
+        """k plus proches voisins de plusieurs centres (même format que radius_batch).
+
+        Tous les centres partent du même rayon (densité moyenne) ; ceux qui
+        n'ont pas encore k points sont relancés ensemble avec un rayon doublé.
+        """
+        qx, qy = self._project_many(centres)
+        selected = self._selected(mask)
+        k = min(k, len(selected))
+        pending = np.flatnonzero(np.isfinite(qx) & np.isfinite(qy))
+        if k <= 0 or not len(pending):
+            return batch_frame([])
+        px, py = self.x[selected], self.y[selected]
+        # Au-delà du coin le plus éloigné de l'emprise, tous les points sont couverts
+        x_min, y_min, x_max, y_max = self.extent
+        reach = np.hypot(np.maximum(abs(qx - x_min), abs(qx - x_max)), np.maximum(abs(qy - y_min), abs(qy - y_max)))
+        radius_m = max(self.cell_m, np.sqrt(k / (np.pi * self.density)))
+        parts = []
+        while len(pending):
+            found = np.zeros(len(pending), dtype=np.int64)
+            round_parts = []
+            for i, j, d in cell_join(qx[pending], qy[pending], px, py, radius_m):
+                i, j, d = sort_pairs(i, j, d)
+                found += np.bincount(i, minlength=len(pending))
+                # Rang dans la requête : les k plus proches seulement
+                rank = np.arange(len(i)) - np.searchsorted(i, i, side='left')
+                keep = rank < k
+                round_parts.append((i[keep], j[keep], d[keep]))
+            done = (found >= k) | (radius_m >= reach[pending])
+            for i, j, d in round_parts:
+                accepted = done[i]
+                parts.append((pending[i[accepted]], selected[j[accepted]], d[accepted]))
+            pending = pending[~done]
+            radius_m *= 2
+        return batch_frame(parts)
+
+def batch_frame(parts):
+    """DataFrame long (requete, position, distance_m) de paires, trié par requête puis distance"""
+    if parts:
+        i, j, d = sort_pairs(*(np.concatenate(column) for column in zip(*parts)))
+    else:
+        i, j, d = np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64), np.empty(0)
+    return pd.DataFrame({'requete': i, 'position': j, 'distance_m': d})
+
+def results_frame(df, positions, distances):
+    """Lignes trouvées, avec leur distance au centre (mètres, arrondie)"""
+    found = df.iloc[positions].copy()
+    found.insert(0, 'Distance (m)', np.round(distances).astype(int))
+    return found
@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+"""
+Contrôle qualité vectorisé des points de vente : règles appliquées une
+fois à l'ingestion, masque de drapeaux par ligne et rapport de synthèse
+lu par le tableau de bord
+"""
+
+import argparse
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from checkpoint import atomic_write_json
+
+QUALITY_SUFFIX = ".quality.json"
+FLAGS_SUFFIX = ".quality.npy"
+
+# Drapeaux (bits) : une ligne peut en cumuler plusieurs
+COORD_MISSING = 1 << 0         # latitude ou longitude absente
+COORD_INVALID = 1 << 1         # valeur non numérique
+COORD_ZERO = 1 << 2            # coordonnée à 0 (valeur par défaut d'une source)
+OUT_OF_REGION = 1 << 3         # hors du polygone de la région
+DUPLICATE_ID = 1 << 4          # identifiant déjà vu (colonne d'identifiant si présente)
+DUPLICATE_POINT = 1 << 5       # même nom aux mêmes coordonnées
+MISSING_NAME = 1 << 6          # nom absent ou générique ("... sans nom")
+UNKNOWN_CATEGORY = 1 << 7      # catégorie hors nomenclature
+UNKNOWN_STATUS = 1 << 8        # statut autre que Formel / Informel
+ADDRESS_IS_NAME = 1 << 9       # adresse qui ne fait que répéter le nom
+
+RULES = {
+    COORD_MISSING: "Coordonnées manquantes",
+    COORD_INVALID: "Coordonnées non numériques",
+    COORD_ZERO: "Coordonnées nulles",
+    OUT_OF_REGION: "Hors de la région",
+    DUPLICATE_ID: "Identifiant en double",
+    DUPLICATE_POINT: "Doublon (nom + coordonnées)",
+    MISSING_NAME: "Nom manquant ou générique",
+    UNKNOWN_CATEGORY: "Catégorie inconnue",
+    UNKNOWN_STATUS: "Statut inconnu",
+    ADDRESS_IS_NAME: "Adresse = nom",
+}
+# Lignes inutilisables pour la cartographie
+COORD_ERRORS = COORD_MISSING | COORD_INVALID | COORD_ZERO | OUT_OF_REGION
+
+KNOWN_CATEGORIES = {
+    'Supermarché', 'Supérette / Mini-market', 'Épicerie', 'Café', 'Restaurant',
+    'Grossiste / Distributeur régional', 'Kiosque', 'Boulangerie', 'Parapharmacie',
+    'Boutique de confiserie', 'Magasin bio',
+}
+KNOWN_STATUSES = {'Formel', 'Informel'}
+ID_COLUMNS = ['id', 'ID', 'osm_id', 'Identifiant']
+GENERIC_NAME_SUFFIX = "sans nom"
+
+# Grand Casablanca (approximatif) : emprise de la collecte limitée par le
+# trait de côte au nord-ouest, avec ~500 m de marge vers la mer.
+# Sommets (latitude, longitude).
+REGION_POLYGON = [
+    (33.400, -7.900), (33.525, -7.900), (33.580, -7.750), (33.603, -7.690),
+    (33.618, -7.652), (33.617, -7.632), (33.630, -7.560), (33.665, -7.480),
+    (33.705, -7.400), (33.705, -7.300), (33.400, -7.300),
+]
+
+def sidecar_paths(dataset_path):
+    """Chemins du rapport (JSON) et des drapeaux (numpy) associés à un CSV"""
+    base = os.path.splitext(dataset_path)[0]
+    return base + QUALITY_SUFFIX, base + FLAGS_SUFFIX
+
+def points_in_polygon(lat, lon, polygon=REGION_POLYGON):
+    """Test point-dans-polygone (lancer de rayon), vectorisé sur les points"""
+    inside = np.zeros(len(lat), dtype=bool)
+    vertices = np.asarray(polygon, dtype=float)
+    for (lat_a, lon_a), (lat_b, lon_b) in zip(vertices, np.roll(vertices, -1, axis=0)):
+        crosses = (lat_a > lat) != (lat_b > lat)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            lon_cross = lon_a + (lat - lat_a) * (lon_b - lon_a) / (lat_b - lat_a)
+        inside ^= crosses & (lon < lon_cross)
+    return inside
+
+def normalized_text(series):
+    """Texte comparable : minuscules, espaces réduits, vide si absent"""
+    return series.fillna("").astype(str).str.strip().str.lower().str.replace(r"\s+", " ", regex=True)
+
+def compute_flags(df, polygon=REGION_POLYGON):
+    """Applique toutes les règles ; retourne un tableau uint16 (un masque par ligne)"""
+    n = len(df)
+    flags = np.zeros(n, dtype=np.uint16)
+
+    coordinates = []
+    for column in ('Latitude', 'Longitude'):
+        raw = df[column] if column in df.columns else pd.Series(np.nan, index=df.index)
+        numeric = pd.to_numeric(raw, errors='coerce')
+        flags[raw.isna().to_numpy()] |= COORD_MISSING
+        flags[(numeric.isna() & raw.notna()).to_numpy()] |= COORD_INVALID
+        flags[(numeric == 0).to_numpy()] |= COORD_ZERO
+        coordinates.append(numeric.to_numpy(dtype=float))
+    lat, lon = coordinates
+    located = np.isfinite(lat) & np.isfinite(lon)
+    outside = located.copy()
+    outside[located] = ~points_in_polygon(lat[located], lon[located], polygon)
+    flags[outside] |= OUT_OF_REGION
+
+    id_column = next((column for column in ID_COLUMNS if column in df.columns), None)
+    if id_column is not None:
+        ids = df[id_column]
+        flags[(ids.notna() & ids.duplicated(keep='first')).to_numpy()] |= DUPLICATE_ID
+
+    names = normalized_text(df['Nom']) if 'Nom' in df.columns else pd.Series([""] * n, index=df.index)
+    key = pd.DataFrame({"nom": names, "lat": lat, "lon": lon}, index=df.index)
+    flags[(located & key.duplicated(keep='first').to_numpy())] |= DUPLICATE_POINT
+    flags[((names == "") | names.str.endswith(GENERIC_NAME_SUFFIX)).to_numpy()] |= MISSING_NAME
+
+    if 'Catégorie' in df.columns:
+        flags[(~df['Catégorie'].isin(KNOWN_CATEGORIES)).to_numpy()] |= UNKNOWN_CATEGORY
+    if 'Statut' in df.columns:
+        flags[(~df['Statut'].isin(KNOWN_STATUSES)).to_numpy()] |= UNKNOWN_STATUS
+    if 'Adresse' in df.columns:
+        addresses = normalized_text(df['Adresse'])
+        flags[((addresses != "") & (addresses == names)).to_numpy()] |= ADDRESS_IS_NAME
+    return flags
+
+def summarize(df, flags, version, samples=5):
+    """Rapport : comptes et taux par règle, exemples de lignes, indicateurs globaux"""
+    total = len(flags)
+    names = df['Nom'].fillna("").astype(str).to_numpy() if 'Nom' in df.columns else np.full(total, "")
+    rules = []
+    for bit, label in RULES.items():
+        hit = np.flatnonzero(flags & bit)
+        rules.append({
+            "flag": bit,
+            "rule": label,
+            "count": int(len(hit)),
+            "pct": round(100 * len(hit) / total, 2) if total else 0.0,
+            "examples": [{"row": int(i), "nom": str(names[i])} for i in hit[:samples]],
+        })
+    clean = int(np.count_nonzero(flags == 0))
+    geo_valid = int(np.count_nonzero((flags & COORD_ERRORS) == 0))
+    return {
+        "version": version,
+        "total": total,
+        "clean": clean,
+        "clean_pct": round(100 * clean / total, 2) if total else 0.0,
+        "geo_valid": geo_valid,
+        "geo_valid_pct": round(100 * geo_valid / total, 2) if total else 0.0,
+        "rules": rules,
+    }
+
+def write_quality(df, dataset_path, version):
+    """Calcule et écrit (atomiquement) le rapport et les drapeaux d'un jeu de données"""
+    flags = compute_flags(df)
+    report = summarize(df, flags, version)
+    report_path, flags_path = sidecar_paths(dataset_path)
+    tmp_path = flags_path + ".tmp.npy"
+    np.save(tmp_path, flags)
+    os.replace(tmp_path, flags_path)
+    atomic_write_json(report_path, report)
+    return report, flags
+
+def materialize(dataset_path, version=None):
+    """Étape de pipeline : (re)génère le contrôle qualité d'un CSV"""
+    from dataset import file_version
+    version = version or file_version(dataset_path)
+    report, _ = write_quality(pd.read_csv(dataset_path), dataset_path, version)
+    print(f"[SUCCESS] Qualité: {report['clean_pct']}% de lignes sans anomalie, "
+          f"{report['geo_valid_pct']}% géolocalisées dans la région")
+    return report
+
+def load_quality(dataset_path, version, loader=None):
+    """Lit (rapport, drapeaux) si leur version correspond, sinon les recalcule.
+
+    loader() doit retourner le DataFrame (permet de réutiliser un cache) ;
+    par défaut le CSV est relu.
+    """
+    report_path, flags_path = sidecar_paths(dataset_path)
+    if os.path.exists(report_path) and os.path.exists(flags_path):
+        try:
+            with open(report_path, 'r', encoding='utf-8') as f:
+                report = json.load(f)
+            if report.get("version") == version:
+                return report, np.load(flags_path)
+        except (OSError, ValueError):
+            pass
+    df = loader() if loader else pd.read_csv(dataset_path)
+    try:
+        return write_quality(df, dataset_path, version)
+    except OSError:
+        # Dossier en lecture seule : contrôle gardé en mémoire uniquement
+        flags = compute_flags(df)
+        return summarize(df, flags, version), flags
+
+def format_report(report):
+    lines = [f"{'Règle':<30} {'Lignes':>8} {'%':>7}"]
+    for rule in report["rules"]:
+        lines.append(f"{rule['rule']:<30} {rule['count']:>8} {rule['pct']:>6.2f}%")
+    lines.append(f"Lignes sans anomalie : {report['clean']}/{report['total']} ({report['clean_pct']}%)")
+    lines.append(f"Géolocalisation valide : {report['geo_valid']}/{report['total']} ({report['geo_valid_pct']}%)")
+    return "\n".join(lines)
+
+def main():
+    """Fonction principale"""
+    parser = argparse.ArgumentParser(description="Contrôle qualité du jeu de données des points de vente")
+    parser.add_argument("--dataset", help="CSV à contrôler (par défaut : jeu de données courant)")
+    args = parser.parse_args()
+
+    if args.dataset:
+        from dataset import file_version
+        path, version = args.dataset, file_version(args.dataset)
+    else:
+        from dataset import current_dataset
+        path, version = current_dataset()
+    report, _ = write_quality(pd.read_csv(path), path, version)
+    print(f"🧪 CONTRÔLE QUALITÉ - {path}")
+    print(format_report(report))
+
+if __name__ == "__main__":
+    main()
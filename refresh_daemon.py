@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+Service de mise à jour continue : collecte OSM incrémentale par région,
+à intervalles configurables (avec gigue et reprise exponentielle en cas
+d'échec), application des changements et publication d'un instantané
+"""
+
+import argparse
+import heapq
+import json
+import random
+import signal
+import threading
+import time
+
+import pandas as pd
+
+import osm_complet_scraper
+import zoning
+from dataset import current_dataset, load_dataset, publish_snapshot
+
+DEFAULT_INTERVAL = 6 * 3600   # secondes entre deux collectes d'une même région
+DEFAULT_JITTER = 0.1          # ± 10 % sur chaque échéance
+BACKOFF_BASE = 60             # premier délai après un échec
+BACKOFF_MAX = 3600            # délai maximal après des échecs répétés
+ONCE_MAX_ATTEMPTS = 3         # tentatives par région en mode --once
+
+def default_regions(interval=DEFAULT_INTERVAL):
+    """Une région par tuile de la collecte Casablanca"""
+    tiles = osm_complet_scraper.split_bbox(osm_complet_scraper.CASABLANCA_BBOX, *osm_complet_scraper.TILE_GRID)
+    return [{"name": f"tuile_{i}", "bbox": list(tile), "interval": interval} for i, tile in enumerate(tiles)]
+
+def load_regions(path, interval=DEFAULT_INTERVAL):
+    """Lit les régions depuis un JSON [{name, bbox: [sud, ouest, nord, est], interval?}]"""
+    with open(path, 'r', encoding='utf-8') as f:
+        regions = json.load(f)
+    for region in regions:
+        region.setdefault("interval", interval)
+    return regions
+
+def jittered(delay, jitter):
+    """Applique une gigue relative (± jitter) à un délai"""
+    return max(1.0, delay * (1 + random.uniform(-jitter, jitter)))
+
+def backoff_delay(failures, base=BACKOFF_BASE, maximum=BACKOFF_MAX):
+    """Délai exponentiel après n échecs consécutifs, plafonné"""
+    return min(maximum, base * 2 ** (failures - 1))
+
+def in_bbox(df, bbox):
+    """Masque des lignes dont les coordonnées sont dans la bounding box"""
+    south, west, north, east = bbox
+    return df['Latitude'].between(south, north) & df['Longitude'].between(west, east)
+
+def same_rows(left, right):
+    """Vrai si deux DataFrames contiennent les mêmes lignes, dans n'importe quel ordre"""
+    if len(left) != len(right):
+        return False
+    def normalized(frame):
+        frame = frame.fillna("").astype(str)
+        return frame.sort_values(list(frame.columns)).reset_index(drop=True)
+    return normalized(left).equals(normalized(right[left.columns]))
+
+def apply_region_update(df, region, osm_points):
+    """Remplace les points OSM de la région par la nouvelle collecte.
+
+    Les points des autres sources (ATP...) et des autres régions ne sont
+    pas touchés. Retourne (nouveau DataFrame, ajoutés, supprimés, modifié) ;
+    modifié est faux si les lignes de la région sont identiques (attributs
+    compris) à celles de la collecte précédente.
+    """
+    keys = ["Nom", "Latitude", "Longitude"]
+    stale = in_bbox(df, region["bbox"]) & (df['Source'] == 'OSM')
+    fresh = pd.DataFrame(osm_points, columns=df.columns)
+    if len(fresh):
+        fresh["Zone"] = zoning.assign_zones(fresh["Latitude"], fresh["Longitude"], zoning.current_definitions())
+
+    old_keys = set(map(tuple, df.loc[stale, keys].itertuples(index=False)))
+    new_keys = set(map(tuple, fresh[keys].itertuples(index=False)))
+    updated = pd.concat([df[~stale], fresh], ignore_index=True)
+    updated = updated.drop_duplicates(subset=keys, keep='first')
+    region_rows = in_bbox(updated, region["bbox"]) & (updated['Source'] == 'OSM')
+    changed = len(updated) != len(df) or not same_rows(df[stale], updated[region_rows])
+    return updated, len(new_keys - old_keys), len(old_keys - new_keys), changed
+
+def refresh_region(df, region):
+    """Collecte une région ; lève une erreur si Overpass ne répond pas"""
+    osm_data = osm_complet_scraper.get_all_food_retail_casablanca(tuple(region["bbox"]))
+    if not osm_data or 'elements' not in osm_data:
+        raise RuntimeError(f"collecte vide pour {region['name']}")
+    osm_points = osm_complet_scraper.parse_osm_elements(osm_data['elements'])
+    return apply_region_update(df, region, osm_points)
+
+def open_dataset():
+    """Retourne (chemin, DataFrame, version) du jeu de données courant"""
+    path, _ = current_dataset()
+    df, version = load_dataset()
+    if 'Source' not in df.columns:
+        df['Source'] = 'OSM'
+    return path, df, version
+
+def run_daemon(regions, jitter=DEFAULT_JITTER, once=False, stop_event=None):
+    """Boucle de planification : une échéance par région dans un tas"""
+    stop_event = stop_event or threading.Event()
+    path, df, version = open_dataset()
+    print(f"[INFO] Jeu de données chargé ({len(df)} points, version {version})")
+
+    now = time.time()
+    # Premier passage étalé pour ne pas solliciter Overpass d'un coup
+    schedule = [(now + (0 if once else random.uniform(0, jitter * r["interval"])), i) for i, r in enumerate(regions)]
+    heapq.heapify(schedule)
+    failures = {i: 0 for i in range(len(regions))}
+
+    while schedule and not stop_event.is_set():
+        due, index = heapq.heappop(schedule)
+        wait = due - time.time()
+        if wait > 0 and stop_event.wait(wait):
+            break
+        region = regions[index]
+        if current_dataset() != (path, version):
+            # Jeu de données remplacé par ailleurs (execute_all.py) : repartir de celui-ci
+            path, df, version = open_dataset()
+            print(f"[INFO] Jeu de données remplacé, rechargé ({len(df)} points, version {version})")
+        try:
+            updated, added, removed, changed = refresh_region(df, region)
+            failures[index] = 0
+            if changed:
+                df = updated
+                new_path, new_version = publish_snapshot(df)
+                # Points collectés zonés avec les définitions en vigueur : l'enregistrement du zonage reste valable
+                zoning.carry_forward(path, version, new_path, new_version)
+                path, version = new_path, new_version
+                print(f"[SUCCESS] {region['name']}: +{added} / -{removed} points, instantané {version}")
+            else:
+                # Rien de changé : pas de nouvel instantané (les caches des lecteurs restent valides)
+                print(f"[INFO] {region['name']}: aucun changement, instantané {version} conservé")
+            delay = jittered(region["interval"], jitter)
+        except Exception as e:
+            failures[index] += 1
+            delay = jittered(backoff_delay(failures[index]), jitter)
+            print(f"[WARNING] {region['name']}: échec #{failures[index]} ({e}), nouvel essai dans {delay:.0f}s")
+        # En mode --once : une région réussie est terminée, abandon après 3 échecs
+        if once and (failures[index] == 0 or failures[index] >= ONCE_MAX_ATTEMPTS):
+            continue
+        heapq.heappush(schedule, (time.time() + delay, index))
+    return df
+
+def main():
+    """Fonction principale"""
+    parser = argparse.ArgumentParser(description="Service de mise à jour continue des points de vente")
+    parser.add_argument("--regions", help="Fichier JSON des régions (par défaut : tuiles de Casablanca)")
+    parser.add_argument("--interval", type=float, default=DEFAULT_INTERVAL,
+                        help="Intervalle par défaut entre deux collectes d'une région (s)")
+    parser.add_argument("--jitter", type=float, default=DEFAULT_JITTER, help="Gigue relative des échéances")
+    parser.add_argument("--once", action="store_true", help="Un seul passage sur chaque région puis arrêt")
+    args = parser.parse_args()
+
+    regions = load_regions(args.regions, args.interval) if args.regions else default_regions(args.interval)
+    stop_event = threading.Event()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(sig, lambda *_: stop_event.set())
+
+    print(f"🔄 SERVICE DE MISE À JOUR CONTINUE - {len(regions)} régions")
+    run_daemon(regions, jitter=args.jitter, once=args.once, stop_event=stop_event)
+    print("[INFO] Service arrêté")
+
+if __name__ == "__main__":
+    main()
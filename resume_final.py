@@ -3,9 +3,13 @@
 Résumé final du projet de collecte des points de vente à Casablanca
 """
 
-import pandas as pd
 import os
 
+from analytics import compute_report
+from competition import load_competition
+from dataset import current_dataset, load_dataset
+from export import frame_rows, write_workbook
+
 def generate_final_summary():
     """Génère un résumé complet du projet"""
     
@@ -13,55 +17,56 @@ def generate_final_summary():
     print("RÉSUMÉ FINAL - PROJET POINTS DE VENTE CASABLANCA")
     print("="*80)
     
-    # Charger les données finales
-    df = pd.read_csv("points_vente_casablanca_zones_corrigees.csv")
+    # Charger les données finales (jeu de données courant) et calculer toutes les statistiques en une passe
+    df, _ = load_dataset()
+    report = compute_report(df)
+    total = report['total']
     
     print(f"\n📊 STATISTIQUES GÉNÉRALES")
     print("-" * 40)
-    print(f"Total des points de vente collectés: {len(df)}")
+    print(f"Total des points de vente collectés: {total}")
     print(f"Zone géographique couverte: Casablanca et périphérie")
     print(f"Sources de données: OpenStreetMap (OSM)")
     
     # Répartition par statut
     print(f"\n🏢 RÉPARTITION PAR STATUT")
     print("-" * 40)
-    statut_stats = df['Statut'].value_counts()
-    for statut, count in statut_stats.items():
-        percentage = count / len(df) * 100
+    for statut, count in report['by_status'].items():
+        percentage = count / total * 100
         print(f"{statut}: {count:,} points ({percentage:.1f}%)")
     
     # Répartition par catégorie
     print(f"\n🏪 RÉPARTITION PAR CATÉGORIE")
     print("-" * 40)
-    category_stats = df['Catégorie'].value_counts()
-    for category, count in category_stats.items():
-        percentage = count / len(df) * 100
+    for category, count in report['by_category'].items():
+        percentage = count / total * 100
         print(f"{category}: {count:,} points ({percentage:.1f}%)")
     
     # Top 15 des zones
     print(f"\n🗺️ TOP 15 DES ZONES LES PLUS DENSES")
     print("-" * 40)
-    zone_stats = df['Zone'].value_counts().head(15)
-    for zone, count in zone_stats.items():
-        percentage = count / len(df) * 100
+    for zone, count in report['by_zone'].head(15).items():
+        percentage = count / total * 100
         print(f"{zone}: {count:,} points ({percentage:.1f}%)")
     
-    # Analyse secteur formel vs informel par zone
+    # Analyse secteur formel vs informel par zone (tableau par zone du rapport)
     print(f"\n📈 ANALYSE FORMEL/INFORMEL PAR ZONE (TOP 10)")
     print("-" * 40)
-    top_zones = df['Zone'].value_counts().head(10).index
-    
-    for zone in top_zones:
-        zone_df = df[df['Zone'] == zone]
-        formel = len(zone_df[zone_df['Statut'] == 'Formel'])
-        informel = len(zone_df[zone_df['Statut'] == 'Informel'])
-        total = len(zone_df)
+    for zone, row in report['zones'].head(10).iterrows():
+        formel_pct = row['Formel'] / row['Total'] * 100
+        informel_pct = row['Informel'] / row['Total'] * 100
         
-        formel_pct = formel / total * 100 if total > 0 else 0
-        informel_pct = informel / total * 100 if total > 0 else 0
-        
-        print(f"{zone}: {total} points")
-        print(f"  └─ Formel: {formel} ({formel_pct:.1f}%) | Informel: {informel} ({informel_pct:.1f}%)")
+        print(f"{zone}: {row['Total']} points")
+        print(f"  └─ Formel: {row['Formel']} ({formel_pct:.1f}%) | Informel: {row['Informel']} ({informel_pct:.1f}%)")
+    
+    # Concurrence et saturation (indicateurs spatiaux, fichiers compagnons du jeu de données)
+    print(f"\n🥊 SATURATION COMMERCIALE PAR ZONE (TOP 10)")
+    print("-" * 40)
+    path, version = current_dataset()
+    _, competition_zones = load_competition(path, version, loader=lambda: df)
+    for zone, row in competition_zones.head(10).iterrows():
+        print(f"{zone}: {row['Densite_km2']:.1f} points/km² | concurrent le plus proche (médiane): "
+              f"{row['Distance_Mediane_m']:.0f} m | concurrents à 500 m: {row['Concurrents_500m_Moyen']:.1f}")
     
     # Fichiers générés
     print(f"\n📁 FICHIERS GÉNÉRÉS")
@@ -89,32 +94,34 @@ def generate_final_summary():
     print("• Les données proviennent d'OpenStreetMap (source fiable)")
     print("• Mise à jour recommandée tous les 3-6 mois")
     
-    # Créer un fichier Excel avec plusieurs onglets
+    # Créer un fichier Excel avec plusieurs onglets, écrit en flux (mémoire constante)
     try:
-        with pd.ExcelWriter('analyse_points_vente_casablanca.xlsx', engine='openpyxl') as writer:
-            # Données complètes
-            df.to_excel(writer, sheet_name='Données Complètes', index=False)
-            
-            # Statistiques par zone
-            zone_summary = df.groupby('Zone').agg({
-                'Nom': 'count',
-                'Statut': lambda x: (x == 'Formel').sum(),
-                'Catégorie': lambda x: x.mode().iloc[0] if len(x.mode()) > 0 else 'N/A'
-            }).rename(columns={
-                'Nom': 'Total_Points',
-                'Statut': 'Points_Formels',
-                'Catégorie': 'Catégorie_Dominante'
-            })
-            zone_summary['Points_Informels'] = zone_summary['Total_Points'] - zone_summary['Points_Formels']
-            zone_summary['Pourcentage_Formel'] = (zone_summary['Points_Formels'] / zone_summary['Total_Points'] * 100).round(1)
-            
-            zone_summary.to_excel(writer, sheet_name='Résumé par Zone')
-            
-            # Statistiques par catégorie
-            category_summary = df.groupby(['Catégorie', 'Statut']).size().unstack(fill_value=0)
-            category_summary.to_excel(writer, sheet_name='Résumé par Catégorie')
+        # Statistiques par zone : tableau groupé du rapport
+        zone_summary = report['zones'].rename(columns={
+            'Total': 'Total_Points',
+            'Formel': 'Points_Formels',
+            'Informel': 'Points_Informels',
+        })[['Total_Points', 'Points_Formels', 'Catégorie_Dominante', 'Points_Informels', 'Pourcentage_Formel']]
+        zone_summary = zone_summary.sort_index().reset_index()
+        
+        # Statistiques par catégorie
+        category_summary = report['category_status'].reset_index()
+        
+        excel_file = 'analyse_points_vente_casablanca.xlsx'
+        tmp_file = f"{excel_file}.tmp"
+        try:
+            write_workbook(tmp_file, [
+                ('Données Complètes', df.columns, frame_rows(df)),
+                ('Résumé par Zone', zone_summary.columns, frame_rows(zone_summary)),
+                ('Résumé par Catégorie', category_summary.columns, frame_rows(category_summary)),
+            ])
+            os.replace(tmp_file, excel_file)
+        finally:
+            # Pas de fichier temporaire orphelin si l'écriture échoue
+            if os.path.exists(tmp_file):
+                os.remove(tmp_file)
         
-        print(f"\n✅ Fichier Excel créé: analyse_points_vente_casablanca.xlsx")
+        print(f"\n✅ Fichier Excel créé: {excel_file}")
         
     except Exception as e:
         print(f"\n❌ Erreur création Excel: {e}")
@@ -2,10 +2,11 @@
 """
 Script de résumé du projet de points de vente à Casablanca
 """
-import pandas as pd
 import os
 from pathlib import Path
 
+from analytics import report_for_file
+
 def afficher_resume_projet():
     """Affiche un résumé complet du projet"""
     print("=" * 80)
@@ -41,28 +42,28 @@ def afficher_resume_projet():
     
     # Analyser les données finales
     try:
-        df_final = pd.read_csv("points_vente_casablanca_final.csv")
+        report = report_for_file("points_vente_casablanca_final.csv")
+        total = report['total']
         print("2. STATISTIQUES DES DONNEES FINALES:")
         print("-" * 40)
-        print(f"   Total points de vente: {len(df_final):,}")
+        print(f"   Total points de vente: {total:,}")
         print()
         
         print("   Par categorie:")
-        for cat, count in df_final['Catégorie'].value_counts().items():
-            pct = (count / len(df_final)) * 100
+        for cat, count in report['by_category'].items():
+            pct = (count / total) * 100
             print(f"     • {cat}: {count} ({pct:.1f}%)")
         
         print()
         print("   Par source de donnees:")
-        if 'Source' in df_final.columns:
-            for source, count in df_final['Source'].value_counts().items():
-                pct = (count / len(df_final)) * 100
+        if 'Source' in report['columns']:
+            for source, count in report['by_source'].items():
+                pct = (count / total) * 100
                 print(f"     • {source}: {count} ({pct:.1f}%)")
         
         print()
         print("   Zones les plus representees:")
-        top_zones = df_final['Zone'].value_counts().head(5)
-        for zone, count in top_zones.items():
+        for zone, count in report['by_zone'].head(5).items():
             print(f"     • {zone}: {count} etablissements")
             
     except Exception as e:
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Index spatial en grille régulière (numpy) : recherche des points d'une
+bounding box sans parcourir tout le jeu de données
+"""
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_CELL_DEG = 0.01  # ~1 km à la latitude de Casablanca
+
+class GridIndex:
+    """Points triés par cellule de grille (ligne, colonne).
+
+    Les cellules d'une même ligne de grille sont contiguës dans le tri : une
+    bounding box se résout en une tranche par ligne (searchsorted), puis un
+    filtre exact sur les seuls candidats. Les positions retournées sont
+    celles des lignes du tableau d'origine ; les coordonnées invalides
+    (NaN) ne sont pas indexées.
+    """
+
+    def __init__(self, lat, lon, cell_deg=DEFAULT_CELL_DEG):
+        # Coordonnées dans l'ordre d'origine (accès par position)
+        self.lat = lat = np.asarray(lat, dtype=float)
+        self.lon = lon = np.asarray(lon, dtype=float)
+        self.cell_deg = cell_deg
+        positions = np.flatnonzero(np.isfinite(lat) & np.isfinite(lon))
+        if len(positions):
+            self.origin = (lat[positions].min(), lon[positions].min())
+        else:
+            self.origin = (0.0, 0.0)
+        rows = self._cells(lat[positions], self.origin[0])
+        cols = self._cells(lon[positions], self.origin[1])
+        self.n_rows = int(rows.max()) + 1 if len(rows) else 0
+        self.n_cols = int(cols.max()) + 1 if len(cols) else 0
+        keys = rows * self.n_cols + cols
+        order = np.argsort(keys, kind='stable')
+        self.keys = keys[order]
+        self.positions = positions[order]
+        self._lat = lat[self.positions]
+        self._lon = lon[self.positions]
+
+    @classmethod
+    def from_frame(cls, df, cell_deg=DEFAULT_CELL_DEG):
+        """Index des colonnes Latitude/Longitude d'un DataFrame (valeurs non numériques ignorées)"""
+        return cls(pd.to_numeric(df['Latitude'], errors='coerce').to_numpy(dtype=float),
+                   pd.to_numeric(df['Longitude'], errors='coerce').to_numpy(dtype=float),
+                   cell_deg=cell_deg)
+
+    def __len__(self):
+        return len(self.positions)
+
+    def _cells(self, values, origin):
+        return np.floor((np.asarray(values, dtype=float) - origin) / self.cell_deg).astype(np.int64)
+
+    def _candidates(self, south, west, north, east):
+        """Indices (dans l'ordre trié) des points des cellules couvrant la box"""
+        if not len(self) or south > north or west > east:
+            return np.empty(0, dtype=np.int64)
+        row_start, row_end = np.clip(self._cells([south, north], self.origin[0]), 0, self.n_rows - 1)
+        col_start, col_end = np.clip(self._cells([west, east], self.origin[1]), 0, self.n_cols - 1)
+        rows = np.arange(row_start, row_end + 1) * self.n_cols
+        starts = np.searchsorted(self.keys, rows + col_start, side='left')
+        ends = np.searchsorted(self.keys, rows + col_end, side='right')
+        return np.concatenate([np.arange(s, e) for s, e in zip(starts, ends)] or [np.empty(0, dtype=np.int64)])
+
+    def query_bbox(self, south, west, north, east, mask=None):
+        """Positions (triées) des points dans la box ; mask restreint aux lignes retenues"""
+        candidates = self._candidates(south, west, north, east)
+        lat, lon = self._lat[candidates], self._lon[candidates]
+        inside = (lat >= south) & (lat <= north) & (lon >= west) & (lon <= east)
+        positions = self.positions[candidates[inside]]
+        if mask is not None:
+            positions = positions[np.asarray(mask)[positions]]
+        return np.sort(positions)
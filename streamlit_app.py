@@ -1,12 +1,22 @@
 import streamlit as st
 import pandas as pd
-import folium
-from folium.plugins import MarkerCluster, MiniMap
-from streamlit_folium import st_folium
-import plotly.express as px
-import plotly.graph_objects as go
-from plotly.subplots import make_subplots
 import os
+# Les modules de visualisation (folium, streamlit_folium, plotly) sont importés
+# dans les pages qui les utilisent : les pages textuelles ne les chargent pas
+from aggregates import compute_aggregates, load_aggregates, cube_frame, filter_cube, cube_counts
+from competition import NEAREST_COLUMN, competition_metrics, count_column, load_competition, zone_summary
+from coverage import compute_coverage, coverage_png, gap_ranking, load_coverage, raster_bounds
+from dataset import current_dataset
+from density_grid import compute_density, grid_values, load_density
+from export import EXPORT_FORMATS, available_formats, build_export, export_path, prune_exports
+from filter_index import FilterIndex
+from point_store import load_store
+from proximity import ProximityIndex, results_frame
+from quality import COORD_ERRORS, compute_flags, load_quality, summarize
+from spatial_index import GridIndex
+from viewport import (bounds_around, bounds_center, bounds_from_folium, contains, pad_bounds,
+                      select_viewport, zoom_cap)
+from tiles import MARKERS_MIN_ZOOM, add_density_layer, layer_available, layer_name
 
 # Configuration de la page
 st.set_page_config(
@@ -76,21 +86,207 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
+# cache_resource : un seul objet partagé entre toutes les sessions (pas de
+# copie par session), invalidé quand la version publiée change. Les pages
+# ne doivent pas modifier ces objets en place.
+@st.cache_resource(show_spinner=False, max_entries=2)
+def read_store(path, version):
+    """Stockage en colonnes memmap (partagé avec les autres processus) ; le CSV
+    n'est analysé que si le stockage manque"""
+    return load_store(path, version, loader=lambda: pd.read_csv(path))
+
+@st.cache_resource(show_spinner=False, max_entries=2)
+def read_dataset(path, version):
+    """Lecture mise en cache : relue seulement quand la version publiée change.
+
+    Colonnes numériques sans copie (tableaux du stockage memmap, lecture
+    seule), colonnes texte décodées une fois par version.
+    """
+    return read_store(path, version).to_frame(copy=False)
+
+@st.cache_resource(show_spinner=False, max_entries=2)
+def read_aggregates(path, version):
+    """Agrégats précalculés (fichier compagnon) et cube associé"""
+    aggregates = load_aggregates(path, version, loader=lambda: read_dataset(path, version))
+    return aggregates, cube_frame(aggregates)
+
+@st.cache_resource(show_spinner=False, max_entries=2)
+def read_spatial_index(path, version):
+    """Index spatial du jeu de données, construit une fois par version"""
+    return GridIndex(*read_store(path, version).coordinates())
+
+def demo_data():
+    """Données de démonstration si aucun fichier n'existe"""
+    return pd.DataFrame({
+        'Nom': ['Marjane', 'Café Central', 'Épicerie sans nom', 'BIM'],
+        'Catégorie': ['Supermarché', 'Café', 'Épicerie', 'Supérette / Mini-market'],
+        'Statut': ['Formel', 'Formel', 'Informel', 'Formel'],
+        'Zone': ['Californie', 'Centre-ville', 'Quartier populaire', 'Maarif'],
+        'Latitude': [33.5447, 33.5731, 33.5850, 33.5820],
+        'Longitude': [-7.6400, -7.5898, -7.6100, -7.6050]
+    })
+
 def load_data():
-    """Charge les données de Casablanca"""
+    """Charge les données de Casablanca (dernier instantané publié)"""
     try:
-        df = pd.read_csv("points_vente_casablanca_zones_corrigees.csv")
-        return df
+        path, version = current_dataset()
+        return read_dataset(path, version)
     except FileNotFoundError:
-        # Données de démonstration si le fichier n'existe pas
-        return pd.DataFrame({
-            'Nom': ['Marjane', 'Café Central', 'Épicerie sans nom', 'BIM'],
-            'Catégorie': ['Supermarché', 'Café', 'Épicerie', 'Supérette / Mini-market'],
-            'Statut': ['Formel', 'Formel', 'Informel', 'Formel'],
-            'Zone': ['Californie', 'Centre-ville', 'Quartier populaire', 'Maarif'],
-            'Latitude': [33.5447, 33.5731, 33.5850, 33.5820],
-            'Longitude': [-7.6400, -7.5898, -7.6100, -7.6050]
-        })
+        return demo_data()
+
+def load_aggregates_data():
+    """Retourne (agrégats, cube) du jeu de données courant"""
+    try:
+        path, version = current_dataset()
+        return read_aggregates(path, version)
+    except FileNotFoundError:
+        aggregates = compute_aggregates(demo_data(), "demo")
+        return aggregates, cube_frame(aggregates)
+
+@st.cache_resource(show_spinner=False, max_entries=2)
+def read_density(path, version):
+    """Grilles de densité précalculées (fichier compagnon)"""
+    return load_density(path, version, loader=lambda: read_dataset(path, version))
+
+def load_density_data():
+    """Grilles de densité du jeu de données courant"""
+    try:
+        path, version = current_dataset()
+        return read_density(path, version)
+    except FileNotFoundError:
+        return compute_density(demo_data(), "demo")
+
+@st.cache_resource(show_spinner=False, max_entries=2)
+def read_quality(path, version):
+    """Rapport et drapeaux du contrôle qualité (fichiers compagnons)"""
+    return load_quality(path, version, loader=lambda: read_dataset(path, version))
+
+def load_quality_data():
+    """(rapport, drapeaux par ligne) du jeu de données courant"""
+    try:
+        path, version = current_dataset()
+        return read_quality(path, version)
+    except FileNotFoundError:
+        df = demo_data()
+        flags = compute_flags(df)
+        return summarize(df, flags, "demo"), flags
+
+@st.cache_resource(show_spinner=False, max_entries=2)
+def read_competition(path, version):
+    """Indicateurs de concurrence par point et résumé par zone (fichiers compagnons)"""
+    return load_competition(path, version, loader=lambda: read_dataset(path, version))
+
+def load_competition_data():
+    """(indicateurs par point, résumé par zone) du jeu de données courant"""
+    try:
+        path, version = current_dataset()
+        return read_competition(path, version)
+    except FileNotFoundError:
+        df = demo_data()
+        metrics = competition_metrics(df)
+        return metrics, zone_summary(df, metrics)
+
+@st.cache_resource(show_spinner=False, max_entries=2)
+def read_coverage(path, version):
+    """Rasters de couverture et classement des cellules en manque (fichiers compagnons)"""
+    return load_coverage(path, version, loader=lambda: read_dataset(path, version))
+
+def load_coverage_data():
+    """(rasters, classement) du jeu de données courant"""
+    try:
+        path, version = current_dataset()
+        return read_coverage(path, version)
+    except FileNotFoundError:
+        raster = compute_coverage(demo_data())
+        return raster, gap_ranking(raster)
+
+@st.cache_resource(show_spinner=False, max_entries=2)
+def read_filter_index(path, version):
+    """Bitmaps de filtrage du jeu de données, construits une fois par version"""
+    return FilterIndex.from_store(read_store(path, version))
+
+def load_filter_index(df):
+    """Index de filtrage du jeu de données courant"""
+    try:
+        path, version = current_dataset()
+        return read_filter_index(path, version)
+    except FileNotFoundError:
+        return FilterIndex(df)
+
+def load_spatial_index(df):
+    """Index spatial du jeu de données courant"""
+    try:
+        path, version = current_dataset()
+        return read_spatial_index(path, version)
+    except FileNotFoundError:
+        return GridIndex.from_frame(df)
+
+@st.cache_resource(show_spinner=False, max_entries=2)
+def read_proximity_index(path, version):
+    """Index de proximité (mètres) du jeu de données, construit une fois par version"""
+    return ProximityIndex(*read_store(path, version).coordinates())
+
+def load_proximity_index(df):
+    """Index de proximité du jeu de données courant"""
+    try:
+        path, version = current_dataset()
+        return read_proximity_index(path, version)
+    except FileNotFoundError:
+        return ProximityIndex.from_frame(df)
+
+@st.cache_data(show_spinner=False, max_entries=256)
+def locate(query):
+    """Centre de recherche : "lat, lon" saisis directement, sinon adresse géocodée"""
+    parts = [part.strip() for part in query.split(",")]
+    if len(parts) == 2:
+        try:
+            return float(parts[0]), float(parts[1])
+        except ValueError:
+            pass
+    from geocode_utils import geocode_address
+    return geocode_address(query)
+
+def show_proximity_search(df, mask):
+    """Points dans un rayon ou k plus proches voisins d'une adresse, avec les filtres courants"""
+    st.subheader("🔎 Recherche de Proximité")
+    col1, col2, col3 = st.columns([2, 1, 1])
+    with col1:
+        query = st.text_input("Adresse ou coordonnées (lat, lon)", key="proximite_centre",
+                              placeholder="Ex. : Boulevard Zerktouni ou 33.5731, -7.5898")
+    with col2:
+        mode = st.radio("Recherche", ["Rayon", "Plus proches"], key="proximite_mode", horizontal=True)
+    with col3:
+        if mode == "Rayon":
+            radius_m = st.number_input("Rayon (m)", min_value=50, max_value=10000, value=500, step=50)
+        else:
+            k = st.number_input("Nombre de points", min_value=1, max_value=100, value=10)
+    if not query.strip():
+        st.caption("Les filtres Statut, Catégorie et Zone ci-dessus s'appliquent aussi à la recherche")
+        return
+    center = locate(query.strip())
+    if center is None:
+        st.warning(f"Adresse introuvable : {query}")
+        return
+    index = load_proximity_index(df)
+    if mode == "Rayon":
+        positions, distances = index.radius(center[0], center[1], radius_m, mask=mask)
+        st.caption(f"{len(positions)} points à moins de {radius_m} m de ({center[0]:.5f}, {center[1]:.5f})")
+    else:
+        positions, distances = index.nearest(center[0], center[1], k, mask=mask)
+        if len(positions):
+            st.caption(f"{len(positions)} points les plus proches de ({center[0]:.5f}, {center[1]:.5f}), "
+                       f"jusqu'à {distances[-1]:.0f} m")
+    if not len(positions):
+        st.info("Aucun point trouvé avec ces critères")
+        return
+    results = results_frame(df, positions, distances)
+    # Pression concurrentielle de chaque point trouvé (même catégorie)
+    metrics, _ = load_competition_data()
+    results['Concurrent le plus proche (m)'] = metrics[NEAREST_COLUMN][positions]
+    results['Concurrents à 500 m'] = metrics[count_column(500)][positions]
+    columns = ['Distance (m)'] + [c for c in ['Nom', 'Catégorie', 'Statut', 'Zone', 'Adresse'] if c in df.columns]
+    columns += ['Concurrent le plus proche (m)', 'Concurrents à 500 m']
+    st.dataframe(results[columns], use_container_width=True, hide_index=True)
 
 def main():
     # En-tête principal
@@ -103,27 +299,8 @@ def main():
     
     # Sidebar - Navigation
     st.sidebar.title("🎯 Navigation")
-    page = st.sidebar.selectbox("Choisissez une section", [
-        "🏠 Vue d'ensemble",
-        "📊 Cas d'étude : Casablanca", 
-        "🔬 Méthodologie",
-        "⚠️ Difficultés Rencontrées",
-        "🤖 Intelligence Artificielle",
-        "️ Cartographie interactive"
-    ])
-    
-    if page == "🏠 Vue d'ensemble":
-        show_overview()
-    elif page == "📊 Cas d'étude : Casablanca":
-        show_casablanca_study()
-    elif page == "🔬 Méthodologie":
-        show_methodology()
-    elif page == "⚠️ Difficultés Rencontrées":
-        show_difficulties()
-    elif page == "🤖 Intelligence Artificielle":
-        show_ai_features()
-    elif page == "🗺️ Cartographie interactive":
-        show_interactive_map()
+    page = st.sidebar.selectbox("Choisissez une section", list(PAGES), key="page")
+    PAGES[page]()
 
 def show_overview():
     st.header("🎯 Problématique et Objectifs")
@@ -151,28 +328,30 @@ def show_overview():
         pass
 
 def show_casablanca_study():
+    import plotly.express as px
+
     st.header("📊 Cas d'Étude : Casablanca")
     st.markdown("*Validation de notre méthodologie sur le terrain*")
     
-    # Charger les données
-    df = load_data()
+    # Agrégats précalculés (pas de relecture du jeu de données)
+    aggregates, _ = load_aggregates_data()
     
     col1, col2, col3, col4 = st.columns(4)
     
     with col1:
-        total_points = len(df)
+        total_points = aggregates['total']
         st.metric("🏪 Points Collectés", f"{total_points:,}")
     
     with col2:
-        formel_count = len(df[df['Statut'] == 'Formel'])
+        formel_count = aggregates['by_status'].get('Formel', 0)
         st.metric("🏢 Commerce Formel", f"{formel_count:,}")
     
     with col3:
-        informel_count = len(df[df['Statut'] == 'Informel'])
+        informel_count = aggregates['by_status'].get('Informel', 0)
         st.metric("🏪 Commerce Informel", f"{informel_count:,}")
     
     with col4:
-        categories = df['Catégorie'].nunique()
+        categories = aggregates['n_categories']
         st.metric("🏷️ Catégories", categories)
     
     st.markdown("---")
@@ -182,10 +361,10 @@ def show_casablanca_study():
     
     with col1:
         st.subheader("📈 Répartition par Statut")
-        status_counts = df['Statut'].value_counts()
+        status_counts = aggregates['by_status']
         fig_pie = px.pie(
-            values=status_counts.values, 
-            names=status_counts.index,
+            values=list(status_counts.values()), 
+            names=list(status_counts.keys()),
             color_discrete_map={'Formel': '#2ECC71', 'Informel': '#E74C3C'}
         )
         fig_pie.update_layout(height=300)
@@ -193,12 +372,12 @@ def show_casablanca_study():
     
     with col2:
         st.subheader("🏷️ Top Catégories")
-        category_counts = df['Catégorie'].value_counts().head(8)
+        category_counts = list(aggregates['by_category'].items())[:8]
         fig_bar = px.bar(
-            x=category_counts.values,
-            y=category_counts.index,
+            x=[count for _, count in category_counts],
+            y=[category for category, _ in category_counts],
             orientation='h',
-            color=category_counts.values,
+            color=[count for _, count in category_counts],
             color_continuous_scale='viridis'
         )
         fig_bar.update_layout(height=300, showlegend=False)
@@ -206,6 +385,21 @@ def show_casablanca_study():
         fig_bar.update_xaxes(title="Nombre de points")
         st.plotly_chart(fig_bar, use_container_width=True)
     
+    # Concurrence et saturation (indicateurs précalculés par competition.py)
+    st.subheader("🥊 Concurrence et Saturation par Zone")
+    _, zones = load_competition_data()
+    st.caption("Densité : points par km² de l'enveloppe des points de la zone. "
+               "Concurrents : points de la même catégorie.")
+    st.dataframe(
+        zones.rename(columns={
+            "Surface_km2": "Surface (km²)",
+            "Densite_km2": "Points / km²",
+            "Distance_Mediane_m": "Distance médiane au concurrent (m)",
+            "Concurrents_500m_Moyen": "Concurrents à 500 m (moyenne)",
+        }),
+        use_container_width=True
+    )
+    
     # Détails méthodologiques
     st.subheader("🔬 Méthodologie Appliquée à Casablanca")
     
@@ -243,11 +437,11 @@ def show_casablanca_study():
         - **Couverture** : 100% des points géolocalisés
         """)
         
-        if len(df) > 0:
-            zone_counts = df['Zone'].value_counts().head(10)
+        if aggregates['total'] > 0:
+            zone_counts = aggregates['top_zones'][:10]
             fig_zones = px.bar(
-                x=zone_counts.index,
-                y=zone_counts.values,
+                x=[zone for zone, _ in zone_counts],
+                y=[count for _, count in zone_counts],
                 title="Top 10 des zones par nombre de points"
             )
             fig_zones.update_xaxes(tickangle=45)
@@ -557,6 +751,7 @@ def show_difficulties():
 def show_ai_features():
     st.header("🤖 Intelligence Artificielle Intégrée")
     st.markdown("*L'IA au cœur de notre système auto-apprenant*")
+    quality_report, _ = load_quality_data()
     
     ai_features = [
         {
@@ -589,17 +784,17 @@ def show_ai_features():
         },
         {
             "title": "🔄 Mise à Jour Continue",
-            "description": "Système auto-correcteur qui s'améliore avec les nouvelles données",
-            "tech": "Apprentissage incrémental, Active Learning",
-            "status": "En développement", 
-            "impact": "Base de données toujours à jour"
+            "description": "Service de collecte incrémentale par région avec publication d'instantanés",
+            "tech": "Planification avec gigue et reprise exponentielle (refresh_daemon.py)",
+            "status": "Implémenté", 
+            "impact": "Base de données toujours à jour, sans redémarrage du tableau de bord"
         },
         {
             "title": "📍 Géolocalisation Intelligente",
             "description": "Correction automatique des coordonnées aberrantes",
-            "tech": "Algorithmes géospatiaux, Outlier detection",
+            "tech": "Contrôle qualité vectorisé à l'ingestion (quality.py)",
             "status": "Implémenté",
-            "impact": "99.5% de précision géographique"
+            "impact": f"{quality_report['geo_valid_pct']}% des points géolocalisés dans la région (mesuré)"
         }
     ]
     
@@ -623,132 +818,264 @@ def show_ai_features():
         """, unsafe_allow_html=True)
 
 
+def show_export(df, filters):
+    """Téléchargement de la sélection filtrée dans le format choisi"""
+    try:
+        _, version = current_dataset()
+    except FileNotFoundError:
+        version = "demo"
+    formats = available_formats()
+    col1, col2 = st.columns([1, 2])
+    with col1:
+        fmt = st.selectbox("📥 Format d'export", formats, format_func=lambda f: EXPORT_FORMATS[f]["label"])
+    path = export_path(filters, fmt, version)
+    with col2:
+        if not os.path.exists(path) and st.button("Préparer l'export de la sélection"):
+            with st.spinner("Écriture de l'export..."):
+                prune_exports(version)
+                build_export(df, load_filter_index(df).positions(filters), fmt, version, filters)
+        if os.path.exists(path):
+            with open(path, 'rb') as f:
+                st.download_button(
+                    label=f"📥 Télécharger la sélection ({EXPORT_FORMATS[fmt]['label']})",
+                    data=f,
+                    file_name=f"points_vente_casablanca_selection.{EXPORT_FORMATS[fmt]['extension']}",
+                    mime=EXPORT_FORMATS[fmt]["mime"]
+                )
+
+def show_coverage(center, map_width, map_height):
+    """Surface de couverture par catégorie et cellules en manque (précalculées par coverage.py)"""
+    import base64
+    import folium
+    from streamlit_folium import st_folium
+
+    raster, gaps = load_coverage_data()
+    st.subheader("🧭 Couverture à Distance de Marche")
+    st.caption(f"Nombre de points à moins de {raster['radius_m']} m de chaque cellule de {raster['cell_m']} m ; "
+               "les marqueurs signalent les cellules actives où une catégorie est sous-représentée")
+    category = st.selectbox("Catégorie", ["Toutes"] + raster["categories"], key="couverture_categorie")
+    category = None if category == "Toutes" else category
+    shown = [gap for gap in gaps if category is None or gap["categorie"] == category]
+
+    coverage_map = folium.Map(location=center, zoom_start=12, tiles='CartoDB positron', control_scale=True)
+    image = "data:image/png;base64," + base64.b64encode(coverage_png(raster, category)).decode('ascii')
+    folium.raster_layers.ImageOverlay(image=image, bounds=raster_bounds(raster), opacity=0.65,
+                                      name="Couverture").add_to(coverage_map)
+    for gap in shown:
+        folium.CircleMarker(
+            location=[gap["lat"], gap["lon"]], radius=7, color="#C0392B", fill=True, fill_opacity=0.8,
+            tooltip=f"#{gap['rang']} {gap['categorie']} : {gap['present']} présents / {gap['attendu']} attendus",
+        ).add_to(coverage_map)
+    st_folium(coverage_map, width=map_width, height=map_height, key="carte_couverture", returned_objects=[])
+
+    if shown:
+        st.dataframe(
+            pd.DataFrame(shown).rename(columns={
+                "rang": "Rang", "lat": "Latitude", "lon": "Longitude", "categorie": "Catégorie",
+                "attendu": "Attendus", "present": "Présents", "manque": "Manque", "activite": "Activité (tous points)",
+            }),
+            use_container_width=True, hide_index=True
+        )
+    else:
+        st.info("Aucune cellule en manque pour cette catégorie")
+
 def show_interactive_map():
+    import folium
+    import plotly.express as px
+    from streamlit_folium import st_folium
+
+    from map_layers import add_cluster_layer, add_grid_layer, add_point_layer
+
     st.header("🗺️ Cartographie Interactive - Casablanca")
     st.markdown("*Visualisation interactive, filtres avancés et téléchargement du dataset*")
 
     # Charger les données
     df = load_data()
+    _, cube = load_aggregates_data()
 
     if len(df) == 0:
         st.warning("Aucune donnée disponible pour la cartographie")
         return
 
-    # Bouton de téléchargement du dataset
-    st.download_button(
-        label="📥 Télécharger le dataset complet (CSV)",
-        data=df.to_csv(index=False).encode('utf-8'),
-        file_name="points_vente_casablanca_complet.csv",
-        mime="text/csv"
-    )
+    # Filtres à sélection multiple (vide = tous) ; les comptes affichés tiennent
+    # compte des filtres des autres colonnes
+    index_filters = load_filter_index(df)
+    filter_keys = {'Statut': "filtre_statut", 'Catégorie': "filtre_categorie", 'Zone': "filtre_zone"}
+    filters = {column: st.session_state.get(key, []) for column, key in filter_keys.items()}
+    facets = index_filters.facet_counts(filters)
 
-    st.markdown("---")
-
-    # Filtres
     col1, col2, col3 = st.columns(3)
 
     with col1:
-        status_filter = st.selectbox(
+        status_filter = st.multiselect(
             "🏷️ Statut",
-            ["Tous", "Formel", "Informel"]
+            index_filters.values('Statut'),
+            key=filter_keys['Statut'],
+            format_func=lambda value: f"{value} ({facets['Statut'].get(value, 0)})",
+            placeholder="Tous"
         )
 
     with col2:
-        categories = ["Toutes"] + sorted(df['Catégorie'].unique().tolist())
-        category_filter = st.selectbox(
-            "🏪 Catégorie", 
-            categories
+        category_filter = st.multiselect(
+            "🏪 Catégorie",
+            index_filters.values('Catégorie'),
+            key=filter_keys['Catégorie'],
+            format_func=lambda value: f"{value} ({facets['Catégorie'].get(value, 0)})",
+            placeholder="Toutes"
         )
 
     with col3:
-        zones = ["Toutes"] + sorted(df['Zone'].dropna().unique().tolist())
-        zone_filter = st.selectbox(
+        zone_filter = st.multiselect(
             "📍 Zone",
-            zones
+            index_filters.values('Zone'),
+            key=filter_keys['Zone'],
+            format_func=lambda value: f"{value} ({facets['Zone'].get(value, 0)})",
+            placeholder="Toutes"
         )
 
-    # Appliquer les filtres
-    filtered_df = df.copy()
+    # Appliquer les filtres : ET bit à bit des bitmaps précalculés, sans copie
+    filters = {'Statut': status_filter, 'Catégorie': category_filter, 'Zone': zone_filter}
+    mask = index_filters.mask(filters)
 
-    if status_filter != "Tous":
-        filtered_df = filtered_df[filtered_df['Statut'] == status_filter]
+    # Export de la sélection : généré seulement à la demande, mis en cache sur disque
+    show_export(df, filters)
 
-    if category_filter != "Toutes":
-        filtered_df = filtered_df[filtered_df['Catégorie'] == category_filter]
+    st.markdown("---")
 
-    if zone_filter != "Toutes":
-        filtered_df = filtered_df[filtered_df['Zone'] == zone_filter]
+    # Métriques filtrées, lues dans le cube précalculé
+    filtered_cube = filter_cube(cube, statut=status_filter, categorie=category_filter, zone=zone_filter)
+    filtered_total = int(filtered_cube['Nombre'].sum())
 
-    # Métriques filtrées
     col1, col2, col3, col4 = st.columns(4)
 
     with col1:
-        st.metric("📍 Points Affichés", len(filtered_df))
+        st.metric("📍 Points Affichés", filtered_total)
     with col2:
-        if len(filtered_df) > 0:
-            formel_pct = len(filtered_df[filtered_df['Statut'] == 'Formel']) / len(filtered_df) * 100
+        if filtered_total > 0:
+            formel_pct = filtered_cube.loc[filtered_cube['Statut'] == 'Formel', 'Nombre'].sum() / filtered_total * 100
             st.metric("🏢 % Formel", f"{formel_pct:.1f}%")
     with col3:
-        categories_count = filtered_df['Catégorie'].nunique()
+        categories_count = filtered_cube['Catégorie'].nunique()
         st.metric("🏷️ Catégories", categories_count)
     with col4:
-        zones_count = filtered_df['Zone'].nunique()
+        zones_count = filtered_cube['Zone'].nunique()
         st.metric("📍 Zones", zones_count)
 
-    if len(filtered_df) == 0:
+    if not mask.any():
         st.warning("Aucun point ne correspond aux filtres sélectionnés")
         return
 
-    # Vérification des coordonnées valides
-    filtered_df = filtered_df.dropna(subset=['Latitude', 'Longitude'])
-    filtered_df = filtered_df[(filtered_df['Latitude'].apply(lambda x: isinstance(x, (int, float)))) & (filtered_df['Longitude'].apply(lambda x: isinstance(x, (int, float))))]
-    st.info(f"Nombre de points valides pour la carte : {len(filtered_df)}")
-    if filtered_df.empty:
+    # Couche de densité : une par catégorie ou par statut (pas de combinaison précalculée),
+    # pyramide de la version affichée
+    try:
+        _, dataset_version = current_dataset()
+    except FileNotFoundError:
+        dataset_version = "demo"
+    if len(category_filter) == 1:
+        density_layer = layer_name("categorie", category_filter[0])
+    elif len(status_filter) == 1:
+        density_layer = layer_name("statut", status_filter[0])
+    else:
+        density_layer = layer_name()
+    show_density = st.checkbox(
+        f"🔥 Carte de densité (marqueurs à partir du zoom {MARKERS_MIN_ZOOM})",
+        value=layer_available(density_layer, dataset_version),
+        disabled=not layer_available(density_layer, dataset_version),
+        help="Tuiles précalculées par tiles.py ; lancer `python tiles.py` pour les générer",
+    )
+
+    # Coordonnées validées à l'ingestion (drapeaux du contrôle qualité)
+    report, flags = load_quality_data()
+    mask &= (flags & COORD_ERRORS) == 0
+    st.info(f"Nombre de points valides pour la carte : {int(mask.sum())}")
+    with st.expander(f"🧪 Qualité des données : {report['clean_pct']}% de lignes sans anomalie"):
+        st.dataframe(
+            pd.DataFrame(report["rules"])[["rule", "count", "pct"]].rename(
+                columns={"rule": "Règle", "count": "Lignes", "pct": "%"}),
+            use_container_width=True
+        )
+        st.caption(f"Géolocalisation valide (coordonnées présentes, numériques, dans la région) : "
+                   f"{report['geo_valid_pct']}% des {report['total']} lignes")
+    if not mask.any():
         st.error("Aucun point valide à afficher sur la carte. Vérifiez que le fichier CSV contient des colonnes 'Latitude' et 'Longitude' avec des valeurs numériques.")
         st.info("Exemple de ligne valide : Nom,Catégorie,Statut,Zone,Latitude,Longitude")
         return
+
+    # Seuls les points de la zone visible sont envoyés à la carte (index spatial)
+    index = load_spatial_index(df)
+    map_width, map_height = 900, 550
+    if "map_view" not in st.session_state:
+        center = [float(index.lat[mask].mean()), float(index.lon[mask].mean())]
+        st.session_state.map_view = {
+            "center": center,
+            "zoom": 11,
+            "bounds": bounds_around(center[0], center[1], 11, map_width, map_height),
+        }
+    view = st.session_state.map_view
+    # Zone chargée un peu plus grande que la zone visible : un petit déplacement ne recharge rien
+    loaded_bounds = pad_bounds(view["bounds"])
+    selection = select_viewport(index, loaded_bounds, view["zoom"], mask=mask,
+                                formal=(df['Statut'] == 'Formel').to_numpy())
+    if selection["clusters"] is not None:
+        st.caption(f"{selection['total']} points dans la zone (plafond {zoom_cap(view['zoom'])} à ce zoom) : "
+                   "affichage regroupé, zoomer pour voir les points")
     try:
-        center_lat = filtered_df['Latitude'].mean()
-        center_lon = filtered_df['Longitude'].mean()
         m = folium.Map(
-            location=[center_lat, center_lon],
-            zoom_start=11,
+            location=view["center"],
+            zoom_start=view["zoom"],
             tiles='CartoDB positron',
             control_scale=True
         )
-        colors = {
-            'Supermarché': '#2ECC71',
-            'Supérette / Mini-market': '#3498DB', 
-            'Épicerie': '#E67E22',
-            'Café': '#8B4513',
-            'Restaurant': '#E74C3C',
-            'Parapharmacie': '#9B59B6',
-            'Boulangerie': '#F39C12',
-            'Kiosque': '#34495E',
-            'Boutique de confiserie': '#E91E63',
-            'Magasin bio': '#27AE60'
-        }
-        marker_cluster = MarkerCluster(name="Points de vente", disableClusteringAtZoom=15).add_to(m)
-        for _, row in filtered_df.iterrows():
-            color = colors.get(row['Catégorie'], '#7F8C8D')
-            popup_html = f"""
-            <div style='width: 220px; font-family: Arial;'>
-                <h4 style='color: {color}; margin: 0 0 8px 0;'>{row['Nom']}</h4>
-                <p style='margin: 0 0 4px 0;'><strong>Type:</strong> {row['Catégorie']}</p>
-                <p style='margin: 0 0 4px 0;'><strong>Statut:</strong> <span style='background: {'#27AE60' if row['Statut']=='Formel' else '#E74C3C'}; color: white; padding: 2px 8px; border-radius: 10px; font-size: 12px;'>{row['Statut']}</span></p>
-                <p style='margin: 0 0 4px 0;'><strong>Zone:</strong> {row['Zone']}</p>
-                <p style='margin: 0 0 4px 0; color: #888; font-size: 12px;'>📍 {row['Latitude']:.4f}, {row['Longitude']:.4f}</p>
-            </div>
-            """
-            folium.Marker(
-                location=[row['Latitude'], row['Longitude']],
-                popup=folium.Popup(popup_html, max_width=250),
-                tooltip=f"{row['Nom']} - {row['Catégorie']}"
-            ).add_to(marker_cluster)
+        if show_density:
+            add_density_layer(m, density_layer, dataset_version)
+        if selection["clusters"] is not None:
+            add_cluster_layer(m, selection["clusters"])
+        else:
+            # Points envoyés en un seul tableau compact, marqueurs et popups construits côté navigateur
+            add_point_layer(m, df.iloc[selection["positions"]], name="Points de vente", disableClusteringAtZoom=15,
+                            min_zoom=MARKERS_MIN_ZOOM if show_density else None)
         folium.LayerControl(position='topright').add_to(m)
-        st_folium(m, width=900, height=550)
+        output = st_folium(m, width=map_width, height=map_height, key="carte_interactive",
+                           returned_objects=["bounds", "zoom"])
     except Exception as e:
         st.error(f"Erreur lors de l'affichage de la carte : {e}")
+        output = None
+
+    # Zone visible modifiée (zoom, ou sortie de la zone chargée) : recharger les points
+    new_bounds = bounds_from_folium((output or {}).get("bounds"))
+    new_zoom = (output or {}).get("zoom")
+    if new_bounds and new_zoom is not None and (new_zoom != view["zoom"] or not contains(loaded_bounds, new_bounds)):
+        st.session_state.map_view = {"center": bounds_center(new_bounds), "zoom": new_zoom, "bounds": new_bounds}
+        st.rerun()
+
+    # Recherche par rayon / plus proches voisins autour d'une adresse
+    st.markdown("---")
+    show_proximity_search(df, mask)
+
+    # Couverture à distance de marche et zones à fort potentiel
+    st.markdown("---")
+    show_coverage(view["center"], map_width, map_height)
+
+    # Densité commerciale agrégée : grilles précalculées, seule la coloration est recalculée
+    st.markdown("---")
+    st.subheader("🔷 Densité Commerciale par Cellule")
+    density = load_density_data()
+    metric_labels = {"total": "Nombre de points", "informal_share": "Part de l'informel"}
+    col1, col2 = st.columns(2)
+    with col1:
+        grid_key = st.selectbox(
+            "Grille",
+            list(density["grids"]),
+            format_func=lambda key: f"{'Hexagones' if key.startswith('hex') else 'Carrés'} de {key.split('-')[1]} m"
+        )
+    with col2:
+        metric = st.selectbox("Indicateur", list(metric_labels), format_func=metric_labels.get)
+    grid = density["grids"][grid_key]
+    st.caption("Filtres Statut et Catégorie appliqués au nombre de points ; la part de l'informel porte sur tous les points de la cellule")
+    grid_map = folium.Map(location=view["center"], zoom_start=11, tiles='CartoDB positron', control_scale=True)
+    add_grid_layer(grid_map, grid, grid_values(grid, metric, status_filter, category_filter),
+                   metric=metric, label=metric_labels[metric])
+    st_folium(grid_map, width=map_width, height=map_height, key="carte_grille", returned_objects=[])
 
     # Graphiques supplémentaires
     st.markdown("---")
@@ -756,9 +1083,9 @@ def show_interactive_map():
     col1, col2 = st.columns(2)
 
     with col1:
-        if len(filtered_df) > 0:
+        if filtered_total > 0:
             st.subheader("📊 Répartition par Catégorie")
-            cat_counts = filtered_df['Catégorie'].value_counts()
+            cat_counts = cube_counts(filtered_cube, 'Catégorie')
             fig = px.pie(
                 values=cat_counts.values,
                 names=cat_counts.index,
@@ -767,9 +1094,9 @@ def show_interactive_map():
             st.plotly_chart(fig, use_container_width=True)
 
     with col2:
-        if len(filtered_df) > 0:
+        if filtered_total > 0:
             st.subheader("🗺️ Répartition par Zone")
-            zone_counts = filtered_df['Zone'].value_counts().head(10)
+            zone_counts = cube_counts(filtered_cube, 'Zone').head(10)
             fig = px.bar(
                 x=zone_counts.values,
                 y=zone_counts.index,
@@ -780,5 +1107,15 @@ def show_interactive_map():
             fig.update_layout(showlegend=False)
             st.plotly_chart(fig, use_container_width=True)
 
+# Sections de la navigation : libellé -> fonction d'affichage
+PAGES = {
+    "🏠 Vue d'ensemble": show_overview,
+    "📊 Cas d'étude : Casablanca": show_casablanca_study,
+    "🔬 Méthodologie": show_methodology,
+    "⚠️ Difficultés Rencontrées": show_difficulties,
+    "🤖 Intelligence Artificielle": show_ai_features,
+    "🗺️ Cartographie interactive": show_interactive_map,
+}
+
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+"""
+Générateur de jeux de données synthétiques de points de vente (1 000 à
+10 millions de lignes) calqués sur le jeu réel : regroupement spatial
+autour des points existants, répartition des catégories et des sources,
+noms (enseignes récurrentes, « sans nom », noms uniques) et taux de
+doublons. Écrit par lots : mémoire bornée quelle que soit la taille.
+"""
+
+import argparse
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from zoning import assign_zones, current_definitions
+
+COLUMNS = ['Zone', 'Nom', 'Catégorie', 'Statut', 'Adresse', 'Latitude', 'Longitude', 'Image', 'Source']
+CHUNK_ROWS = 1_000_000
+DUPLICATE_RATE = 0.02     # part de lignes copiées (même nom, mêmes coordonnées) avant dédoublonnage
+SPREAD_M = 150            # écart-type du bruit autour d'un point réel
+BACKGROUND_SHARE = 0.05   # points tirés uniformément dans l'emprise (hors regroupements)
+METERS_PER_DEG = 111_320.0
+
+# Tags OSM produisant chaque catégorie (inverse de categorize_point), pour simuler une réponse Overpass
+OSM_TAGS = {
+    "Supermarché": ("shop", "supermarket"),
+    "Supérette / Mini-market": ("shop", "convenience"),
+    "Épicerie": ("shop", "general"),
+    "Kiosque": ("shop", "kiosk"),
+    "Boutique de confiserie": ("shop", "confectionery"),
+    "Boulangerie": ("shop", "bakery"),
+    "Parapharmacie": ("amenity", "pharmacy"),
+    "Magasin bio": ("shop", "organic"),
+    "Café": ("amenity", "cafe"),
+    "Restaurant": ("amenity", "restaurant"),
+}
+
+def share(series):
+    """(valeurs, probabilités) d'une colonne"""
+    counts = series.value_counts()
+    return counts.index.to_numpy(dtype=object), (counts / counts.sum()).to_numpy()
+
+def dataset_profile(df):
+    """Distributions du jeu réel utilisées par le générateur"""
+    lat = pd.to_numeric(df['Latitude'], errors='coerce')
+    lon = pd.to_numeric(df['Longitude'], errors='coerce')
+    located = df[lat.notna() & lon.notna()]
+    names = located['Nom'].fillna('').astype(str)
+    unnamed = names.str.endswith(' sans nom')
+    chain_rows = 0
+    name_pools = {}
+    for category, group in names[~unnamed].groupby(located['Catégorie'][~unnamed]):
+        counts = group.value_counts()
+        chains = counts[counts > 1]
+        chain_rows += int(chains.sum())
+        name_pools[category] = {
+            "chains": (chains.index.to_numpy(dtype=object), (chains / max(chains.sum(), 1)).to_numpy()),
+            "unique": counts[counts == 1].index.to_numpy(dtype=object),
+        }
+    by_category = located.groupby('Catégorie')
+    addresses = located['Adresse'].fillna('').astype(str)
+    streets = addresses[(addresses != names) & addresses.str.contains(',')]
+    return {
+        "lat": lat[located.index].to_numpy(dtype=float),
+        "lon": lon[located.index].to_numpy(dtype=float),
+        "bbox": (float(lat.min()), float(lon.min()), float(lat.max()), float(lon.max())),
+        "category_of_point": located['Catégorie'].astype(str).to_numpy(dtype=object),
+        "status": by_category['Statut'].agg(lambda s: s.mode().iloc[0]).to_dict(),
+        "image": by_category['Image'].agg(lambda s: s.mode().iloc[0]).to_dict(),
+        "sources": share(located['Source'].fillna('OSM')),
+        # Noms : « sans nom », enseignes récurrentes ou noms uniques, puisés par catégorie
+        "unnamed_share": float(unnamed.mean()) if len(names) else 0.0,
+        "chain_share": chain_rows / len(names) if len(names) else 0.0,
+        "names": name_pools,
+        "address_is_name": float((addresses == names).mean()) if len(names) else 1.0,
+        "streets": streets.to_numpy(dtype=object),
+    }
+
+def load_profile(path=None):
+    """Profil du CSV donné ou du jeu de données courant"""
+    if path is None:
+        from dataset import current_dataset
+        path, _ = current_dataset()
+    return dataset_profile(pd.read_csv(path))
+
+def pick(rng, values, probabilities, n):
+    return values[rng.choice(len(values), size=n, p=probabilities)] if len(values) else np.full(n, '', dtype=object)
+
+def generate_points(n, profile, seed=0, duplicate_rate=DUPLICATE_RATE, name_offset=0):
+    """DataFrame de n points synthétiques (doublons compris).
+
+    Chaque point est un point réel tiré au hasard, déplacé d'un bruit
+    gaussien (SPREAD_M) : la densité suit celle du jeu réel. Une part
+    BACKGROUND_SHARE est tirée uniformément dans l'emprise. La catégorie
+    est celle du point réel d'origine (même mélange, mêmes quartiers).
+    """
+    rng = np.random.default_rng(seed)
+    n_duplicates = int(round(n * duplicate_rate))
+    m = n - n_duplicates
+    origin = rng.integers(0, len(profile["lat"]), size=m)
+    lat = profile["lat"][origin] + rng.normal(0, SPREAD_M / METERS_PER_DEG, m)
+    lon = profile["lon"][origin] + rng.normal(0, SPREAD_M / (METERS_PER_DEG * np.cos(np.radians(lat))), m)
+    background = rng.random(m) < BACKGROUND_SHARE
+    south, west, north, east = profile["bbox"]
+    lat[background] = rng.uniform(south, north, background.sum())
+    lon[background] = rng.uniform(west, east, background.sum())
+    lat, lon = np.round(lat, 7), np.round(lon, 7)
+    categories = profile["category_of_point"][origin]
+
+    # Noms : « <catégorie> sans nom », enseigne récurrente ou nom unique numéroté
+    draw = rng.random(m)
+    names = np.empty(m, dtype=object)
+    unnamed = draw < profile["unnamed_share"]
+    chain = ~unnamed & (draw < profile["unnamed_share"] + profile["chain_share"])
+    unique = ~unnamed & ~chain
+    names[unnamed] = categories[unnamed] + " sans nom"
+    for category in np.unique(categories[~unnamed]):
+        pool = profile["names"].get(category, {"chains": ([], []), "unique": []})
+        in_category = categories == category
+        if len(pool["chains"][0]):
+            rows = np.flatnonzero(chain & in_category)
+            names[rows] = pick(rng, *pool["chains"], len(rows))
+        else:
+            # Pas d'enseigne récurrente dans cette catégorie : nom unique
+            unique |= chain & in_category
+        rows = np.flatnonzero(unique & in_category)
+        names[rows] = (pool["unique"][rng.integers(0, len(pool["unique"]), size=len(rows))]
+                       if len(pool["unique"]) else categories[rows])
+    # Numéro unique : les noms tirés du jeu réel ne se répètent pas d'un point à l'autre
+    numbers = np.arange(name_offset, name_offset + int(unique.sum())).astype(str).astype(object)
+    names[unique] = names[unique] + " " + numbers
+
+    addresses = names.copy()
+    with_street = rng.random(m) >= profile["address_is_name"]
+    if len(profile["streets"]):
+        addresses[with_street] = profile["streets"][rng.integers(0, len(profile["streets"]), size=int(with_street.sum()))]
+
+    df = pd.DataFrame({
+        'Zone': assign_zones(lat, lon, current_definitions()),
+        'Nom': names,
+        'Catégorie': categories,
+        'Statut': pd.Series(categories).map(profile["status"]).fillna("Informel").to_numpy(dtype=object),
+        'Adresse': addresses,
+        'Latitude': lat,
+        'Longitude': lon,
+        'Image': pd.Series(categories).map(profile["image"]).fillna("icons/supermarket.png").to_numpy(dtype=object),
+        'Source': pick(rng, *profile["sources"], m),
+    }, columns=COLUMNS)
+    if n_duplicates and m:
+        # Doublons : copies de lignes existantes, dispersées dans le jeu
+        copies = df.iloc[rng.integers(0, m, size=n_duplicates)]
+        df = pd.concat([df, copies], ignore_index=True)
+        df = df.iloc[rng.permutation(len(df))].reset_index(drop=True)
+    return df
+
+def write_synthetic(path, n, profile, seed=0, duplicate_rate=DUPLICATE_RATE, chunk_rows=CHUNK_ROWS):
+    """Écrit n points synthétiques dans un CSV, lot par lot (fichier écrit à côté puis renommé)"""
+    tmp_path = f"{path}.tmp"
+    written = 0
+    with open(tmp_path, 'w', encoding='utf-8-sig', newline='') as f:
+        for i, start in enumerate(range(0, n, chunk_rows)):
+            chunk = generate_points(min(chunk_rows, n - start), profile, seed=[seed, i],
+                                    duplicate_rate=duplicate_rate, name_offset=start)
+            chunk.to_csv(f, index=False, header=(i == 0))
+            written += len(chunk)
+    os.replace(tmp_path, path)
+    return written
+
+def osm_elements(df):
+    """Éléments Overpass (nœuds tagués) correspondant aux points, pour
+    exercer categorize_point / parse_osm_elements sans réseau"""
+    tags = [OSM_TAGS.get(category, ("shop", "general")) for category in df['Catégorie']]
+    return [
+        {"type": "node", "id": i, "lat": lat, "lon": lon, "tags": {key: value, "name": name}}
+        for i, ((key, value), name, lat, lon) in enumerate(zip(tags, df['Nom'], df['Latitude'], df['Longitude']))
+    ]
+
+def main():
+    """Fonction principale"""
+    parser = argparse.ArgumentParser(description="Génération d'un jeu de données synthétique de points de vente")
+    parser.add_argument("rows", type=int, help="Nombre de lignes (doublons compris)")
+    parser.add_argument("--output", help="CSV de sortie (par défaut : points_vente_synthetique_<lignes>.csv)")
+    parser.add_argument("--reference", help="CSV de référence (par défaut : jeu de données courant)")
+    parser.add_argument("--seed", type=int, default=0, help="Graine aléatoire")
+    parser.add_argument("--duplicates", type=float, default=DUPLICATE_RATE, help="Taux de doublons")
+    args = parser.parse_args()
+
+    output = args.output or f"points_vente_synthetique_{args.rows}.csv"
+    start = time.perf_counter()
+    written = write_synthetic(output, args.rows, load_profile(args.reference), args.seed, args.duplicates)
+    print(f"[SUCCESS] {written} points synthétiques écrits dans {output} en {time.perf_counter() - start:.1f}s")
+
+if __name__ == "__main__":
+    main()
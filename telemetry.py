@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+Télémétrie de performance du pipeline : temps mur, temps CPU, lignes
+entrées/sorties, mémoire et octets réseau par étape et sous-étape
+"""
+
+import json
+import os
+import threading
+import time
+import tracemalloc
+import uuid
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+TELEMETRY_FILE = "pipeline_telemetry.jsonl"
+
+RUN_ID = uuid.uuid4().hex[:12]
+_records = []
+_lock = threading.Lock()
+_local = threading.local()
+
+def start_run(trace_memory=False):
+    """Démarre une nouvelle exécution (identifiant, mesure mémoire optionnelle)"""
+    global RUN_ID
+    RUN_ID = uuid.uuid4().hex[:12]
+    with _lock:
+        _records.clear()
+    if trace_memory and not tracemalloc.is_tracing():
+        tracemalloc.start()
+    return RUN_ID
+
+def _stack():
+    if not hasattr(_local, "stack"):
+        _local.stack = []
+    return _local.stack
+
+def _max_rss_kb():
+    if resource is None:
+        return None
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+def _update_peaks(stack):
+    """Reporte le pic tracemalloc courant sur tous les enregistrements ouverts"""
+    _, peak = tracemalloc.get_traced_memory()
+    for record in stack:
+        record["_peak"] = max(record["_peak"], peak)
+    tracemalloc.reset_peak()
+
+@contextmanager
+def track(step, rows_in=None):
+    """Mesure une étape ou sous-étape.
+
+    Le dictionnaire renvoyé peut être complété par l'appelant (rows_out,
+    rows_in). Les sous-étapes imbriquées sont rattachées à l'étape la plus
+    externe du même thread. Le pic mémoire (si tracemalloc est actif) est
+    global au processus : il est approximatif quand des étapes tournent
+    en parallèle.
+    """
+    stack = _stack()
+    tracing = tracemalloc.is_tracing()
+    record = {
+        "run_id": RUN_ID,
+        "stage": stack[0]["step"] if stack else step,
+        "step": step,
+        "depth": len(stack),
+        "rows_in": rows_in,
+        "rows_out": None,
+        "net_bytes": 0,
+        "_peak": 0,
+    }
+    if tracing:
+        _update_peaks(stack)
+        record["_base"] = tracemalloc.get_traced_memory()[0]
+    stack.append(record)
+    started_at = time.time()
+    wall_start = time.perf_counter()
+    cpu_start = time.thread_time()
+    status = "ok"
+    try:
+        yield record
+    except Exception:
+        status = "erreur"
+        raise
+    finally:
+        wall = time.perf_counter() - wall_start
+        cpu = time.thread_time() - cpu_start
+        if tracing:
+            _update_peaks(stack)
+        stack.pop()
+        record.update({
+            "status": status,
+            "started_at": started_at,
+            "wall_s": round(wall, 6),
+            "cpu_s": round(cpu, 6),
+            "peak_mem_kb": round((record["_peak"] - record["_base"]) / 1024, 1) if tracing else None,
+            "max_rss_kb": _max_rss_kb(),
+        })
+        if record["rows_out"] is not None and wall > 0:
+            record["rows_per_s"] = round(record["rows_out"] / wall, 1)
+        record.pop("_peak", None)
+        record.pop("_base", None)
+        with _lock:
+            _records.append(record)
+
+def add_network_bytes(n):
+    """Attribue n octets reçus à l'étape courante et à ses parents (même thread)"""
+    for record in _stack():
+        record["net_bytes"] += n
+
+def count_rows(value):
+    """Nombre de lignes d'un résultat d'étape (None si non mesurable)"""
+    if isinstance(value, (str, bytes)):
+        return None
+    try:
+        return len(value)
+    except TypeError:
+        return None
+
+def get_records():
+    """Copie des enregistrements de l'exécution courante"""
+    with _lock:
+        return list(_records)
+
+def write_jsonl(path=TELEMETRY_FILE):
+    """Ajoute les enregistrements de l'exécution au fichier JSON lines"""
+    records = get_records()
+    with open(path, 'a', encoding='utf-8') as f:
+        for record in records:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+    return len(records)
+
+def load_jsonl(path=TELEMETRY_FILE):
+    """Relit l'historique des exécutions (pour comparer les débits)"""
+    if not os.path.exists(path):
+        return []
+    with open(path, 'r', encoding='utf-8') as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+def format_summary(records=None):
+    """Tableau lisible : une ligne par étape/sous-étape, groupées par étape"""
+    records = get_records() if records is None else records
+    header = f"{'Étape':<28} {'Mur (s)':>9} {'CPU (s)':>9} {'Entrée':>8} {'Sortie':>8} {'Mém. (KB)':>10} {'Réseau (KB)':>12}"
+    lines = [header, "-" * len(header)]
+    for record in sorted(records, key=lambda r: (r["stage"], r["started_at"])):
+        label = "  " * record["depth"] + record["step"]
+        mem = record["peak_mem_kb"] if record["peak_mem_kb"] is not None else "-"
+        lines.append(
+            f"{label:<28} {record['wall_s']:>9.3f} {record['cpu_s']:>9.3f} "
+            f"{record['rows_in'] if record['rows_in'] is not None else '-':>8} "
+            f"{record['rows_out'] if record['rows_out'] is not None else '-':>8} "
+            f"{mem:>10} {record['net_bytes'] / 1024:>12.1f}"
+        )
+    return "\n".join(lines)
@@ -0,0 +1,308 @@
+#!/usr/bin/env python3
+"""
+Pyramide de tuiles raster de densité (carte de chaleur) précalculées à
+partir des points : une couche globale, une par statut et une par catégorie.
+Une pyramide par version du jeu de données (static/tiles/<version>/),
+construite à côté puis renommée : jamais de tuile d'une version précédente.
+"""
+
+import argparse
+import math
+import os
+import shutil
+import sqlite3
+import struct
+import unicodedata
+import zlib
+
+import numpy as np
+import pandas as pd
+
+# Dossier servi par Streamlit (server.enableStaticServing) sous /app/static/
+TILES_DIR = os.path.join("static", "tiles")
+TILES_URL = "/app/static/tiles"
+TILE_VERSIONS_KEPT = 3  # pyramides conservées (sessions ouvertes sur une version précédente)
+TILE_SIZE = 256
+MIN_ZOOM = 6
+MAX_ZOOM = 13
+# Les marqueurs ne sont affichés qu'à partir de ce zoom en mode densité
+MARKERS_MIN_ZOOM = MAX_ZOOM + 1
+BLUR_RADIUS = 4  # rayon (px) du flou appliqué aux comptes par pixel
+
+# Rampe de couleurs jaune -> orange -> rouge foncé, opacité croissante
+_RAMP = np.array([
+    [255, 255, 178, 0],
+    [254, 204, 92, 140],
+    [253, 141, 60, 190],
+    [240, 59, 32, 220],
+    [189, 0, 38, 240],
+], dtype=float)
+COLOR_LUT = np.stack([
+    np.interp(np.linspace(0, 1, 256), np.linspace(0, 1, len(_RAMP)), _RAMP[:, channel])
+    for channel in range(4)
+], axis=1).astype(np.uint8)
+
+def slugify(value):
+    """Nom de dossier sans accents ni espaces ('Supérette / Mini-market' -> 'superette_mini-market')"""
+    ascii_value = unicodedata.normalize('NFKD', str(value)).encode('ascii', 'ignore').decode('ascii')
+    slug = "".join(ch if ch.isalnum() or ch == '-' else "_" for ch in ascii_value.lower())
+    return "_".join(part for part in slug.split("_") if part)
+
+def layer_name(kind=None, value=None):
+    """Nom de couche : 'all', 'statut/formel', 'categorie/cafe'..."""
+    return "all" if kind is None else f"{kind}/{slugify(value)}"
+
+def to_global_pixels(lat, lon, zoom):
+    """Coordonnées pixel Web Mercator (EPSG:3857) au zoom donné"""
+    scale = TILE_SIZE * 2 ** zoom
+    lat = np.clip(lat, -85.05112878, 85.05112878)
+    x = (lon + 180.0) / 360.0 * scale
+    sin_lat = np.sin(np.radians(lat))
+    y = (0.5 - np.log((1 + sin_lat) / (1 - sin_lat)) / (4 * math.pi)) * scale
+    return np.floor(x).astype(np.int64), np.floor(y).astype(np.int64)
+
+def splat_kernel(radius):
+    """Noyau conique normalisé (somme 1) et ses décalages (dy, dx)"""
+    dy, dx = np.mgrid[-radius:radius + 1, -radius:radius + 1]
+    weights = np.clip(1 - np.hypot(dx, dy) / (radius + 1), 0, None)
+    keep = weights > 0
+    return dy[keep], dx[keep], (weights[keep] / weights[keep].sum()).astype(np.float32)
+
+def encode_png(rgba):
+    """Encode une image RGBA (h, w, 4) uint8 en PNG (zlib, sans dépendance)"""
+    height, width, _ = rgba.shape
+    raw = np.concatenate([np.zeros((height, 1), dtype=np.uint8), rgba.reshape(height, width * 4)], axis=1)
+
+    def chunk(tag, data):
+        return struct.pack(">I", len(data)) + tag + data + struct.pack(">I", zlib.crc32(tag + data) & 0xFFFFFFFF)
+
+    header = struct.pack(">IIBBBBB", width, height, 8, 6, 0, 0, 0)
+    return (b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", header)
+            + chunk(b"IDAT", zlib.compress(raw.tobytes(), 3)) + chunk(b"IEND", b""))
+
+def render_zoom(lat, lon, zoom, radius=BLUR_RADIUS):
+    """Génère les tuiles (x, y, png) non vides d'un zoom.
+
+    Les points sont projetés en pixels en une passe vectorisée, puis chaque
+    pixel occupé dépose un noyau lissant pondéré par son compte (coût
+    proportionnel aux pixels occupés, pas à la surface de la tuile). Les points des
+    tuiles voisines proches du bord sont inclus pour un rendu continu.
+    """
+    gx, gy = to_global_pixels(lat, lon, zoom)
+    tx, ty = gx // TILE_SIZE, gy // TILE_SIZE
+    n_tiles = 2 ** zoom
+    keys = tx * n_tiles + ty
+    order = np.argsort(keys, kind='stable')
+    keys_sorted = keys[order]
+    unique_keys, starts = np.unique(keys_sorted, return_index=True)
+    ends = np.append(starts[1:], len(keys_sorted))
+    slices = {int(k): (s, e) for k, s, e in zip(unique_keys, starts, ends)}
+
+    # Densité de référence du zoom : comptes max sur des cellules de la taille du noyau
+    cell = 2 * radius + 1
+    _, coarse_counts = np.unique((gx // cell) * (2 ** 40) + gy // cell, return_counts=True)
+    kernel_dy, kernel_dx, kernel_w = splat_kernel(radius)
+    reference = max(coarse_counts.max() * float(kernel_w.max()) / 2, 1e-9)
+
+    # Toile avec marge de 2 rayons : un noyau ne déborde jamais
+    margin = 2 * radius
+    side = TILE_SIZE + 2 * margin
+    offsets = kernel_dy * side + kernel_dx
+    for key in unique_keys:
+        key = int(key)
+        tile_x, tile_y = divmod(key, n_tiles)
+        parts = [order[slice(*slices[nk])] for nk in (
+            (tile_x + dx) * n_tiles + (tile_y + dy) for dx in (-1, 0, 1) for dy in (-1, 0, 1)
+        ) if nk in slices]
+        index = np.concatenate(parts)
+        local_x = gx[index] - tile_x * TILE_SIZE + margin
+        local_y = gy[index] - tile_y * TILE_SIZE + margin
+        near = ((local_x >= radius) & (local_x < side - radius)
+                & (local_y >= radius) & (local_y < side - radius))
+        # Comptes par pixel d'abord : le noyau n'est déposé qu'une fois par pixel occupé
+        occupancy = np.bincount(local_y[near] * side + local_x[near], minlength=side * side)
+        centers = np.flatnonzero(occupancy)
+        density = np.bincount((centers[:, None] + offsets[None, :]).ravel(),
+                              weights=(occupancy[centers, None] * kernel_w[None, :]).ravel(),
+                              minlength=side * side)
+        density = density.reshape(side, side)[margin:margin + TILE_SIZE, margin:margin + TILE_SIZE]
+        if not density.any():
+            continue
+        level = np.clip(np.log1p(density / reference * 50) / np.log1p(50), 0, 1)
+        rgba = COLOR_LUT[(level * 255).astype(np.uint8)]
+        rgba[density <= 0, 3] = 0
+        yield tile_x, tile_y, encode_png(rgba)
+
+def layer_subsets(df):
+    """Couches à générer : (nom, masque des lignes)"""
+    subsets = [(layer_name(), np.ones(len(df), dtype=bool))]
+    for kind, column in (("statut", 'Statut'), ("categorie", 'Catégorie')):
+        for value in df[column].dropna().unique():
+            subsets.append((layer_name(kind, value), (df[column] == value).to_numpy()))
+    return subsets
+
+def write_tile_dir(out_dir, layer, zoom, x, y, png):
+    path = os.path.join(out_dir, layer, str(zoom), str(x), f"{y}.png")
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(png)
+
+def mbtiles_path(base_path, layer):
+    """Fichier MBTiles d'une couche : densite.mbtiles -> densite_statut_formel.mbtiles"""
+    root, ext = os.path.splitext(base_path)
+    return f"{root}_{layer.replace('/', '_')}{ext or '.mbtiles'}"
+
+def open_mbtiles(path, layer, min_zoom, max_zoom, bounds):
+    """MBTiles 1.3 (SQLite) d'une couche : schéma standard, fichier recréé"""
+    if os.path.exists(path):
+        os.remove(path)
+    connection = sqlite3.connect(path)
+    connection.executescript("""
+        CREATE TABLE metadata (name TEXT, value TEXT);
+        CREATE TABLE tiles (zoom_level INTEGER, tile_column INTEGER, tile_row INTEGER, tile_data BLOB);
+        CREATE UNIQUE INDEX tile_index ON tiles (zoom_level, tile_column, tile_row);
+    """)
+    south, west, north, east = bounds
+    connection.executemany("INSERT INTO metadata VALUES (?, ?)", [
+        ("name", f"densite_points_vente_{layer.replace('/', '_')}"),
+        ("format", "png"),
+        ("type", "overlay"),
+        ("version", "1.3"),
+        ("minzoom", str(min_zoom)),
+        ("maxzoom", str(max_zoom)),
+        ("bounds", f"{west:.6f},{south:.6f},{east:.6f},{north:.6f}"),
+    ])
+    return connection
+
+def build_pyramid(df, out_dir, min_zoom=MIN_ZOOM, max_zoom=MAX_ZOOM, mbtiles=None):
+    """Génère toutes les couches sur tous les zooms dans out_dir (ou un
+    fichier MBTiles par couche, nommé d'après mbtiles) ; retourne le nombre de tuiles"""
+    df = df.dropna(subset=['Latitude', 'Longitude'])
+    lat = pd.to_numeric(df['Latitude'], errors='coerce').to_numpy(dtype=float)
+    lon = pd.to_numeric(df['Longitude'], errors='coerce').to_numpy(dtype=float)
+    valid = np.isfinite(lat) & np.isfinite(lon)
+    total = 0
+    for layer, mask in layer_subsets(df):
+        mask = mask & valid
+        if not mask.any():
+            continue
+        connection = None
+        if mbtiles:
+            bounds = (lat[mask].min(), lon[mask].min(), lat[mask].max(), lon[mask].max())
+            connection = open_mbtiles(mbtiles_path(mbtiles, layer), layer, min_zoom, max_zoom, bounds)
+        try:
+            for zoom in range(min_zoom, max_zoom + 1):
+                for x, y, png in render_zoom(lat[mask], lon[mask], zoom):
+                    if connection is not None:
+                        # MBTiles utilise l'origine en bas (TMS)
+                        connection.execute("INSERT INTO tiles VALUES (?, ?, ?, ?)",
+                                           (zoom, x, (2 ** zoom - 1) - y, png))
+                    else:
+                        write_tile_dir(out_dir, layer, zoom, x, y, png)
+                    total += 1
+            if connection is not None:
+                connection.commit()
+        finally:
+            if connection is not None:
+                connection.close()
+        print(f"[INFO] Couche {layer}: {int(mask.sum())} points")
+    return total
+
+def version_key(version):
+    """Nom de dossier d'une version du jeu de données"""
+    return "".join(ch if ch.isalnum() or ch in "-_." else "_" for ch in str(version))
+
+def pyramid_dir(version, out_dir=TILES_DIR):
+    """Dossier de la pyramide d'une version"""
+    return os.path.join(out_dir, version_key(version))
+
+def prune_pyramids(out_dir=TILES_DIR, keep=TILE_VERSIONS_KEPT):
+    """Supprime les pyramides des versions les plus anciennes"""
+    if not os.path.isdir(out_dir):
+        return
+    entries = [os.path.join(out_dir, name) for name in os.listdir(out_dir)]
+    pyramids = sorted((path for path in entries if os.path.isdir(path) and not path.endswith(".tmp")),
+                      key=os.path.getmtime)
+    for path in pyramids[:-keep]:
+        shutil.rmtree(path, ignore_errors=True)
+
+def write_tiles(df, version, out_dir=TILES_DIR, min_zoom=MIN_ZOOM, max_zoom=MAX_ZOOM):
+    """Pyramide d'une version du jeu de données, générée si absente.
+
+    Écrite dans un dossier temporaire puis renommée : la pyramide d'une
+    version est complète ou absente. Retourne le nombre de tuiles écrites
+    (0 si elle existait déjà).
+    """
+    target = pyramid_dir(version, out_dir)
+    if os.path.isdir(target):
+        return 0
+    tmp_dir = f"{target}.tmp"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    try:
+        total = build_pyramid(df, tmp_dir, min_zoom, max_zoom)
+        os.makedirs(tmp_dir, exist_ok=True)
+        os.replace(tmp_dir, target)
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+    prune_pyramids(out_dir)
+    return total
+
+def materialize(dataset_path, version=None, out_dir=TILES_DIR):
+    """Étape de pipeline : génère la pyramide de tuiles d'un CSV (si absente pour sa version)"""
+    from dataset import file_version
+    version = version or file_version(dataset_path)
+    if os.path.isdir(pyramid_dir(version, out_dir)):
+        print("[INFO] Tuiles de densité à jour")
+        return 0
+    total = write_tiles(pd.read_csv(dataset_path), version, out_dir)
+    print(f"[SUCCESS] {total} tuiles de densité écrites dans {pyramid_dir(version, out_dir)}")
+    return total
+
+def tile_url(layer, version, base_url=TILES_URL):
+    """Gabarit d'URL Leaflet pour une couche de la pyramide d'une version"""
+    return f"{base_url}/{version_key(version)}/{layer}/{{z}}/{{x}}/{{y}}.png"
+
+def layer_available(layer, version, out_dir=TILES_DIR):
+    """Vrai si la couche a été générée pour cette version du jeu de données"""
+    return os.path.isdir(os.path.join(pyramid_dir(version, out_dir), layer))
+
+def add_density_layer(m, layer, version, name="Densité des points de vente"):
+    """Ajoute à une carte folium la couche de tuiles de densité précalculée.
+
+    La couche s'efface au zoom des marqueurs ; au-delà de MAX_ZOOM les
+    tuiles du dernier niveau sont agrandies.
+    """
+    import folium
+    return folium.TileLayer(
+        tiles=tile_url(layer, version),
+        attr="Densité précalculée (tiles.py)",
+        name=name,
+        overlay=True,
+        control=True,
+        opacity=0.8,
+        max_native_zoom=MAX_ZOOM,
+        max_zoom=MARKERS_MIN_ZOOM - 1,
+    ).add_to(m)
+
+def main():
+    """Fonction principale"""
+    parser = argparse.ArgumentParser(description="Génération des tuiles de densité")
+    parser.add_argument("--min-zoom", type=int, default=MIN_ZOOM)
+    parser.add_argument("--max-zoom", type=int, default=MAX_ZOOM)
+    parser.add_argument("--out", default=TILES_DIR, help="Dossier racine des pyramides")
+    parser.add_argument("--mbtiles", help="Écrit un fichier MBTiles par couche (<nom>_<couche>.mbtiles) "
+                                          "au lieu d'un dossier")
+    args = parser.parse_args()
+
+    from dataset import load_dataset
+    df, version = load_dataset()
+    print(f"[INFO] Génération des tuiles pour {len(df)} points (version {version})")
+    if args.mbtiles:
+        total = build_pyramid(df, None, args.min_zoom, args.max_zoom, args.mbtiles)
+        print(f"[SUCCESS] {total} tuiles écrites dans {mbtiles_path(args.mbtiles, '*')}")
+        return
+    total = write_tiles(df, version, args.out, args.min_zoom, args.max_zoom)
+    print(f"[SUCCESS] {total} tuiles écrites dans {pyramid_dir(version, args.out)}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Chargement des points limité à la zone visible de la carte : requête dans
+l'index spatial, plafond de points par zoom et regroupement côté serveur
+au-delà du plafond
+"""
+
+import math
+
+import numpy as np
+import pandas as pd
+
+from tiles import TILE_SIZE, to_global_pixels
+
+# Plafond de points envoyés au navigateur : (zoom maximal, nombre de points)
+ZOOM_CAPS = [(11, 1500), (13, 3000), (15, 5000)]
+MAX_ZOOM_CAP = 8000
+CLUSTER_CELL_PX = 64     # taille (pixels écran) d'une cellule de regroupement
+VIEWPORT_MARGIN = 0.25   # marge chargée autour de la zone visible (fraction de sa taille)
+
+def zoom_cap(zoom):
+    """Nombre maximal de points individuels affichés à un zoom"""
+    for max_zoom, cap in ZOOM_CAPS:
+        if zoom <= max_zoom:
+            return cap
+    return MAX_ZOOM_CAP
+
+def bounds_from_folium(bounds):
+    """Convertit les bounds renvoyées par st_folium en (sud, ouest, nord, est)"""
+    try:
+        south_west, north_east = bounds["_southWest"], bounds["_northEast"]
+        values = (south_west["lat"], south_west["lng"], north_east["lat"], north_east["lng"])
+    except (KeyError, TypeError):
+        return None
+    if any(value is None for value in values):
+        return None
+    return tuple(float(value) for value in values)
+
+def bounds_center(bounds):
+    south, west, north, east = bounds
+    return [(south + north) / 2, (west + east) / 2]
+
+def bounds_around(lat, lon, zoom, width, height):
+    """Zone visible d'une carte de width x height pixels centrée en (lat, lon)"""
+    scale = TILE_SIZE * 2 ** zoom
+    x = (lon + 180.0) / 360.0 * scale
+    y = (0.5 - math.log(math.tan(math.pi / 4 + math.radians(lat) / 2)) / (2 * math.pi)) * scale
+
+    def to_lat(pixel_y):
+        return math.degrees(2 * math.atan(math.exp((0.5 - pixel_y / scale) * 2 * math.pi)) - math.pi / 2)
+
+    def to_lon(pixel_x):
+        return pixel_x / scale * 360.0 - 180.0
+
+    return (to_lat(y + height / 2), to_lon(x - width / 2), to_lat(y - height / 2), to_lon(x + width / 2))
+
+def pad_bounds(bounds, margin=VIEWPORT_MARGIN):
+    """Agrandit la zone de margin (fraction) de chaque côté"""
+    south, west, north, east = bounds
+    d_lat, d_lon = (north - south) * margin, (east - west) * margin
+    return (south - d_lat, west - d_lon, north + d_lat, east + d_lon)
+
+def contains(outer, inner):
+    """Vrai si la zone inner est entièrement dans outer"""
+    return (outer[0] <= inner[0] and outer[1] <= inner[1]
+            and outer[2] >= inner[2] and outer[3] >= inner[3])
+
+def cluster_points(lat, lon, zoom, formal=None, cell_px=CLUSTER_CELL_PX):
+    """Regroupe les points par cellule de cell_px pixels au zoom donné.
+
+    Retourne un DataFrame (Latitude, Longitude, Nombre, Formels) : position
+    moyenne des points de chaque cellule, effectif et nombre de points formels.
+    """
+    gx, gy = to_global_pixels(lat, lon, zoom)
+    _, cells = np.unique((gx // cell_px) * (2 ** 32) + gy // cell_px, return_inverse=True)
+    counts = np.bincount(cells)
+    clusters = pd.DataFrame({
+        'Latitude': np.bincount(cells, weights=lat) / counts,
+        'Longitude': np.bincount(cells, weights=lon) / counts,
+        'Nombre': counts,
+    })
+    if formal is not None:
+        clusters['Formels'] = np.bincount(cells, weights=formal).astype(np.int64)
+    return clusters.sort_values('Nombre', ascending=False, ignore_index=True)
+
+def select_viewport(index, bounds, zoom, mask=None, formal=None, cap=None):
+    """Points d'une zone pour la carte.
+
+    Retourne {"positions", "total", "clusters"} : positions des lignes dans
+    la zone (au plus cap) ; si la zone en contient davantage, positions est
+    vide et clusters contient les regroupements calculés côté serveur.
+    """
+    cap = zoom_cap(zoom) if cap is None else cap
+    positions = index.query_bbox(*bounds, mask=mask)
+    if len(positions) <= cap:
+        return {"positions": positions, "total": len(positions), "clusters": None}
+    clusters = cluster_points(index.lat[positions], index.lon[positions], zoom,
+                              formal=None if formal is None else np.asarray(formal)[positions])
+    return {"positions": positions[:0], "total": len(positions), "clusters": clusters}
@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+"""
+Zonage incrémental : les zones d'un jeu de données sont enregistrées avec
+la version des définitions utilisées (boîtes lat/lon de zone_mapping).
+Quand les définitions changent, seuls les points situés dans une boîte
+modifiée (ajoutée, supprimée, déplacée ou dont la priorité a changé) sont
+recalculés.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from checkpoint import atomic_write_json
+
+ZONES_SUFFIX = ".zones.json"
+DEFAULT_ZONE = "Casablanca"
+
+def sidecar_path(dataset_path):
+    """Chemin de l'enregistrement du zonage associé à un CSV"""
+    return os.path.splitext(dataset_path)[0] + ZONES_SUFFIX
+
+def zone_definitions(mapping):
+    """Définitions ordonnées [lat_min, lat_max, lon_min, lon_max, zone] d'un
+    dict {(boîte): zone} ; la première boîte contenant un point l'emporte"""
+    return [[*map(float, box), str(zone)] for box, zone in mapping.items()]
+
+def current_definitions():
+    """Définitions en vigueur (zone_mapping de la collecte)"""
+    from osm_complet_scraper import zone_mapping
+    return zone_definitions(zone_mapping)
+
+def definitions_version(definitions, default=DEFAULT_ZONE):
+    """Empreinte des définitions (ordre compris) et de la zone par défaut"""
+    text = json.dumps([definitions, default], ensure_ascii=False, separators=(',', ':'))
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()[:16]
+
+def assign_zones(lat, lon, definitions, default=DEFAULT_ZONE):
+    """Zone de chaque point (vectorisé), mêmes règles que get_zone_from_coords :
+    bornes incluses, première boîte gagnante, défaut hors boîtes ou sans coordonnées"""
+    lat = pd.to_numeric(pd.Series(lat), errors='coerce').to_numpy(dtype=float)
+    lon = pd.to_numeric(pd.Series(lon), errors='coerce').to_numpy(dtype=float)
+    zones = np.full(len(lat), default, dtype=object)
+    pending = np.ones(len(lat), dtype=bool)
+    for lat_min, lat_max, lon_min, lon_max, zone in definitions:
+        # Comparaisons fausses pour NaN : les points sans coordonnées gardent le défaut
+        inside = pending & (lat >= lat_min) & (lat <= lat_max) & (lon >= lon_min) & (lon <= lon_max)
+        zones[inside] = zone
+        pending &= ~inside
+    return zones
+
+def boxes_overlap(a, b):
+    return a[0] <= b[1] and b[0] <= a[1] and a[2] <= b[3] and b[2] <= a[3]
+
+def changed_boxes(old, new):
+    """Boîtes dont le changement peut modifier la zone d'un point.
+
+    Une définition présente d'un seul côté compte avec sa boîte ; deux
+    définitions communes qui se chevauchent et dont l'ordre relatif s'est
+    inversé comptent aussi (la zone de leur intersection change). Un point
+    hors de toutes ces boîtes est dans les mêmes boîtes, avec les mêmes
+    priorités, avant et après : sa zone ne change pas.
+    """
+    old_keys = [tuple(d) for d in old]
+    new_keys = [tuple(d) for d in new]
+    boxes = [key[:4] for key in set(old_keys) ^ set(new_keys)]
+    old_rank = {key: i for i, key in reversed(list(enumerate(old_keys)))}
+    new_rank = {key: i for i, key in reversed(list(enumerate(new_keys)))}
+    common = [key for key in new_rank if key in old_rank]
+    for i, a in enumerate(common):
+        for b in common[i + 1:]:
+            swapped = (old_rank[a] < old_rank[b]) != (new_rank[a] < new_rank[b])
+            if swapped and boxes_overlap(a, b):
+                boxes.extend([a[:4], b[:4]])
+    return boxes
+
+def affected_rows(lat, lon, boxes):
+    """Masque des points situés dans au moins une des boîtes"""
+    lat = pd.to_numeric(pd.Series(lat), errors='coerce').to_numpy(dtype=float)
+    lon = pd.to_numeric(pd.Series(lon), errors='coerce').to_numpy(dtype=float)
+    mask = np.zeros(len(lat), dtype=bool)
+    for lat_min, lat_max, lon_min, lon_max in boxes:
+        mask |= (lat >= lat_min) & (lat <= lat_max) & (lon >= lon_min) & (lon <= lon_max)
+    return mask
+
+def rezone(df, record, definitions, default=DEFAULT_ZONE):
+    """Met à jour la colonne Zone pour passer des définitions enregistrées
+    (record, None si inconnues) aux définitions données.
+
+    Retourne (copie du DataFrame, masque des lignes recalculées). Sans
+    enregistrement ou si la zone par défaut change, tout est recalculé.
+    """
+    if record is None or record.get("default") != default or 'Zone' not in df.columns:
+        mask = np.ones(len(df), dtype=bool)
+    else:
+        mask = affected_rows(df['Latitude'], df['Longitude'], changed_boxes(record["definitions"], definitions))
+    updated = df.copy()
+    if mask.all():
+        updated['Zone'] = assign_zones(df['Latitude'], df['Longitude'], definitions, default)
+    elif mask.any():
+        zones = np.array(updated['Zone'], dtype=object)
+        zones[mask] = assign_zones(df['Latitude'].to_numpy()[mask], df['Longitude'].to_numpy()[mask],
+                                   definitions, default)
+        updated['Zone'] = zones
+    return updated, mask
+
+def read_zone_record(dataset_path, version):
+    """Définitions enregistrées pour cette version du jeu de données, ou None"""
+    path = sidecar_path(dataset_path)
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            record = json.load(f)
+        if record.get("dataset_version") == version:
+            return record
+    except (OSError, ValueError):
+        pass
+    return None
+
+def write_zone_record(dataset_path, version, definitions, default=DEFAULT_ZONE):
+    """Enregistre les définitions avec lesquelles les zones du CSV ont été calculées"""
+    atomic_write_json(sidecar_path(dataset_path), {
+        "dataset_version": version,
+        "zones_version": definitions_version(definitions, default),
+        "default": default,
+        "definitions": definitions,
+    })
+
+def carry_forward(old_path, old_version, new_path, new_version):
+    """Reporte l'enregistrement d'un jeu de données sur celui qui le remplace.
+
+    Valable si les lignes nouvelles ont été zonées avec les définitions en
+    vigueur : hors boîtes modifiées, anciennes et nouvelles définitions
+    donnent la même zone, un zonage incrémental ultérieur reste exact.
+    """
+    record = read_zone_record(old_path, old_version)
+    if record is not None:
+        write_zone_record(new_path, new_version, record["definitions"], record["default"])
+
+def update_zones(df, dataset_path, version, definitions=None):
+    """Zonage incrémental d'un jeu de données ; retourne (DataFrame, masque des
+    lignes recalculées, None si déjà à jour)"""
+    definitions = current_definitions() if definitions is None else definitions
+    record = read_zone_record(dataset_path, version)
+    if record is not None and record["zones_version"] == definitions_version(definitions):
+        return df, None
+    return rezone(df, record, definitions)
+
+def count_changes(before, after):
+    """Nombre de lignes dont la zone a changé"""
+    if 'Zone' not in before.columns:
+        return len(after)
+    return int((after['Zone'].astype(str).to_numpy() != before['Zone'].astype(str).to_numpy()).sum())
+
+def write_csv(df, path):
+    tmp_path = f"{path}.tmp"
+    df.to_csv(tmp_path, index=False, encoding='utf-8-sig')
+    os.replace(tmp_path, path)
+
+def materialize(dataset_path, version=None):
+    """Étape de pipeline : met à jour les zones d'un CSV (réécrit sur place
+    seulement si des lignes changent) et enregistre les définitions utilisées"""
+    from dataset import file_version
+    version = version or file_version(dataset_path)
+    definitions = current_definitions()
+    df = pd.read_csv(dataset_path)
+    updated, mask = update_zones(df, dataset_path, version, definitions)
+    if mask is None:
+        print("[INFO] Zones à jour")
+        return dataset_path
+    changed = count_changes(df, updated)
+    if changed:
+        write_csv(updated, dataset_path)
+        version = file_version(dataset_path)
+    write_zone_record(dataset_path, version, definitions)
+    print(f"[SUCCESS] Zonage : {int(mask.sum())} lignes recalculées sur {len(df)}, {changed} zones modifiées")
+    return dataset_path
+
+def main():
+    """Fonction principale"""
+    parser = argparse.ArgumentParser(description="Zonage incrémental après modification des zones")
+    parser.add_argument("--dataset", help="CSV à mettre à jour sur place (par défaut : le jeu de données "
+                                          "courant, republié en nouvel instantané)")
+    args = parser.parse_args()
+
+    if args.dataset:
+        materialize(args.dataset)
+        return
+    from dataset import current_dataset, load_dataset, publish_snapshot
+    path, _ = current_dataset()
+    df, version = load_dataset()
+    definitions = current_definitions()
+    updated, mask = update_zones(df, path, version, definitions)
+    if mask is None:
+        print("[INFO] Zones à jour")
+        return
+    changed = count_changes(df, updated)
+    print(f"📍 ZONAGE INCRÉMENTAL - {int(mask.sum())} lignes recalculées sur {len(df)} "
+          f"({mask.mean() * 100 if len(mask) else 0:.1f}%), {changed} zones modifiées")
+    if changed:
+        path, version = publish_snapshot(updated)
+        print(f"[SUCCESS] Instantané publié : {path}")
+    write_zone_record(path, version, definitions)
+
+if __name__ == "__main__":
+    main()